@@ -0,0 +1,341 @@
+"""Benchmark the exporter on synthetic plans of 1 to 30 rooms.
+
+    python benchmark_render.py                       # 1, 2, 4, 8, 16, 30 rooms
+    python benchmark_render.py --rooms 1 8 30 --repeat 3 --output before.json
+    python benchmark_render.py --output after.json --compare before.json
+
+The one hand-made plan in `plan_walkthrough._demo_plan` says how long three
+rooms take. It does not say how a change behaves at thirty, which is where a
+rule that is quadratic in the number of rooms or openings shows up first. Each
+plan here is generated from its room count and a seed: rectangular rooms of
+varied size on a grid, so neighbours share whole walls, the room types the app
+offers in rotation, a door through every shared wall in a row and one between
+rows, windows on outside walls, and a balcony door on the top row of larger
+plans. The same count and seed always give the same plan.
+
+Every plan is built through `render_worker.build` — the request the app makes —
+in its own forked process, against an empty output directory, with the build
+profile on. A fresh process keeps one plan's peak memory and warm caches out of
+the next plan's numbers. Each result records wall and CPU time, the process's
+memory, triangles, draw calls, the GLB's size and the profile's per-stage
+times, and the whole run is written as JSON with the exporter's source
+fingerprint, so two revisions can be compared plan by plan.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so no peak memory
+    resource = None
+
+
+DEFAULT_ROOM_COUNTS = (1, 2, 4, 8, 16, 30)
+PIXELS_PER_METER = 100
+
+# The first of these is always the living room; the rest rotate. Plans of any
+# size therefore mix wet rooms, bedrooms and the open-plan rooms that trigger
+# the cross-room dining and kitchen rules.
+ROOM_TYPES = (
+    "Living Room",
+    "Kitchen",
+    "Bedroom",
+    "Bathroom",
+    "Dining Room",
+    "Office",
+    "Bedroom",
+    "Bathroom",
+    "Entry Hall",
+    "Laundry",
+)
+STYLES = ("Modern", "Scandinavian", "Japandi", "Industrial", "Classic")
+
+
+# ================= SYNTHETIC PLANS =================
+
+def synthetic_plan(room_count, seed=0):
+    """A render request for a plan of `room_count` rooms, in plan pixels.
+
+    Rooms fill a grid row by row. Column widths and row heights are drawn per
+    column and per row, so every room's walls meet its neighbours' exactly
+    and the exporter finds them shared.
+    """
+    if room_count < 1:
+        raise ValueError("A plan needs at least one room.")
+    rng = random.Random(f"{room_count}:{seed}")
+    columns = math.ceil(math.sqrt(room_count))
+    rows = math.ceil(room_count / columns)
+    widths = [rng.uniform(2.8, 5.6) for _ in range(columns)]
+    heights = [rng.uniform(2.6, 4.8) for _ in range(rows)]
+    xs = [sum(widths[:index]) for index in range(columns + 1)]
+    ys = [sum(heights[:index]) for index in range(rows + 1)]
+
+    def px(value):
+        return round(value * PIXELS_PER_METER, 1)
+
+    cells = {}
+    rooms = []
+    for index in range(room_count):
+        row, column = divmod(index, columns)
+        cells[row, column] = index
+        x0, x1, y0, y1 = xs[column], xs[column + 1], ys[row], ys[row + 1]
+        rooms.append([[px(x0), px(y0)], [px(x1), px(y0)], [px(x1), px(y1)], [px(x0), px(y1)]])
+
+    def opening(a, b, width, position=0.5):
+        """A segment `width` m long on the wall from `a` to `b`, in pixels.
+
+        `position` slides it from one end of the wall to the other, always
+        keeping 25 cm of wall at each end for the corner.
+        """
+        length = math.dist(a, b)
+        width = min(width, length - 0.5)
+        start = 0.25 + position * (length - width - 0.5)
+        t0, t1 = start / length, (start + width) / length
+        return [
+            [px(a[0] + (b[0] - a[0]) * t0), px(a[1] + (b[1] - a[1]) * t0)],
+            [px(a[0] + (b[0] - a[0]) * t1), px(a[1] + (b[1] - a[1]) * t1)],
+        ]
+
+    doors = []
+    for (row, column), index in sorted(cells.items()):
+        # Through the shared wall to the room on the right.
+        if (row, column + 1) in cells:
+            x = xs[column + 1]
+            doors.append(opening((x, ys[row]), (x, ys[row + 1]), 0.9, rng.uniform(0.2, 0.8)))
+        # And one door per row up to the row above, so every room is reachable.
+        # The last row can be short, so the column is picked among its own.
+        row_length = min(columns, room_count - row * columns)
+        if row and column == row % row_length:
+            y = ys[row]
+            doors.append(opening((xs[column], y), (xs[column + 1], y), 0.9, rng.uniform(0.2, 0.8)))
+
+    windows = []
+    balconies = []
+    for (row, column), index in sorted(cells.items()):
+        x0, x1, y0, y1 = xs[column], xs[column + 1], ys[row], ys[row + 1]
+        outside = []
+        if row == 0:
+            outside.append(((x0, y0), (x1, y0)))
+        if (row + 1, column) not in cells:
+            outside.append(((x1, y1), (x0, y1)))
+        if column == 0:
+            outside.append(((x0, y1), (x0, y0)))
+        if (row, column + 1) not in cells:
+            outside.append(((x1, y0), (x1, y1)))
+        if not outside:
+            continue
+        wall = outside[rng.randrange(len(outside))]
+        if row == 0 and room_count >= 4 and index % 3 == 0:
+            balconies.append(opening((x0, y0), (x1, y0), 1.2, rng.uniform(0.3, 0.7)))
+            outside.remove(((x0, y0), (x1, y0)))
+            if not outside:
+                continue
+            wall = outside[0]
+        windows.append([*opening(*wall, rng.uniform(0.9, 1.8), rng.uniform(0.2, 0.8)), "normal"])
+
+    room_configs = [
+        {
+            "name": f"Room {index + 1}",
+            "roomType": ROOM_TYPES[index and 1 + (index - 1) % (len(ROOM_TYPES) - 1)],
+            "style": STYLES[index % len(STYLES)],
+        }
+        for index in range(room_count)
+    ]
+    return {
+        "rooms": rooms,
+        "doors": doors,
+        "windows": windows,
+        "balconies": balconies,
+        "roomConfigs": room_configs,
+        "pixelsPerMeter": PIXELS_PER_METER,
+        "settings": {},
+        "rendererRevision": f"benchmark-{room_count}-{seed}",
+    }
+
+
+# ================= MEASURING =================
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _measure(payload):
+    """Build one plan in this process and describe the build."""
+    import render_worker
+
+    output = Path(tempfile.mkdtemp(prefix="render-benchmark-"))
+    saved = render_worker.OUTPUT_DIR, render_worker.BUILD_PROFILE
+    render_worker.OUTPUT_DIR, render_worker.BUILD_PROFILE = output, True
+    start_rss = _peak_rss_mb()
+    started, cpu = time.perf_counter(), time.process_time()
+    try:
+        response = render_worker.build(payload)
+    finally:
+        render_worker.OUTPUT_DIR, render_worker.BUILD_PROFILE = saved
+    wall, cpu = time.perf_counter() - started, time.process_time() - cpu
+    profile = response.get("profile") or {}
+    stages = profile.get("stages", {})
+    model = output / response["modelName"]
+    result = {
+        "wallSeconds": round(wall, 3),
+        "cpuSeconds": round(cpu, 3),
+        "startRssMb": start_rss,
+        "peakRssMb": _peak_rss_mb(),
+        "triangles": stages.get("write_glb", {}).get("triangles"),
+        "meshes": response.get("meshes"),
+        "drawCalls": response.get("drawCalls"),
+        "glbBytes": model.stat().st_size,
+        "stages": {
+            name: stage["wallSeconds"]
+            for name, stage in stages.items()
+        },
+        "tallies": {
+            name: tally["wallSeconds"]
+            for name, tally in profile.get("tallies", {}).items()
+        },
+    }
+    for path in output.iterdir():
+        path.unlink()
+    output.rmdir()
+    return result
+
+
+def _measure_in_child(payload, results):
+    try:
+        results.put({"result": _measure(payload)})
+    except Exception as error:
+        results.put({"error": f"{type(error).__name__}: {error}"})
+
+
+def measure(payload, isolate=True):
+    """Build `payload` once, in a forked process where there is fork."""
+    if not isolate or "fork" not in multiprocessing.get_all_start_methods():
+        return _measure(payload)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_measure_in_child, args=(payload, results))
+    process.start()
+    try:
+        answer = results.get()
+    finally:
+        process.join()
+    if "error" in answer:
+        raise RuntimeError(answer["error"])
+    return answer["result"]
+
+
+def run(room_counts=DEFAULT_ROOM_COUNTS, repeat=1, seed=0, isolate=True, log=None):
+    """Benchmark each plan size; the fastest of `repeat` builds is kept."""
+    # Imported here, in the parent, so every forked build starts with the
+    # exporter loaded and the import is not timed as part of the first plan.
+    import render_worker
+
+    plans = []
+    for room_count in room_counts:
+        payload = synthetic_plan(room_count, seed)
+        runs = [measure(payload, isolate) for _ in range(max(1, repeat))]
+        best = min(runs, key=lambda item: item["wallSeconds"])
+        plan = {
+            "rooms": room_count,
+            "doors": len(payload["doors"]),
+            "windows": len(payload["windows"]),
+            "balconies": len(payload["balconies"]),
+            "runs": len(runs),
+            "wallSecondsAll": [item["wallSeconds"] for item in runs],
+            **best,
+        }
+        plans.append(plan)
+        if log is not None:
+            print(
+                f"{room_count:3d} rooms  {plan['wallSeconds']:8.2f} s  "
+                f"{plan['peakRssMb'] or 0:8.1f} MB  {plan['triangles'] or 0:9d} tris  "
+                f"{plan['glbBytes'] / 1e6:7.2f} MB GLB",
+                file=log,
+                flush=True,
+            )
+    return {
+        "interiorPlanSource": render_worker.interior_plan_source_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "plans": plans,
+    }
+
+
+def compare(before, after):
+    """Lines setting `after` against `before`, plan size by plan size."""
+    earlier = {plan["rooms"]: plan for plan in before["plans"]}
+    lines = [
+        f"{'rooms':>5}  {'time':>16}  {'peak memory':>18}  {'triangles':>20}  {'GLB':>16}"
+    ]
+
+    def change(previous, plan, key, width, scale=1.0, unit=""):
+        old, new = previous.get(key), plan.get(key)
+        if not old or new is None:
+            return "-".rjust(width)
+        value = f"{new:,}" if isinstance(new, int) and scale == 1 else f"{new * scale:,.2f}"
+        return f"{value}{unit} ({(new - old) / old:+.0%})".rjust(width)
+
+    for plan in after["plans"]:
+        previous = earlier.get(plan["rooms"])
+        if previous is None:
+            continue
+        lines.append("  ".join((
+            f"{plan['rooms']:>5}",
+            change(previous, plan, "wallSeconds", 16, unit=" s"),
+            change(previous, plan, "peakRssMb", 18, unit=" MB"),
+            change(previous, plan, "triangles", 20),
+            change(previous, plan, "glbBytes", 16, 1e-6, " MB"),
+        )))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rooms", type=int, nargs="+", default=list(DEFAULT_ROOM_COUNTS),
+                        help="plan sizes to build (default: 1 2 4 8 16 30)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="builds per plan; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="plan generator seed")
+    parser.add_argument("--output", type=Path, help="write the results here as JSON")
+    parser.add_argument("--compare", type=Path, help="an earlier results file to compare with")
+    parser.add_argument("--in-process", action="store_true",
+                        help="build every plan in this process instead of a fresh fork")
+    options = parser.parse_args(argv)
+
+    results = run(
+        options.rooms,
+        repeat=options.repeat,
+        seed=options.seed,
+        isolate=not options.in_process,
+        log=sys.stderr,
+    )
+    text = json.dumps(results, indent=2)
+    if options.output:
+        options.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if options.compare:
+        before = json.loads(options.compare.read_text(encoding="utf-8"))
+        print(compare(before, results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
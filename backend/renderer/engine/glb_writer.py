@@ -0,0 +1,424 @@
+"""Write a binary glTF to disk as its meshes are finished, not all at once.
+
+`trimesh.Scene.export` builds the whole file in memory — every buffer view
+joined into one bytes object, then the header in front of it — while every
+combined mesh and texture is still alive beside it. A furnished home is tens
+of megabytes, and the export peaked at several times that.
+
+This writer keeps trimesh's own encoders, so accessors, normals, UVs,
+materials and embedded PNGs come out exactly as `export` writes them. Only the
+storage changes: each buffer view goes to a spool file the moment it is
+encoded, and the JSON header is written in front of it when the scene is
+closed. The caller drops each mesh once it is added, so peak memory tracks the
+largest mesh group rather than the whole home.
+
+The encoders are trimesh internals (`trimesh.exchange.gltf`), pinned by the
+`trimesh>=4.7,<5` requirement.
+
+With `quantize=True` the geometry is written under KHR_mesh_quantization
+instead: positions as 16-bit integers on a grid the node's scale and
+translation undo, normals as normalized bytes, UVs that stay inside the unit
+square as normalized 16-bit integers, and 16-bit indices wherever a mesh has
+few enough vertices. Three's GLTFLoader reads the extension with no decoder to
+ship, and a furnished home comes out at well under half the bytes. Materials
+and textures are written exactly as in the standard profile.
+
+A mesh added with a `placement` — a translation and a rotation quaternion, as
+glTF writes them on a node — is stored in its own frame, and `add_instance`
+puts further nodes on that same glTF mesh. The file then holds the geometry
+once however many nodes draw it, and Three's GLTFLoader builds one geometry
+for them all.
+
+A node can also be given coarser stand-ins — meshes written with `add_mesh`,
+which puts no node on them — as `lods`. They are listed under MSFT_lod on the
+node, each on a node of its own outside the scene, placed as the node is.
+Nothing requires the extension: a loader that does not know it draws the full
+mesh and never looks at the rest.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from trimesh import util
+from trimesh.caching import hash_fast
+from trimesh.exchange import gltf
+
+_GLB_MAGIC = 0x46546C67  # "glTF"
+_JSON_CHUNK = 0x4E4F534A  # "JSON"
+_BIN_CHUNK = 0x004E4942  # "BIN\0"
+
+_QUANTIZATION = "KHR_mesh_quantization"
+_LOD = "MSFT_lod"
+_ARRAY_BUFFER = 34962
+_POSITION_STEPS = 65535
+# WebGL2 always treats the largest index of the type as a primitive restart,
+# so a 16-bit index buffer can address one vertex fewer than it can count.
+_SHORT_INDEX_VERTICES = 65535
+
+
+def _compose(placement, encoding):
+    """One node transform: `placement` applied after the mesh's `encoding`.
+
+    The encoding's scale is uniform, so it commutes with the rotation and only
+    its translation has to be turned: R(s·v + t) + p = s·R·v + (R·t + p).
+    """
+    if not placement:
+        return dict(encoding)
+    translation = np.asarray(placement.get("translation", (0.0, 0.0, 0.0)), dtype=float)
+    rotation = placement.get("rotation")
+    transform = {}
+    if "translation" in encoding:
+        offset = np.asarray(encoding["translation"], dtype=float)
+        if rotation is not None:
+            offset = _rotation_matrix(rotation) @ offset
+        translation = translation + offset
+    transform["translation"] = translation.tolist()
+    if rotation is not None:
+        transform["rotation"] = [float(value) for value in rotation]
+    if "scale" in encoding:
+        transform["scale"] = encoding["scale"]
+    return transform
+
+
+def _rotation_matrix(quaternion):
+    x, y, z, w = (float(value) for value in quaternion)
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+class _Extent:
+    """Where one buffer view landed in the spool; stands in for its bytes."""
+
+    __slots__ = ("length",)
+
+    def __init__(self, length):
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+
+class _SpooledBuffers(OrderedDict):
+    """trimesh's `buffer_items`, with each value written out as it arrives.
+
+    The encoders only ever add a view, look one up by hash, and take the
+    length of each when the views are laid out, so the hashes and lengths are
+    all that needs to stay in memory.
+    """
+
+    def __init__(self, spool):
+        super().__init__()
+        self.spool = spool
+        self.length = 0
+        # Key -> view index, so a view is found without scanning the keys.
+        self.positions = {}
+        # View index -> byteStride, for the interleaved-with-padding views the
+        # quantized profile writes; trimesh's own views are tightly packed.
+        self.strides = {}
+
+    def __setitem__(self, key, data):
+        if key in self:
+            return
+        self.spool.write(data)
+        self.length += len(data)
+        self.positions[key] = len(self)
+        super().__setitem__(key, _Extent(len(data)))
+
+
+class StreamingGlbWriter:
+    """Add trimesh meshes one at a time; `close` publishes the GLB atomically.
+
+    Nodes are listed under a single "world" root, as trimesh lays a scene out,
+    in the `order` they were given rather than the order they were written,
+    so a mesh that is finished late still keeps its place.
+    """
+
+    def __init__(self, path, quantize=False):
+        self.path = Path(path)
+        self.quantize = quantize
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.temporary = self.path.with_suffix(".building.glb")
+        # The system's temporary directory, not the output's: on Modal that
+        # is a network volume, and only the finished file belongs there.
+        self._spool = tempfile.TemporaryFile()
+        self._buffers = _SpooledBuffers(self._spool)
+        self._materials = {}
+        self._nodes = []
+        # glTF mesh index -> the node transform its encoding needs on its own:
+        # the quantization grid's translation and scale, or nothing.
+        self._encodings = {}
+        self._quantized = False
+        self.tree = {
+            "scene": 0,
+            "scenes": [{"nodes": [0]}],
+            "asset": {
+                "version": "2.0",
+                "generator": "https://github.com/mikedh/trimesh",
+            },
+            "accessors": OrderedDict(),
+            "meshes": [],
+            "images": [],
+            "textures": [],
+            "materials": [],
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def add(self, mesh, name, order=None, placement=None):
+        """Encode one mesh into the file. Empty meshes are skipped, as in export.
+
+        Returns the glTF mesh index, for `add_instance`, or None when skipped.
+        """
+        index = self.add_mesh(mesh, name)
+        if index is not None:
+            self.add_instance(index, name, order=order, placement=placement)
+        return index
+
+    def add_mesh(self, mesh, name):
+        """Encode one mesh with no node on it; `add` without the node."""
+        before = len(self.tree["meshes"])
+        transform = {}
+        if self.quantize and mesh.visual.kind not in ("vertex", "face"):
+            transform = self._append_quantized(mesh, name)
+            self._quantized = self._quantized or bool(transform)
+        else:
+            gltf._append_mesh(
+                mesh=mesh,
+                name=name,
+                tree=self.tree,
+                buffer_items=self._buffers,
+                include_normals=None,
+                unitize_normals=True,
+                mat_hashes=self._materials,
+                extension_webp=False,
+            )
+        if len(self.tree["meshes"]) == before:
+            return None
+        self._encodings[before] = transform
+        return before
+
+    def add_instance(self, mesh_index, name, order=None, placement=None,
+                     lods=(), extras=None):
+        """Add a node drawing an already written mesh, placed by `placement`.
+
+        `lods` are the indices of coarser meshes for it, nearest first, and
+        `extras` is written on the node as it is.
+        """
+        levels = [
+            (f"{name}_lod{level}", index, _compose(placement, self._encodings[index]))
+            for level, index in enumerate(lods, start=1)
+        ]
+        self._nodes.append((
+            len(self._nodes) if order is None else order,
+            name,
+            mesh_index,
+            _compose(placement, self._encodings[mesh_index]),
+            levels,
+            extras,
+        ))
+
+    def _view(self, data, stride=None):
+        """Spool one array as a buffer view, once, and return its index."""
+        content = data.tobytes()
+        key = (hash_fast(content), stride)
+        if key not in self._buffers:
+            self._buffers[key] = gltf._byte_pad(content)
+            if stride:
+                self._buffers.strides[len(self._buffers) - 1] = stride
+        return self._buffers.positions[key]
+
+    def _accessor(self, view, component, kind, count, normalized=False,
+                  bounds=None):
+        accessor = {
+            "bufferView": view,
+            "componentType": component,
+            "type": kind,
+            "count": int(count),
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if bounds is not None:
+            accessor["min"], accessor["max"] = bounds
+        # trimesh keys its accessors by content hash to share them; these are
+        # never shared, and a tuple cannot collide with one of its keys.
+        accessors = self.tree["accessors"]
+        accessors[("quantized", len(accessors))] = accessor
+        return len(accessors) - 1
+
+    def _append_quantized(self, mesh, name):
+        """`gltf._append_mesh` for the KHR_mesh_quantization profile.
+
+        Returns the node transform that maps the integer positions back to
+        metres. The scale is uniform, so the normals need no correction, and
+        the grid is the mesh's longest side in 65,535 steps: a 20 m ceiling
+        lands within a third of a millimetre, a chair within microns.
+        """
+        vertices = np.asarray(mesh.vertices, dtype=np.float64)
+        faces = np.asarray(mesh.faces)
+        if not len(vertices) or not len(faces):
+            return {}
+        low = vertices.min(axis=0)
+        step = float((vertices.max(axis=0) - low).max()) / _POSITION_STEPS or 1.0
+        positions = np.zeros((len(vertices), 4), dtype="<u2")
+        positions[:, :3] = np.clip(
+            np.rint((vertices - low) / step), 0, _POSITION_STEPS
+        )
+        attributes = {"POSITION": self._accessor(
+            self._view(positions, stride=8),
+            5123,
+            "VEC3",
+            len(positions),
+            bounds=(
+                positions[:, :3].min(axis=0).tolist(),
+                positions[:, :3].max(axis=0).tolist(),
+            ),
+        )}
+
+        if "vertex_normals" in mesh._cache.cache:
+            normals = np.zeros((len(vertices), 4), dtype="<i1")
+            normals[:, :3] = np.rint(util.unitize(mesh.vertex_normals) * 127)
+            attributes["NORMAL"] = self._accessor(
+                self._view(normals, stride=4), 5120, "VEC3", len(normals),
+                normalized=True,
+            )
+
+        primitive = {"attributes": attributes, "mode": gltf._GL_TRIANGLES}
+        if hasattr(mesh.visual, "material"):
+            primitive["material"] = gltf._append_material(
+                mat=mesh.visual.material,
+                tree=self.tree,
+                buffer_items=self._buffers,
+                mat_hashes=self._materials,
+                extension_webp=False,
+            )
+            uv = getattr(mesh.visual, "uv", None)
+            if uv is not None and len(uv) == len(vertices):
+                uv = np.array(uv[:, :2], dtype=np.float64)
+                uv[:, 1] = 1.0 - uv[:, 1]
+                if uv.min() >= 0.0 and uv.max() <= 1.0:
+                    # Tiled finishes repeat past 1 and stay float; catalog
+                    # models are atlased inside the square and need not.
+                    attributes["TEXCOORD_0"] = self._accessor(
+                        self._view(np.rint(uv * 65535).astype("<u2")),
+                        5123, "VEC2", len(uv), normalized=True,
+                    )
+                else:
+                    attributes["TEXCOORD_0"] = self._accessor(
+                        self._view(uv.astype("<f4")), 5126, "VEC2", len(uv),
+                    )
+
+        indices = faces.reshape(-1)
+        short = len(vertices) <= _SHORT_INDEX_VERTICES
+        primitive["indices"] = self._accessor(
+            self._view(indices.astype("<u2" if short else "<u4")),
+            5123 if short else 5125,
+            "SCALAR",
+            len(indices),
+            bounds=([int(indices.min())], [int(indices.max())]),
+        )
+
+        self.tree["meshes"].append({
+            "name": name,
+            "extras": gltf._jsonify(mesh.metadata),
+            "primitives": [primitive],
+        })
+        return {"translation": low.tolist(), "scale": [step, step, step]}
+
+    def close(self):
+        """Write the header and the spooled buffer, then move the file into place."""
+        tree = self.tree
+        tree["accessors"] = list(tree["accessors"].values())
+        for key in ("textures", "materials", "images", "accessors", "meshes"):
+            if not tree[key]:
+                tree.pop(key)
+        nodes = sorted(self._nodes, key=lambda node: node[:3])
+        tree["nodes"] = [{
+            "name": "world",
+            "children": list(range(1, len(nodes) + 1)),
+        }]
+        # The stand-ins come after every scene node, so the scene's own node
+        # indices stay what they are without them.
+        stand_ins = []
+        for _order, name, mesh, transform, levels, extras in nodes:
+            node = {"name": name, "mesh": mesh, **transform}
+            if levels:
+                first = len(nodes) + 1 + len(stand_ins)
+                node["extensions"] = {_LOD: {"ids": list(range(first, first + len(levels)))}}
+                stand_ins.extend(
+                    {"name": level_name, "mesh": level_mesh, **level_transform}
+                    for level_name, level_mesh, level_transform in levels
+                )
+            if extras:
+                node["extras"] = extras
+            tree["nodes"].append(node)
+        tree["nodes"].extend(stand_ins)
+        used = []
+        if self._quantized:
+            used.append(_QUANTIZATION)
+            tree["extensionsRequired"] = [_QUANTIZATION]
+        if stand_ins:
+            used.append(_LOD)
+        if used:
+            tree["extensionsUsed"] = used
+        if self._buffers.length:
+            tree["buffers"] = [{"byteLength": self._buffers.length}]
+            tree["bufferViews"] = gltf._build_views(self._buffers)
+            for index, stride in self._buffers.strides.items():
+                tree["bufferViews"][index].update(
+                    byteStride=stride, target=_ARRAY_BUFFER
+                )
+
+        content = util.jsonify(tree, separators=(",", ":"))
+        # Pad the JSON so the binary chunk starts on a four-byte boundary.
+        content += (4 - ((len(content) + 20) % 4)) * " "
+        content = content.encode("utf-8")
+        binary = self._buffers.length
+        header = np.array(
+            [
+                _GLB_MAGIC,
+                2,
+                len(content) + binary + 28,
+                len(content),
+                _JSON_CHUNK,
+            ],
+            dtype="<u4",
+        ).tobytes()
+        try:
+            with open(self.temporary, "wb") as handle:
+                handle.write(header)
+                handle.write(content)
+                handle.write(np.array([binary, _BIN_CHUNK], dtype="<u4").tobytes())
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, handle, 1024 * 1024)
+            os.replace(self.temporary, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._spool.close()
+        return self.path
+
+    def abort(self):
+        """Discard everything written so far."""
+        self._spool.close()
+        try:
+            self.temporary.unlink()
+        except FileNotFoundError:
+            pass
@@ -10,12 +10,15 @@ Source: https://ambientcg.com/ (Creative Commons CC0)
 
 from __future__ import annotations
 
+import weakref
 from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
 import open3d as o3d
 
+import asset_pack
+
 
 ROOT = Path(__file__).resolve().parent
 MATERIAL_ROOT = ROOT / "assets" / "archviz_materials" / "ambientcg"
@@ -35,7 +38,15 @@ MATERIALS = {
     "concrete": ("Concrete034", 1.1, 0.72),
     "terrazzo": ("Terrazzo019M", 1.3, 0.38),
 }
-_MESH_MATERIALS = {}
+# The finish applied to each mesh, keyed weakly by the mesh itself. An entry
+# lives exactly as long as its mesh: a warm worker exporting home after home
+# holds finishes for the meshes still in use and nothing else, and a recycled
+# object id can never inherit an old finish because the old entry is gone.
+_MESH_MATERIALS = weakref.WeakKeyDictionary()
+# The maps a material is rendered with; an asset pack holds these and no more.
+MAP_NAMES = ("Color", "NormalDX", "Roughness", "AmbientOcclusion")
+# The two axes a planar projection keeps, indexed by the dropped (normal) axis.
+_PROJECTION_PLANES = np.array([[1, 2], [0, 2], [0, 1]])
 
 
 def _map_path(material_name: str, map_name: str) -> Path | None:
@@ -45,16 +56,28 @@ def _map_path(material_name: str, map_name: str) -> Path | None:
     return matches[0] if matches else None
 
 
+def _map_pixels(material_name: str, map_name: str) -> np.ndarray | None:
+    """A map's decoded pixels, from the asset pack when one is open."""
+    pack = asset_pack.open_pack()
+    if pack is not None:
+        pixels = pack.texture(MATERIALS[material_name][0], map_name)
+        if pixels is not None:
+            return pixels
+    path = _map_path(material_name, map_name)
+    if path is None:
+        return None
+    return np.asarray(o3d.io.read_image(str(path)), dtype=np.uint8)
+
+
 @lru_cache(maxsize=64)
 def _texture_pixels(
     material_name: str,
     tint_key: tuple[float, float, float] | tuple,
     tint_strength: float,
 ) -> np.ndarray:
-    path = _map_path(material_name, "Color")
-    if path is None:
+    pixels = _map_pixels(material_name, "Color")
+    if pixels is None:
         raise FileNotFoundError(f"Missing local material texture: {material_name}")
-    pixels = np.asarray(o3d.io.read_image(str(path)), dtype=np.uint8)
     if not tint_key or tint_strength <= 0:
         return np.ascontiguousarray(pixels[:, :, :3])
 
@@ -80,18 +103,16 @@ def _projected_triangle_uvs(mesh, repeat_m: float):
         tri_vertices[:, 2] - tri_vertices[:, 0],
     )
     axis = np.argmax(np.abs(normals), axis=1)
-    uvs = np.empty((len(triangles), 3, 2), dtype=float)
     minimum = vertices.min(axis=0)
     repeat_m = max(float(repeat_m), 0.05)
-    for index in range(len(triangles)):
-        points = tri_vertices[index]
-        if axis[index] == 2:       # floor / ceiling
-            uv = (points[:, [0, 1]] - minimum[[0, 1]]) / repeat_m
-        elif axis[index] == 0:     # wall whose normal is mainly X
-            uv = (points[:, [1, 2]] - minimum[[1, 2]]) / repeat_m
-        else:                      # wall whose normal is mainly Y
-            uv = (points[:, [0, 2]] - minimum[[0, 2]]) / repeat_m
-        uvs[index] = uv
+    # Each triangle is projected onto the plane across its dominant normal:
+    # a wall whose normal is mainly X maps (Y, Z), mainly Y maps (X, Z), and a
+    # floor or ceiling maps (X, Y). Gathering those two columns per triangle
+    # does in one pass what a Python loop over every triangle used to, with
+    # the same arithmetic, so the UVs are bit-for-bit unchanged.
+    planes = _PROJECTION_PLANES[axis]
+    projected = np.take_along_axis(tri_vertices, planes[:, None, :], axis=2)
+    uvs = (projected - minimum[planes][:, None, :]) / repeat_m
     return uvs.reshape((-1, 2))
 
 
@@ -125,19 +146,53 @@ def apply_archviz_material(
         np.ones((len(mesh.vertices), 3), dtype=float)
     )
     mesh.compute_vertex_normals()
-    # Keep the mesh reference with the record. A plain id -> material map can
-    # silently attach an old finish to a newly allocated mesh after Python
-    # reuses an object id during a larger apartment build.
-    _MESH_MATERIALS[id(mesh)] = (
+    register_mesh_material(
         mesh,
         material_name,
         tint_key,
+        tint_strength,
+        detail_maps,
+    )
+    return mesh
+
+
+def register_mesh_material(
+    mesh,
+    material_name: str,
+    tint_key=(),
+    tint_strength: float = 0.0,
+    detail_maps: bool = True,
+):
+    """Record which local material a mesh carries, for the PBR exporters."""
+    _MESH_MATERIALS[mesh] = (
+        material_name,
+        tuple(tint_key or ()),
         round(float(tint_strength), 3),
         bool(detail_maps),
     )
     return mesh
 
 
+def mesh_material(mesh):
+    """The ``(name, tint_key, tint_strength, detail_maps)`` a mesh was given."""
+    try:
+        return _MESH_MATERIALS.get(mesh)
+    except TypeError:  # not a mesh that can be registered at all
+        return None
+
+
+def copy_mesh_material(source, target):
+    """Give `target` the archviz finish registered for `source`, if any.
+
+    Used when a finished mesh is duplicated: the copy is a new object, so the
+    identity-keyed registry would otherwise lose its material.
+    """
+    registered = mesh_material(source)
+    if registered is not None:
+        _MESH_MATERIALS[target] = registered
+    return target
+
+
 def pbr_material(
     material_name: str,
     *,
@@ -171,9 +226,9 @@ def pbr_material(
     if detail_maps and material_name not in {"warm_oak", "dark_wood"}:
         maps.insert(0, ("NormalDX", "normal_img"))
     for map_name, attribute in maps:
-        path = _map_path(material_name, map_name)
-        if path is not None:
-            setattr(record, attribute, o3d.io.read_image(str(path)))
+        pixels = _map_pixels(material_name, map_name)
+        if pixels is not None:
+            setattr(record, attribute, o3d.geometry.Image(pixels))
     return record
 
 
@@ -193,10 +248,9 @@ def material_record_for_mesh(mesh):
     except (ImportError, RuntimeError):
         pass
 
-    registered = _MESH_MATERIALS.get(id(mesh))
-    if registered is not None and registered[0] is mesh:
+    registered = mesh_material(mesh)
+    if registered is not None:
         (
-            _mesh_reference,
             material_name,
             tint_key,
             tint_strength,
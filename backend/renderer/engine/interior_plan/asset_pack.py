@@ -0,0 +1,307 @@
+"""The archviz materials and furniture catalog, decoded ahead of time.
+
+Every cold process used to decode the ambientCG JPGs with `o3d.io.read_image`
+and parse each catalog GLB with Trimesh — tens of seconds of identical work per
+Modal container, before the first room was built. An asset pack does that work
+once, at image build time, and keeps the result as raw arrays in one file:
+
+    archviz maps     pixels exactly as `o3d.io.read_image` decodes them, one per
+                     (ambientCG asset, map) pair.
+    catalog models   `furniture_catalog._catalog_model`'s output — vertices in
+                     walkthrough axes relative to the model's corner, faces,
+                     colors, UVs and the PBR maps already brought down to
+                     TEXTURE_MAX_SIZE.
+
+A process maps the file with `np.memmap` and hands out views into it: nothing
+is copied or decoded, the pages are read the first time a room touches them,
+and forked workers share them through the page cache rather than each holding
+its own parsed copy. The mapping is copy-on-write. Nothing downstream writes
+to these arrays — recoloring and fitting a footprint both make new ones — but
+Open3D only accepts writeable buffers, and a stray write lands in a private
+page of the one process rather than in the file.
+
+File layout, every array 64-byte aligned from the start of the file:
+
+    array data | header JSON | header length (u64 LE) | MAGIC
+
+The header lists each array's offset, dtype and shape, the format version, the
+texture size the models were compiled at, a fingerprint of the code that
+produced them, and `hash` — a hash of the header and every byte of data. A pack
+whose format or compiler does not match this code is not used at all; one
+compiled at another texture size still serves its archviz maps, which do not
+depend on it.
+
+The pack is opt-in: LIVINAI_ASSET_PACK names the file. Compile it with
+
+    python render_worker.py --compile-asset-pack PACK
+
+after the assets are in place, and before `--write-source-manifest`: with a
+pack open the source fingerprint hashes the pack in place of the catalog files
+it serves, so the two are written together.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parent
+MAGIC = b"LVAPACK\x00"
+FORMAT = 1
+_ALIGN = 64
+_FOOTER = struct.Struct("<Q8s")
+
+#: The pack this process maps, when set. Unset, or naming a file that is not
+#: there, every asset is read from its source file as before.
+ASSET_PACK_ENV = "LIVINAI_ASSET_PACK"
+
+# The files whose code decides what a pack holds. A pack compiled by other
+# versions of them may lay its models out differently, so it is not used.
+_COMPILER_SOURCES = ("asset_pack.py", "furniture_catalog.py", "archviz_materials.py")
+
+_UNOPENED = object()
+_PACK = _UNOPENED
+
+
+def compiler_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for filename in _COMPILER_SOURCES:
+        digest.update(filename.encode())
+        digest.update((ROOT / filename).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class AssetPack:
+    """One mapped pack. Arrays are views into the file, built on first ask."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            size = handle.tell()
+            if size < _FOOTER.size:
+                raise ValueError("not an asset pack")
+            handle.seek(size - _FOOTER.size)
+            header_length, magic = _FOOTER.unpack(handle.read(_FOOTER.size))
+            if magic != MAGIC or header_length > size - _FOOTER.size:
+                raise ValueError("not an asset pack")
+            header_start = size - _FOOTER.size - header_length
+            handle.seek(header_start)
+            self.header = json.loads(handle.read(header_length))
+        self.hash = self.header["hash"]
+        self.texture_max_size = self.header["textureMaxSize"]
+        self._data = (
+            np.memmap(self.path, dtype=np.uint8, mode="c", shape=(header_start,))
+            if header_start
+            else np.empty(0, dtype=np.uint8)
+        )
+        self._models = {}
+
+    def _array(self, ref):
+        if ref is None:
+            return None
+        return np.ndarray(
+            tuple(ref["shape"]),
+            dtype=np.dtype(ref["dtype"]),
+            buffer=self._data,
+            offset=ref["offset"],
+        )
+
+    def texture(self, asset_id, map_name):
+        """An archviz map's decoded pixels, or None when the pack lacks it."""
+        return self._array(self.header["textures"].get(f"{asset_id}/{map_name}"))
+
+    def model(self, name, texture_max_size):
+        """A catalog model as `_catalog_model` returns it, or None.
+
+        `name` is the file's path under the catalog root. None too when the
+        pack's maps were brought down to another size than the caller keeps.
+        """
+        if texture_max_size != self.texture_max_size:
+            return None
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        entry = self.header["models"].get(name)
+        if entry is None:
+            return None
+        components = []
+        for component in entry["components"]:
+            maps = component["maps"]
+            if maps is not None:
+                maps = {
+                    **{key: self._array(maps[key]) for key in ("uv", "albedo", "normal", "arm")},
+                    "roughness": maps["roughness"],
+                    "metallic": maps["metallic"],
+                }
+            components.append({
+                "vertices": self._array(component["vertices"]),
+                "faces": self._array(component["faces"]),
+                "colors": self._array(component["colors"]),
+                "maps": maps,
+            })
+        extents = entry["extents"]
+        model = {
+            "components": components,
+            "extents": None if extents is None else np.asarray(extents, dtype=float),
+        }
+        self._models[name] = model
+        return model
+
+
+def open_pack():
+    """The pack named by LIVINAI_ASSET_PACK, mapped once per process, or None.
+
+    A pack that cannot be used is reported once on stderr and then ignored:
+    the assets it would have served are read from their source files, which is
+    slower and otherwise the same.
+    """
+    global _PACK
+    if _PACK is not _UNOPENED:
+        return _PACK
+    _PACK = None
+    path = os.environ.get(ASSET_PACK_ENV)
+    if not path:
+        return None
+    try:
+        pack = AssetPack(path)
+        header = pack.header
+        if header.get("format") != FORMAT:
+            raise ValueError(f"format {header.get('format')}, expected {FORMAT}")
+        if header.get("compiler") != compiler_fingerprint():
+            raise ValueError("compiled by other versions of the loaders")
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        print(f"[WALK] asset pack {path} not used: {error}", file=sys.stderr)
+        return None
+    _PACK = pack
+    return pack
+
+
+def forget_pack():
+    """Unmap the pack; the next `open_pack` maps it, or its replacement, again."""
+    global _PACK
+    _PACK = _UNOPENED
+
+
+# ================= COMPILER =================
+
+
+class _PackWriter:
+    """Appends aligned arrays to a file and hashes them as it goes."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.offset = 0
+        self.digest = hashlib.sha256()
+
+    def add(self, array):
+        if array is None:
+            return None
+        array = np.ascontiguousarray(array)
+        padding = -self.offset % _ALIGN
+        if padding:
+            self.handle.write(b"\x00" * padding)
+            self.offset += padding
+        ref = {"offset": self.offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        data = array.tobytes()
+        self.handle.write(data)
+        self.digest.update(data)
+        self.offset += len(data)
+        return ref
+
+    def finish(self, header):
+        header = dict(header)
+        self.digest.update(json.dumps(header, sort_keys=True).encode())
+        header["hash"] = self.digest.hexdigest()[:16]
+        encoded = json.dumps(header, sort_keys=True, separators=(",", ":")).encode()
+        self.handle.write(encoded)
+        self.handle.write(_FOOTER.pack(len(encoded), MAGIC))
+        return header
+
+
+def compile_pack(path):
+    """Decode and parse every archviz map and catalog model into a pack at `path`.
+
+    The models are compiled at the catalog's current TEXTURE_MAX_SIZE, so run
+    this from the process that will read the pack — `render_worker.py` imports
+    the web exporter, which sets it. The file is written beside `path` and
+    renamed into place, so a process opening it never sees half a pack.
+    Returns the header.
+    """
+    global _PACK
+    import archviz_materials
+    import furniture_catalog
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    saved = _PACK
+    # Compile from the source files, never from the pack being replaced.
+    _PACK = None
+    descriptor, temporary = tempfile.mkstemp(prefix=".asset-pack-", dir=path.parent)
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            writer = _PackWriter(handle)
+            textures = {}
+            asset_ids = sorted({entry[0] for entry in archviz_materials.MATERIALS.values()})
+            names = {
+                asset_id: material
+                for material, (asset_id, *_rest) in archviz_materials.MATERIALS.items()
+            }
+            for asset_id in asset_ids:
+                for map_name in archviz_materials.MAP_NAMES:
+                    pixels = archviz_materials._map_pixels(names[asset_id], map_name)
+                    if pixels is not None:
+                        textures[f"{asset_id}/{map_name}"] = writer.add(pixels)
+
+            models = {}
+            for name in furniture_catalog.catalog_model_names():
+                source = furniture_catalog.CATALOG_ROOT / name
+                if not source.is_file():
+                    continue
+                model = furniture_catalog._catalog_model(source)
+                components = []
+                for component in model["components"]:
+                    maps = component["maps"]
+                    if maps is not None:
+                        maps = {
+                            **{key: writer.add(maps[key]) for key in ("uv", "albedo", "normal", "arm")},
+                            "roughness": maps["roughness"],
+                            "metallic": maps["metallic"],
+                        }
+                    components.append({
+                        "vertices": writer.add(component["vertices"]),
+                        "faces": writer.add(component["faces"]),
+                        "colors": writer.add(component["colors"]),
+                        "maps": maps,
+                    })
+                extents = model["extents"]
+                models[name] = {
+                    "components": components,
+                    "extents": None if extents is None else [float(value) for value in extents],
+                }
+                # Parsed models would otherwise fill the catalog cache while
+                # the compile runs; the pack is what keeps them now.
+                furniture_catalog.clear_catalog_cache()
+
+            header = writer.finish({
+                "format": FORMAT,
+                "compiler": compiler_fingerprint(),
+                "textureMaxSize": furniture_catalog.TEXTURE_MAX_SIZE,
+                "textures": textures,
+                "models": models,
+            })
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    finally:
+        _PACK = saved
+    return header
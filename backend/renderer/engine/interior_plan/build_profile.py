@@ -0,0 +1,241 @@
+"""Where an export's time and memory go, stage by stage, when asked.
+
+An export reports how many meshes and draw calls it made and nothing about the
+minutes it took. With a `BuildProfile` active, the pipeline's stages record
+their wall time, CPU time, how much resident memory they left behind and,
+where they produce geometry, their triangle count: the whole plan, each room and each
+room's furnishing, the mesh grouping and the GLB write. A new furnishing rule
+that doubles a bedroom's build then shows up as that bedroom's `furnish` span,
+not as a slower export.
+
+    with profiling(BuildProfile()) as profile:
+        ...
+    profile.summary()           # per stage and per room, JSON-ready
+    profile.chrome_trace()      # open in chrome://tracing or Perfetto
+
+Nothing is recorded, and almost nothing is spent, without an active profile:
+`stage` and `tally` hand back a shared do-nothing context.
+
+Two kinds of measurement:
+
+  stage   one span per call, nested as the calls nest. For work done a
+          handful of times — a room, a furnish, the write.
+  tally   a running total per name. For work done once per mesh, thousands
+          of times, where a span each would bury the trace.
+
+A span's memory is the resident set when it ends and its change since the
+span began, read from /proc where there is one. The process's lifetime peak
+says nothing about one stage — in a warm `--serve` worker it is the largest
+home built so far — so it is reported once, for the whole profile.
+
+Room builds that run in forked workers profile themselves and send their spans
+back with the room (see `plan_walkthrough._build_room_in_worker`); `absorb`
+puts them on the parent's timeline. `perf_counter` reads the system's
+monotonic clock, so the two processes' times line up.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so no peak memory
+    resource = None
+
+
+_ACTIVE = ContextVar("livinai_build_profile", default=None)
+_OFF = nullcontext()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _current_rss_mb():
+    """The resident set now, not its peak; None off Linux."""
+    if resource is None:
+        return None
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+class BuildProfile:
+    """The spans and tallies of one export."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.tallies = {}
+        # The largest lifetime peak of any process that recorded a span.
+        self.peak_rss_mb = None
+
+    def note_peak(self, peak_rss_mb):
+        if peak_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, peak_rss_mb)
+
+    def absorb(self, spans, peak_rss_mb=None):
+        """Add spans recorded in another process, as they were recorded."""
+        self.spans.extend(spans)
+        self.note_peak(peak_rss_mb)
+
+    def summary(self):
+        stages = {}
+        rooms = []
+        for span in self.spans:
+            total = stages.setdefault(
+                span["name"], {"count": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0}
+            )
+            total["count"] += 1
+            total["wallSeconds"] += span["wall"]
+            total["cpuSeconds"] += span["cpu"]
+            if span["rssDeltaMb"] is not None:
+                total["rssDeltaMb"] = total.get("rssDeltaMb", 0.0) + span["rssDeltaMb"]
+            if "triangles" in span["args"]:
+                total["triangles"] = total.get("triangles", 0) + span["args"]["triangles"]
+            if span["name"] == "room":
+                rooms.append({
+                    **span["args"],
+                    "wallSeconds": round(span["wall"], 4),
+                    "cpuSeconds": round(span["cpu"], 4),
+                    "rssMb": span["rssMb"],
+                    "rssDeltaMb": span["rssDeltaMb"],
+                })
+        tallies = {name: dict(total) for name, total in self.tallies.items()}
+        for total in [*stages.values(), *tallies.values()]:
+            total["wallSeconds"] = round(total["wallSeconds"], 4)
+            total["cpuSeconds"] = round(total["cpuSeconds"], 4)
+            if "rssDeltaMb" in total:
+                total["rssDeltaMb"] = round(total["rssDeltaMb"], 1)
+        return {
+            "stages": stages,
+            "tallies": tallies,
+            "rooms": sorted(rooms, key=lambda room: room.get("room", 0)),
+            "peakRssMb": self.peak_rss_mb,
+        }
+
+    def chrome_trace(self):
+        """The spans in the Trace Event Format, one track per process."""
+        events = [
+            {
+                "name": span["name"],
+                "cat": "build",
+                "ph": "X",
+                "ts": round((span["start"] - self.origin) * 1e6, 1),
+                "dur": round(span["wall"] * 1e6, 1),
+                "pid": span["pid"],
+                "tid": span["pid"],
+                "args": {
+                    **span["args"],
+                    "cpuSeconds": round(span["cpu"], 4),
+                    "rssMb": span["rssMb"],
+                    "rssDeltaMb": span["rssDeltaMb"],
+                },
+            }
+            for span in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.chrome_trace(), handle, separators=(",", ":"))
+
+
+@contextmanager
+def profiling(profile):
+    """Make `profile` the active profile for the length of the block."""
+    token = _ACTIVE.set(profile)
+    try:
+        yield profile
+    finally:
+        _ACTIVE.reset(token)
+
+
+def active_profile():
+    """The active profile, or None."""
+    return _ACTIVE.get()
+
+
+class _Span:
+    def __init__(self, profile, name, args):
+        self.profile = profile
+        self.record = {"name": name, "args": args, "pid": os.getpid()}
+
+    def __enter__(self):
+        self._rss = _current_rss_mb()
+        self.record["start"] = time.perf_counter()
+        self._cpu = time.process_time()
+        return self.record["args"]
+
+    def __exit__(self, *exc):
+        record = self.record
+        record["wall"] = time.perf_counter() - record["start"]
+        record["cpu"] = time.process_time() - self._cpu
+        rss = _current_rss_mb()
+        record["rssMb"] = None if rss is None else round(rss, 1)
+        record["rssDeltaMb"] = (
+            None if rss is None or self._rss is None else round(rss - self._rss, 1)
+        )
+        self.profile.note_peak(_peak_rss_mb())
+        self.profile.spans.append(record)
+        return False
+
+
+def stage(name, **args):
+    """Record one span. Yields its args, to add counts found along the way."""
+    profile = _ACTIVE.get()
+    if profile is None:
+        return _OFF
+    return _Span(profile, name, args)
+
+
+class _Tally:
+    def __init__(self, total):
+        self.total = total
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def __exit__(self, *exc):
+        total = self.total
+        total["count"] += 1
+        total["wallSeconds"] += time.perf_counter() - self._wall
+        total["cpuSeconds"] += time.process_time() - self._cpu
+        return False
+
+
+def tally(name):
+    """Add the block's time to a running total for `name`."""
+    profile = _ACTIVE.get()
+    if profile is None:
+        return _OFF
+    total = profile.tallies.get(name)
+    if total is None:
+        total = profile.tallies[name] = {"count": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0}
+    return _Tally(total)
+
+
+def triangle_count(meshes):
+    """Triangles across Open3D meshes, each distinct mesh counted once."""
+    seen = set()
+    count = 0
+    for mesh in meshes:
+        if id(mesh) not in seen:
+            seen.add(id(mesh))
+            count += len(mesh.triangles)
+    return count
@@ -14,13 +14,18 @@ https://github.com/KhronosGroup/glTF-Sample-Assets (CC BY 4.0 asset noted below)
 
 from __future__ import annotations
 
-import copy
 import importlib
+import os
 import sys
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
 import open3d as o3d
+from PIL import Image
+
+import asset_pack
 
 
 ROOT = Path(__file__).resolve().parent
@@ -160,9 +165,97 @@ MODERN_STYLE_WORDS = {
 CLASSIC_STYLE_WORDS = {"classic", "traditional"}
 BOHO_STYLE_WORDS = {"bohemian", "boho"}
 
-_MESH_CACHE = {}
-_PBR_CACHE = {}
-_PBR_MESH_MATERIALS = {}
+#: Bytes of parsed models and coordinated textures one process keeps. A warm
+#: worker exports home after home in every style and palette; without a bound
+#: the catalog alone grew until the container hit its memory limit.
+CATALOG_CACHE_BYTES = int(
+    float(os.environ.get("LIVINAI_CATALOG_CACHE_MB", "256")) * 1024 * 1024
+)
+
+
+class _LRUCache:
+    """Least-recently-used values, evicted once they pass a byte budget."""
+
+    def __init__(self, budget):
+        self.budget = int(budget)
+        self.bytes = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value):
+        if key in self._items:
+            self.bytes -= self._items.pop(key)[1]
+        if self.budget <= 0:
+            return value
+        size = _nbytes(value)
+        self._items[key] = (value, size)
+        self.bytes += size
+        # The newest entry stays even when it alone is over budget: the caller
+        # is about to use it, and dropping it would only parse it again.
+        while self.bytes > self.budget and len(self._items) > 1:
+            _key, (_value, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+        return value
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+
+# Parsed models, one per file, and coordinated albedo per model, palette and
+# strength. A placement only scales the first and reuses the second, so a room
+# with six of the same dining chair parses and recolors it once.
+_CATALOG_CACHE = _LRUCache(CATALOG_CACHE_BYTES)
+
+#: The longest texture edge anything downstream keeps, or None to keep
+#: textures as authored. The desktop walkthrough renders the authored 1K maps;
+#: the web exporter keeps 256 pixels and sets this to that on import. Maps are
+#: then brought down to it when a model is parsed, so recoloring — float math
+#: over every pixel, per palette — and the cache both work on the small image.
+TEXTURE_MAX_SIZE = None
+
+
+def downsample_texture(pixels, max_size):
+    """RGB `pixels` with the longer edge at most `max_size`, LANCZOS-filtered.
+
+    The web exporter's own resize; both sides call this one, so a map brought
+    down here has exactly the size and pixels the exporter would have made.
+    """
+    if pixels is None or max_size is None:
+        return pixels
+    height, width = pixels.shape[:2]
+    if max(width, height) <= max_size:
+        return pixels
+    scale = max_size / max(width, height)
+    resized = Image.fromarray(pixels).resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        Image.Resampling.LANCZOS,
+    )
+    return np.ascontiguousarray(np.asarray(resized, dtype=np.uint8))
+
+
+# Each placed catalog mesh's authored PBR spec, keyed weakly by the mesh so the
+# entry goes when the mesh does. See archviz_materials._MESH_MATERIALS.
+_PBR_MESH_MATERIALS = weakref.WeakKeyDictionary()
 
 
 def _load_trimesh_scene(path):
@@ -290,39 +383,26 @@ def _image_pixels(image):
     return np.ascontiguousarray(pixels[:, :, :3])
 
 
-def _authored_texture(
-    source,
-    target_color,
-    professional=False,
-    coordination_strength=None,
-):
-    """Return the model's mapped albedo and UVs, retaining real material detail."""
+def _authored_maps(source):
+    """Return the model's mapped PBR maps and UVs, exactly as authored."""
     visual = getattr(source, "visual", None)
     material = getattr(visual, "material", None)
     uv = getattr(visual, "uv", None)
     if material is None or uv is None:
-        return None, None, None
+        return None
 
     image = getattr(material, "baseColorTexture", None)
     if image is None:
         image = getattr(material, "image", None)
     if image is None:
-        return None, None, None
+        return None
 
     pixels = _image_pixels(image)
     if pixels is None:
-        return None, None, None
-    coordinated = _coordinate_material(
-        pixels[:, :, :3].astype(np.float32) / 255.0,
-        target_color,
-        professional=professional,
-        coordination_strength=coordination_strength,
-    )
-    texture = np.ascontiguousarray(
-        np.clip(np.rint(coordinated * 255.0), 0, 255).astype(np.uint8)
-    )
-    pbr = {
-        "albedo": texture,
+        return None
+    maps = {
+        "uv": np.asarray(uv, dtype=float),
+        "albedo": pixels,
         "normal": _image_pixels(getattr(material, "normalTexture", None)),
         "arm": None,
         "roughness": float(
@@ -343,16 +423,193 @@ def _authored_texture(
             if occlusion is not None and occlusion.shape[:2] == arm.shape[:2]
             else 255
         )
-        pbr["arm"] = arm
-    return np.asarray(uv, dtype=float), texture, pbr
+        maps["arm"] = arm
+    return maps
+
+
+def _coordinated_texture(
+    pixels,
+    target_color,
+    professional=False,
+    coordination_strength=None,
+):
+    """Recolor an authored albedo toward the palette, retaining its detail."""
+    coordinated = _coordinate_material(
+        pixels[:, :, :3].astype(np.float32) / 255.0,
+        target_color,
+        professional=professional,
+        coordination_strength=coordination_strength,
+    )
+    return np.ascontiguousarray(
+        np.clip(np.rint(coordinated * 255.0), 0, 255).astype(np.uint8)
+    )
+
+
+def _catalog_model(path):
+    """Parse one catalog file into walkthrough axes, once per process.
+
+    Vertices are stored relative to the model's minimum corner, with its
+    extents beside them, so fitting it to a footprint is one multiply. Colors
+    and textures are stored as authored, textures at no more than
+    TEXTURE_MAX_SIZE; palette coordination happens per placement, on top.
+
+    With an asset pack open the model is the pack's, mapped rather than parsed
+    and kept by the pack rather than the cache: its pages are the OS's to keep
+    or drop, and forked builders share them.
+    """
+    pack = asset_pack.open_pack()
+    if pack is not None:
+        try:
+            name = Path(path).relative_to(CATALOG_ROOT).as_posix()
+        except ValueError:
+            name = None
+        model = pack.model(name, TEXTURE_MAX_SIZE) if name is not None else None
+        if model is not None:
+            return model
+    key = ("model", str(path), TEXTURE_MAX_SIZE)
+    model = _CATALOG_CACHE.get(key)
+    if model is not None:
+        return model
+
+    scene = _load_trimesh_scene(path)
+    components = []
+    for source in scene.dump(concatenate=False):
+        source_vertices = np.asarray(source.vertices, dtype=float)
+        if len(source_vertices) == 0 or len(source.faces) == 0:
+            continue
+        # Native GLB: X width, Y up, Z front/back. Walkthrough: X width,
+        # Z up, +Y front. The sign change makes the authored front face +Y.
+        vertices = np.column_stack(
+            (-source_vertices[:, 0], source_vertices[:, 2], source_vertices[:, 1])
+        )
+        maps = _authored_maps(source)
+        if maps is not None:
+            for name in ("albedo", "normal", "arm"):
+                maps[name] = downsample_texture(maps[name], TEXTURE_MAX_SIZE)
+        colors = None
+        if maps is None or len(maps["uv"]) != len(source_vertices):
+            maps = None
+            color_visual = source.visual.to_color()
+            colors = np.asarray(
+                getattr(color_visual, "vertex_colors", [184, 184, 184, 255]),
+                dtype=float,
+            )
+            if colors.ndim == 1:
+                colors = colors.reshape(1, -1)
+            colors = colors[:, :3]
+            if colors.max(initial=0.0) > 1.0:
+                colors /= 255.0
+            if len(colors) != len(source_vertices):
+                average = np.mean(colors, axis=0, keepdims=True)
+                colors = np.repeat(average, len(source_vertices), axis=0)
+        components.append({
+            "vertices": vertices,
+            "faces": np.asarray(source.faces, dtype=np.int32),
+            "colors": colors,
+            "maps": maps,
+        })
+    if not components:
+        model = {"components": [], "extents": None}
+    else:
+        source_min = np.vstack(
+            [component["vertices"] for component in components]
+        ).min(axis=0)
+        source_max = np.vstack(
+            [component["vertices"] for component in components]
+        ).max(axis=0)
+        for component in components:
+            component["vertices"] = component["vertices"] - source_min
+        model = {"components": components, "extents": source_max - source_min}
+    return _CATALOG_CACHE.put(key, model)
+
+
+def _coordinated_pbr(
+    path,
+    index,
+    maps,
+    material_key,
+    target_color,
+    professional,
+    coordination_strength,
+):
+    """The placed PBR spec for one textured component, shared per palette."""
+    key = (
+        "pbr", str(path), index, material_key,
+        round(coordination_strength, 2), professional, TEXTURE_MAX_SIZE,
+    )
+    pbr = _CATALOG_CACHE.get(key)
+    if pbr is not None:
+        return pbr
+    pbr = {
+        "albedo": _coordinated_texture(
+            maps["albedo"],
+            target_color,
+            professional=professional,
+            coordination_strength=coordination_strength,
+        ),
+        "normal": maps["normal"],
+        "arm": maps["arm"],
+        "roughness": maps["roughness"],
+        "metallic": maps["metallic"],
+    }
+    return _CATALOG_CACHE.put(key, pbr)
+
+
+def clear_catalog_cache():
+    """Drop every parsed model and coordinated texture."""
+    _CATALOG_CACHE.clear()
+
+
+def catalog_model_names():
+    """Every catalog file a style can ask for, relative to CATALOG_ROOT."""
+    return sorted({
+        name
+        for mapping in (DEFAULT_MODELS, MODERN_MODELS, BOHO_MODELS, CLASSIC_MODELS)
+        for name in mapping.values()
+        if name is not None
+    })
+
+
+def preload_catalog():
+    """Parse every installed catalog model ahead of the first build.
+
+    For a long-lived process that forks its builders afterwards (see
+    `render_worker.py --serve`): each fork starts with the parsed models in
+    memory it shares with its parent, rather than parsing them again per
+    export. Stops at the cache budget, since a model past it would only evict
+    one before it. A model that fails to parse is skipped here and fails again,
+    visibly, in the build that asks for it. Returns how many models are held.
+    """
+    pack = asset_pack.open_pack()
+    if pack is not None and pack.texture_max_size == TEXTURE_MAX_SIZE:
+        # The pack's models are mapped already, and the forks share its pages.
+        return len(_CATALOG_CACHE)
+    for name in catalog_model_names():
+        path = CATALOG_ROOT / name
+        if not path.is_file():
+            continue
+        held = len(_CATALOG_CACHE)
+        try:
+            _catalog_model(path)
+        except Exception:
+            continue
+        if len(_CATALOG_CACHE) <= held:
+            break
+    return len(_CATALOG_CACHE)
+
+
+def _catalog_spec(mesh):
+    try:
+        return _PBR_MESH_MATERIALS.get(mesh)
+    except TypeError:  # not a mesh that can be registered at all
+        return None
 
 
 def catalog_material_record_for_mesh(mesh):
     """Return the catalog model's complete glTF PBR material, when available."""
-    registered = _PBR_MESH_MATERIALS.get(id(mesh))
-    if registered is None or registered[0] is not mesh:
+    spec = _catalog_spec(mesh)
+    if spec is None:
         return None
-    spec = registered[1]
     from open3d.visualization import rendering
 
     record = rendering.MaterialRecord()
@@ -369,20 +626,19 @@ def catalog_material_record_for_mesh(mesh):
     return record
 
 
+def copy_catalog_material(source, target):
+    """Give `target` the catalog PBR material registered for `source`, if any."""
+    spec = _catalog_spec(source)
+    if spec is not None:
+        _PBR_MESH_MATERIALS[target] = spec
+    return target
+
+
 def catalog_status() -> tuple[bool, str]:
     """Return whether every required native model is installed."""
-    required = {
-        name
-        for mapping in (
-            DEFAULT_MODELS,
-            MODERN_MODELS,
-            BOHO_MODELS,
-            CLASSIC_MODELS,
-        )
-        for name in mapping.values()
-        if name is not None
-    }
-    missing = sorted(name for name in required if not (CATALOG_ROOT / name).is_file())
+    missing = [
+        name for name in catalog_model_names() if not (CATALOG_ROOT / name).is_file()
+    ]
     if missing:
         return False, "Local 3D catalog is missing: " + ", ".join(missing)
     return True, "Professional local editable 3D catalog is ready."
@@ -425,118 +681,59 @@ def load_catalog_asset(
         tuple(np.round(material_target, 3))
         if material_target is not None else ()
     )
-    cache_key = (
-        str(path), round(float(width), 3), round(float(depth), 3),
-        round(height, 3), material_key, round(coordination_strength, 2),
-    )
-    if cache_key in _MESH_CACHE:
-        meshes = [copy.deepcopy(mesh) for mesh in _MESH_CACHE[cache_key]]
-        for mesh, spec in zip(meshes, _PBR_CACHE.get(cache_key, [])):
-            if spec is not None:
-                _PBR_MESH_MATERIALS[id(mesh)] = (mesh, spec)
-        return meshes
-
-    scene = _load_trimesh_scene(path)
-    source_components = list(scene.dump(concatenate=False))
-    if not source_components:
+    model = _catalog_model(path)
+    source_extents = model["extents"]
+    if source_extents is None or np.any(source_extents < 1e-6):
         return None
+    professional = PRO_ROOT in path.parents
 
-    component_data = []
-    for source in source_components:
-        source_vertices = np.asarray(source.vertices, dtype=float)
-        if len(source_vertices) == 0 or len(source.faces) == 0:
-            continue
-        # Native GLB: X width, Y up, Z front/back. Walkthrough: X width,
-        # Z up, +Y front. The sign change makes the authored front face +Y.
-        vertices = np.column_stack(
-            (-source_vertices[:, 0], source_vertices[:, 2], source_vertices[:, 1])
-        )
-        professional = PRO_ROOT in path.parents
-        uv, texture, pbr = _authored_texture(
-            source,
-            material_target,
-            professional=professional,
-            coordination_strength=coordination_strength,
-        )
-        if uv is not None and len(uv) == len(source_vertices):
+    target_extents = np.array([float(width), float(depth), height])
+    scale = target_extents / np.maximum(source_extents, 1e-6)
+    center_xy = target_extents[:2] / 2
+    meshes = []
+    for index, component in enumerate(model["components"]):
+        faces = component["faces"]
+        normalized = component["vertices"] * scale
+        normalized[:, 0] -= center_xy[0]
+        normalized[:, 1] -= center_xy[1]
+        maps = component["maps"]
+        pbr = None
+        if maps is not None:
+            pbr = _coordinated_pbr(
+                path,
+                index,
+                maps,
+                material_key,
+                material_target,
+                professional,
+                coordination_strength,
+            )
             # White vertex colors let the mapped albedo reach both the legacy
             # walkthrough and the modern PBR renderer without a second tint.
-            vertex_colors = np.ones((len(source_vertices), 3), dtype=float)
+            colors = np.ones((len(normalized), 3), dtype=float)
         else:
-            uv, texture, pbr = None, None, None
-            color_visual = source.visual.to_color()
-            vertex_colors = np.asarray(
-                getattr(color_visual, "vertex_colors", [184, 184, 184, 255]),
-                dtype=float,
-            )
-            if vertex_colors.ndim == 1:
-                vertex_colors = vertex_colors.reshape(1, -1)
-            vertex_colors = vertex_colors[:, :3]
-            if vertex_colors.max(initial=0.0) > 1.0:
-                vertex_colors /= 255.0
-            if len(vertex_colors) != len(source_vertices):
-                average = np.mean(vertex_colors, axis=0, keepdims=True)
-                vertex_colors = np.repeat(
-                    average, len(source_vertices), axis=0
-                )
-            vertex_colors = _coordinate_material(
-                vertex_colors,
+            colors = _coordinate_material(
+                component["colors"],
                 material_target,
                 professional=professional,
                 coordination_strength=coordination_strength,
             )
-        component_data.append(
-            (
-                vertices,
-                np.asarray(source.faces, dtype=np.int32),
-                vertex_colors,
-                uv,
-                texture,
-                pbr,
-            )
-        )
-    if not component_data:
-        return None
-
-    all_vertices = np.vstack([
-        vertices
-        for vertices, _faces, _color, _uv, _texture, _pbr in component_data
-    ])
-    source_min = all_vertices.min(axis=0)
-    source_max = all_vertices.max(axis=0)
-    source_extents = source_max - source_min
-    if np.any(source_extents < 1e-6):
-        return None
-
-    target_extents = np.array([float(width), float(depth), height])
-    scale = target_extents / np.maximum(source_extents, 1e-6)
-    center_xy = target_extents[:2] / 2
-    meshes = []
-    pbr_specs = []
-    for vertices, faces, colors, uv, texture, pbr in component_data:
-        normalized = (vertices - source_min) * scale
-        normalized[:, 0] -= center_xy[0]
-        normalized[:, 1] -= center_xy[1]
         mesh = o3d.geometry.TriangleMesh()
         mesh.vertices = o3d.utility.Vector3dVector(normalized)
         mesh.triangles = o3d.utility.Vector3iVector(faces)
         mesh.vertex_colors = o3d.utility.Vector3dVector(
             np.clip(colors, 0, 1)
         )
-        if uv is not None and texture is not None:
-            triangle_uvs = uv[faces].reshape((-1, 2))
+        if pbr is not None:
+            triangle_uvs = maps["uv"][faces].reshape((-1, 2))
             mesh.triangle_uvs = o3d.utility.Vector2dVector(triangle_uvs)
             mesh.triangle_material_ids = o3d.utility.IntVector(
                 np.zeros(len(faces), dtype=np.int32)
             )
-            mesh.textures = [o3d.geometry.Image(texture)]
+            mesh.textures = [o3d.geometry.Image(pbr["albedo"])]
         mesh.compute_vertex_normals()
         _shade_materials(mesh)
         if pbr is not None:
-            _PBR_MESH_MATERIALS[id(mesh)] = (mesh, pbr)
-        pbr_specs.append(pbr)
+            _PBR_MESH_MATERIALS[mesh] = pbr
         meshes.append(mesh)
-
-    _MESH_CACHE[cache_key] = [copy.deepcopy(mesh) for mesh in meshes]
-    _PBR_CACHE[cache_key] = pbr_specs
-    return meshes
+    return meshes or None
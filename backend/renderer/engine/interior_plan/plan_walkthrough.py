@@ -20,16 +20,20 @@ Standalone demo:     python plan_walkthrough.py          (interactive)
                      verification screenshots and exits)
 """
 
+import copy
 import hashlib
+import json
 import math
 import os
 import random
 import statistics
 import time
+from collections import OrderedDict
 from contextvars import ContextVar
 
 import numpy as np
 import open3d as o3d
+import shapely
 from shapely.geometry import LineString, Point, Polygon, box as shp_box
 from shapely.ops import unary_union
 from shapely import affinity
@@ -51,6 +55,14 @@ from archviz_materials import (
     material_record_for_mesh,
     wall_material,
 )
+from build_profile import (
+    BuildProfile,
+    active_profile,
+    profiling,
+    stage,
+    tally,
+    triangle_count,
+)
 
 # ================= WALKTHROUGH CONFIG (real-world scale) =================
 WALL_H = 2.8               # ceiling height (m)
@@ -676,6 +688,30 @@ def footprint_poly(pos, yaw, w, d):
     return affinity.translate(fp, pos[0], pos[1])
 
 
+def footprint_polys(positions, yaw, w, d):
+    """`footprint_poly` at every row of `positions`, as an array of polygons.
+
+    The rotation does not depend on the position, so the box is rotated once,
+    by the same call, and only the translation is repeated. Translating by
+    (x, y) adds x and y to each corner, which is all `affinity.translate` does
+    too, so each polygon has exactly the corners `footprint_poly` gives it.
+    """
+    corners = shapely.get_coordinates(affinity.rotate(
+        shp_box(-w / 2, -d / 2, w / 2, d / 2), yaw, origin=(0, 0),
+        use_radians=True,
+    ))
+    positions = np.asarray(positions, dtype=float).reshape(-1, 1, 2)
+    return shapely.polygons(corners[np.newaxis] + positions)
+
+
+def _intersecting_any(geometries, zones):
+    """Which of `geometries` intersect at least one of `zones`."""
+    hit = np.zeros(len(geometries), dtype=bool)
+    if len(geometries) and zones:
+        hit[shapely.STRtree(zones).query(geometries, predicate="intersects")[0]] = True
+    return hit
+
+
 # ================= FURNITURE BUILDERS (local frame) =================
 # Every builder returns (meshes, w, d). Local frame: footprint centered on
 # the origin, w along X, d along Y, furniture FACES +Y, floor at z=0.
@@ -3370,8 +3406,42 @@ class RoomFurnisher:
         mid = (np.array(p1) + np.array(p2)) / 2
         return n if self.poly.contains(Point(*(mid + n * 0.3))) else -n
 
+    def _slot_table(self, kind, build):
+        """The wall runs `build` finds, worked out once per room and kind.
+
+        Every furnishing strategy asks for the free walls, most of them several
+        times, and the answer only changes when an opening is cut into an edge
+        — which the exporter does while it lays out doors and windows, in place,
+        on the same edge dicts. The table is keyed on the openings themselves,
+        so a cut made after the first call is seen on the next one, and
+        `invalidate_wall_slots` drops it outright for anything else that
+        reshapes the edges.
+
+        Callers get their own list, which some of them sort; the slots in it
+        are shared, and are only ever copied before being adjusted.
+        """
+        signature = (
+            id(self.poly),
+            tuple(
+                (id(e), tuple(e.get("openings", ())))
+                for e in self.edges
+            ),
+        )
+        tables = self.__dict__.setdefault("_wall_slot_tables", {})
+        cached = tables.get(kind)
+        if cached is None or cached[0] != signature:
+            cached = tables[kind] = (signature, build())
+        return list(cached[1])
+
+    def invalidate_wall_slots(self):
+        """Forget every cached slot table; see `_slot_table`."""
+        self.__dict__.pop("_wall_slot_tables", None)
+
     def wall_slots(self):
         """Free wall runs (no door/window), longest first."""
+        return self._slot_table("solid", self._free_wall_runs)
+
+    def _free_wall_runs(self):
         slots = []
         for e in self.edges:
             L = e["length"]
@@ -3411,7 +3481,7 @@ class RoomFurnisher:
     def _candidate_clear(self, fp):
         """Check a proposed template footprint without changing scene state."""
         return (
-            fp.within(self.inset)
+            self._inside(fp, self.inset)
             and not any(fp.intersects(zone) for zone in self.door_zones)
         )
 
@@ -3591,83 +3661,124 @@ class RoomFurnisher:
         if preferred is not None:
             points.append((float(preferred[0]), float(preferred[1])))
 
-        best = None
-        for x, y in points:
-            position = np.array([x, y], dtype=float)
-            for yaw in unique_yaws:
-                fp = footprint_poly(position, yaw, width, depth)
-                if not fp.within(safe_room):
-                    continue
-                if any(fp.intersects(zone) for zone in self.door_zones):
-                    continue
-                if any(fp.intersects(zone) for zone in forbid):
-                    continue
-                if any(fp.intersects(placed) for placed in self.placed):
-                    continue
-                if beside is not None:
-                    # Next to the seating, and the closer the better once the
-                    # hard checks above have guaranteed it is not touching it.
-                    # No reward for clearance from walls or from furniture: in a
-                    # room that already contains a sofa, both of those point at
-                    # the middle of the floor, which is the walkway.
-                    gap = float(fp.distance(beside))
-                    score = -gap * 2.40
-                else:
-                    boundary_clearance = fp.distance(self.poly.boundary)
-                    placed_clearance = min(
-                        (fp.distance(placed) for placed in self.placed),
-                        default=0.0,
-                    )
-                    # Clearance is circulation, not distance for its own sake.
-                    # This used to be `placed_clearance * 2.0` uncapped, which
-                    # paid a group to keep retreating: every extra metre between
-                    # the dining zone and the sofa scored, so the table ended up
-                    # against the far wall with a void in the middle. Anything
-                    # past a comfortable walking gap adds nothing.
-                    score = (
-                        boundary_clearance * 1.2
-                        + min(placed_clearance, 0.90) * 2.0
-                    )
-                # Standing back from the way in and the way through, rather than
-                # merely outside them. The hard veto above only says the table
-                # is not *in* the doorway; a table one centimetre outside the
-                # zone is still the thing you edge past with the shopping. Worth
-                # up to a metre and a half of distance, and nothing beyond that.
-                if clear_of:
-                    room_to_move = min(
-                        (float(fp.distance(zone)) for zone in clear_of),
-                        default=1.5,
-                    )
-                    score += min(room_to_move, 1.5) * 1.80
+        # Every candidate is built, vetoed and measured in batches — one array
+        # of footprints per yaw, one GEOS call per test — rather than one
+        # Python round trip per candidate per test, which in an open-plan room
+        # was thousands of them per dining group. The footprints are the ones
+        # `footprint_poly` makes, the tests and distances are the same GEOS
+        # calls, and the score is the same arithmetic in the same order, so
+        # this picks exactly the pose the one-at-a-time loop picked, ties
+        # included: point by point, yaw by yaw, first best wins.
+        #
+        # There is deliberately no coarse pass. Every test is a hard veto, and
+        # the comment on `spacing` above is what happens when a search looks at
+        # fewer points: the one strip of legal floor falls between them.
+        positions = np.asarray(points, dtype=float)
+        footprints = np.stack(
+            [footprint_polys(positions, yaw, width, depth) for yaw in unique_yaws],
+            axis=1,
+        ).reshape(-1)
+        shapely.prepare(safe_room)
+        legal = shapely.contains(safe_room, footprints)
+        for zones in (self.door_zones, list(forbid), self.placed):
+            remaining = np.flatnonzero(legal)
+            legal[remaining[_intersecting_any(footprints[remaining], zones)]] = False
+        survivors = np.flatnonzero(legal)
+        if not len(survivors):
+            return None
+        candidates = footprints[survivors]
+        if beside is not None:
+            gaps = shapely.distance(candidates, beside)
+        else:
+            boundary_clearances = shapely.distance(candidates, self.poly.boundary)
+            if self.placed:
+                placed_clearances = shapely.distance(
+                    candidates[:, np.newaxis],
+                    np.asarray(self.placed, dtype=object)[np.newaxis],
+                ).min(axis=1)
+        if clear_of:
+            rooms_to_move = shapely.distance(
+                candidates[:, np.newaxis],
+                np.asarray(list(clear_of), dtype=object)[np.newaxis],
+            ).min(axis=1)
+        centroids = [
+            np.array([placed.centroid.x, placed.centroid.y])
+            for placed in self.placed
+        ]
+
+        # Everything below depends on the point alone, so it is worked out once
+        # per point rather than once per yaw.
+        point_terms = {}
+
+        def point_term(index):
+            if index not in point_terms:
+                position = np.array(points[index], dtype=float)
+                term = 0.0
                 if beside is None and self.placed:
                     nearest = min(
-                        np.linalg.norm(
-                            position
-                            - np.array(
-                                [placed.centroid.x, placed.centroid.y]
-                            )
-                        )
-                        for placed in self.placed
+                        np.linalg.norm(position - centroid)
+                        for centroid in centroids
                     )
                     # And the room should read as one arrangement. The old rule
                     # deliberately pushed the dining zone away from the
                     # conversation group, which is how a table ends up marooned
-                    # at the other end of the room from everything else. Sitting
-                    # near the furniture is free; drifting past about 3.2 m from
-                    # the nearest group costs.
-                    score -= max(0.0, float(nearest) - 3.20) * 0.90
+                    # at the other end of the room from everything else.
+                    # Sitting near the furniture is free; drifting past about
+                    # 3.2 m from the nearest group costs.
+                    term = max(0.0, float(nearest) - 3.20) * 0.90
                 if preferred is not None:
-                    score -= np.linalg.norm(
+                    pull = np.linalg.norm(
                         position - np.asarray(preferred, dtype=float)
                     ) * 0.16
                 else:
-                    score -= np.linalg.norm(position - self.centroid) * 0.05
-                score -= self._door_sightline_penalty(position, width, depth)
-                if best is None or score > best[0]:
-                    best = (score, position, yaw, fp)
-        if best is None:
-            return None
-        return dict(pos=best[1], yaw=best[2], footprint=best[3])
+                    pull = np.linalg.norm(position - self.centroid) * 0.05
+                point_terms[index] = (
+                    position,
+                    term,
+                    pull,
+                    self._door_sightline_penalty(position, width, depth),
+                )
+            return point_terms[index]
+
+        best = None
+        for row, candidate in enumerate(survivors):
+            point, yaw_index = divmod(int(candidate), len(unique_yaws))
+            if beside is not None:
+                # Next to the seating, and the closer the better once the
+                # hard checks above have guaranteed it is not touching it.
+                # No reward for clearance from walls or from furniture: in a
+                # room that already contains a sofa, both of those point at
+                # the middle of the floor, which is the walkway.
+                score = -float(gaps[row]) * 2.40
+            else:
+                placed_clearance = (
+                    float(placed_clearances[row]) if self.placed else 0.0
+                )
+                # Clearance is circulation, not distance for its own sake.
+                # This used to be `placed_clearance * 2.0` uncapped, which
+                # paid a group to keep retreating: every extra metre between
+                # the dining zone and the sofa scored, so the table ended up
+                # against the far wall with a void in the middle. Anything
+                # past a comfortable walking gap adds nothing.
+                score = (
+                    float(boundary_clearances[row]) * 1.2
+                    + min(placed_clearance, 0.90) * 2.0
+                )
+            # Standing back from the way in and the way through, rather than
+            # merely outside them. The hard veto above only says the table
+            # is not *in* the doorway; a table one centimetre outside the
+            # zone is still the thing you edge past with the shopping. Worth
+            # up to a metre and a half of distance, and nothing beyond that.
+            if clear_of:
+                score += min(float(rooms_to_move[row]), 1.5) * 1.80
+            position, term, pull, sightline = point_term(point)
+            if beside is None and self.placed:
+                score -= term
+            score -= pull
+            score -= sightline
+            if best is None or score > best[0]:
+                best = (score, position, unique_yaws[yaw_index], candidate)
+        return dict(pos=best[1], yaw=best[2], footprint=footprints[best[3]])
 
     def place_dining_zone(self, position=None, yaw=None, compact=False,
                           guarantee=False):
@@ -3814,8 +3925,25 @@ class RoomFurnisher:
 
         return sorted(slots, key=score, reverse=True)
 
+    # ---- collision lookups ----
+    #
+    # Every candidate pose is first tested for lying inside the room, and a
+    # large living room tries hundreds of poses per item. Containment in a
+    # prepared polygon gives the same answer as `within` several times faster.
+    # The door zones and placed footprints are still scanned in order: an
+    # STRtree over them was measured slower than the scan up to ninety
+    # footprints, because one query costs as much as forty intersects calls.
+
+    def _inside(self, fp, area):
+        """`fp.within(area)`, against a prepared copy of a reused area."""
+        prepared = self.__dict__.get("_prepared_area")
+        if prepared is None or prepared[0] is not area:
+            prepared = (area, prep(area))
+            self._prepared_area = prepared
+        return prepared[1].contains(fp)
+
     def _ok(self, fp, block=True, avoid_doors=True):
-        if not fp.within(self.inset):
+        if not self._inside(fp, self.inset):
             return False
         if avoid_doors and any(fp.intersects(z) for z in self.door_zones):
             return False
@@ -5270,6 +5398,474 @@ def _configure_pbr_lighting(open3d_scene, lights):
             print(f"[WALK] Room light {index + 1} unavailable: {exc}")
 
 
+def build_room(room, edges, config=None, furnished=True, plan_facts=None,
+               kitchen_center=None):
+    """One room's floor, ceiling, walls, finishes and furniture.
+
+    `plan_facts` are the whole-plan answers `build_scene` works out once —
+    whether the plan has a dining room, whether this is the room that eats —
+    and are handed to the furnisher only; the shell never reads them.
+
+    Returns dict with: meshes, footprints, objects (editable furniture groups),
+    poly, lights, floor_color.
+    """
+    cfg = config or {}
+    style = cfg.get("style", "Modern")
+    rtype = cfg.get("room_type", "Living Room")
+    P = get_palette(style, cfg)
+
+    poly = Polygon([(p[0], p[1]) for p in room])
+    if not poly.is_valid:
+        poly = poly.buffer(0)
+    meshes = []
+
+    # floor + ceiling in the room's style
+    floor = _orient_horizontal_surface(
+        floor_mesh(room, P["floor"]),
+        upward=True,
+    )
+    selected_floor_material = floor_material(cfg, rtype, style)
+    minx, miny, maxx, maxy = poly.bounds
+    apply_archviz_material(
+        floor,
+        selected_floor_material,
+        tint=P["floor"],
+        tint_strength=(
+            0.30
+            if selected_floor_material == "bathroom_tile"
+            else 0.16
+        ),
+        # Keep UVs inside one authored texture tile in the PBR renderer;
+        # the source maps already contain a complete board/tile layout.
+        repeat_m=max(maxx - minx, maxy - miny, 1.0),
+        # The tile normal map can expose the room's two triangulation
+        # faces under strong indirect light. Its albedo and calibrated
+        # roughness retain the realistic surface without those facets.
+        detail_maps=selected_floor_material != "bathroom_tile",
+    )
+    meshes.append(floor)
+    ceil = _orient_horizontal_surface(
+        floor_mesh(room, P.get("ceiling", CEILING_COLOR)),
+        upward=False,
+    )
+    ceil.translate((0, 0, WALL_H))
+    meshes.append(ceil)
+
+    selected_wall_material = wall_material(cfg, rtype, style)
+    meshes.extend(build_walls(
+        edges,
+        P["wall"],
+        trim_color=_mix_color(P["wood_dark"], P["wall"], 0.52),
+    ))
+    meshes.extend(build_wall_finish_skins(
+        room,
+        edges,
+        P["wall"],
+        selected_wall_material,
+    ))
+    meshes.extend(build_room_trim(room, edges, P, cfg))
+    if cfg.get("whole_room_design", True):
+        meshes.extend(build_room_design_surfaces(
+            room, edges, P, cfg
+        ))
+
+    footprints = []
+    objects = []
+    if furnished:
+        cfg = dict(cfg)
+        cfg.setdefault("room_type", rtype)
+        cfg.setdefault("style", style)
+        cfg.update(plan_facts or {})
+        furnisher = RoomFurnisher(room, edges, P, cfg)
+        if kitchen_center is not None:
+            furnisher._kitchen_position = kitchen_center
+        with stage("furnish", roomType=rtype) as span:
+            fm, footprints = furnisher.furnish(rtype)
+            if span is not None:
+                span["triangles"] = triangle_count(fm)
+        meshes.extend(fm)
+        objects = furnisher.editable_objects
+
+    return dict(
+        meshes=meshes,
+        footprints=list(footprints),
+        objects=list(objects),
+        poly=poly,
+        lights=_room_light_specs(poly, config or {}),
+        floor_color=list(P["floor"]),
+    )
+
+
+# ================= PER-ROOM BUILD CACHE =================
+# Someone adjusting finishes re-exports the same home several times in a row,
+# and each export used to furnish every room again although only one of them
+# changed. A room's build depends on its own polygon, its edges and the openings
+# cut into them, its configuration, and a handful of whole-plan facts — so a
+# finished room is kept, keyed by exactly those, and handed back as a fresh copy
+# when the next export asks for the same room. Copies, because the exporter
+# carves and re-materials meshes in place after `build_scene` returns.
+
+#: Finished rooms one process keeps. 0 turns the cache off.
+ROOM_BUILD_CACHE_SIZE = int(os.environ.get("LIVINAI_ROOM_BUILD_CACHE", "32"))
+
+#: How near a plan-wide opening has to be to a room to change how it is built.
+#: The lookups that read them (`entrance_door_at` and friends) match within
+#: 0.40 m of a point on the room's own walls; this leaves margin for the wall
+#: band between two rooms.
+ROOM_CONTEXT_REACH = 1.0
+
+_ROOM_BUILD_CACHE = OrderedDict()
+_ROOM_BUILD_CONTEXT = []
+
+
+def register_room_build_context(snapshot):
+    """Add a plan-wide fact to every room's cache key.
+
+    `snapshot(poly)` is called with the room's polygon and returns anything
+    JSON can encode. A module that publishes build state of its own — the web
+    exporter's balcony context is one — registers it here, or a room would be
+    reused from a build that saw a different plan.
+    """
+    if snapshot not in _ROOM_BUILD_CONTEXT:
+        _ROOM_BUILD_CONTEXT.append(snapshot)
+    return snapshot
+
+
+def clear_room_build_cache():
+    """Forget every cached room, e.g. after the engine's sources change."""
+    _ROOM_BUILD_CACHE.clear()
+
+
+def _cache_token(value):
+    """Reduce engine values json does not know to a stable encoding."""
+    if isinstance(value, np.ndarray):
+        return value.astype(float).tolist()
+    if isinstance(value, (np.floating, np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(item) for item in value)
+    if hasattr(value, "wkt"):
+        return value.wkt
+    return repr(value)
+
+
+def nearby_lines(lines, poly, reach=ROOM_CONTEXT_REACH):
+    """The lines of a plan-wide list that lie close enough to touch this room."""
+    return [line.wkt for line in lines if line.distance(poly) <= reach]
+
+
+def _room_build_key(room, edges, config, furnished, plan_facts, kitchen_center):
+    poly = Polygon([(p[0], p[1]) for p in room])
+    if not poly.is_valid:
+        poly = poly.buffer(0)
+    context = {
+        "room": room,
+        "edges": [
+            {key: value for key, value in edge.items() if key != "line"}
+            for edge in edges
+        ],
+        "config": config or {},
+        "furnished": bool(furnished),
+        "plan": plan_facts or {},
+        "kitchen": kitchen_center,
+        "wallOpenings": nearby_lines(_ACTIVE_WALL_OPENINGS.get(), poly),
+        "entrances": nearby_lines(_ACTIVE_ENTRANCE_DOORS.get(), poly),
+        "circulation": nearby_lines(_ACTIVE_CIRCULATION_DOORS.get(), poly),
+        "extra": [snapshot(poly) for snapshot in _ROOM_BUILD_CONTEXT],
+    }
+    encoded = json.dumps(
+        context, sort_keys=True, separators=(",", ":"), default=_cache_token
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _copy_room_build(built):
+    """Duplicate a room build: its meshes, their materials, and its groups.
+
+    Materials are registered against mesh identity, so every copy is registered
+    again. Returns None for a build whose furniture refers to meshes it does not
+    carry, which cannot be copied faithfully and is then simply not cached.
+    """
+    from archviz_materials import copy_mesh_material
+    from furniture_catalog import copy_catalog_material
+
+    copies = {}
+    meshes = []
+    for mesh in built["meshes"]:
+        duplicate = copies.get(id(mesh))
+        if duplicate is None:
+            duplicate = copy.deepcopy(mesh)
+            copy_mesh_material(mesh, duplicate)
+            copy_catalog_material(mesh, duplicate)
+            copies[id(mesh)] = duplicate
+        meshes.append(duplicate)
+    objects = []
+    for item in built["objects"]:
+        if any(id(mesh) not in copies for mesh in item["meshes"]):
+            return None
+        duplicate = {
+            key: copy.deepcopy(value)
+            for key, value in item.items()
+            if key != "meshes"
+        }
+        duplicate["meshes"] = [copies[id(mesh)] for mesh in item["meshes"]]
+        objects.append(duplicate)
+    return dict(
+        built,
+        meshes=meshes,
+        objects=objects,
+        footprints=list(built["footprints"]),
+        lights=copy.deepcopy(built["lights"]),
+        floor_color=list(built["floor_color"]),
+    )
+
+
+def _cached_room(key, config):
+    cached = _ROOM_BUILD_CACHE.get(key)
+    if cached is None:
+        return None
+    _ROOM_BUILD_CACHE.move_to_end(key)
+    print(
+        f"[WALK] Reused cached build for "
+        f"'{(config or {}).get('name', 'room')}'"
+    )
+    return _copy_room_build(cached)
+
+
+def _remember_room(key, built):
+    snapshot = _copy_room_build(built)
+    if snapshot is not None:
+        _ROOM_BUILD_CACHE[key] = snapshot
+        while len(_ROOM_BUILD_CACHE) > ROOM_BUILD_CACHE_SIZE:
+            _ROOM_BUILD_CACHE.popitem(last=False)
+
+
+def cached_room_build(room, edges, config=None, furnished=True,
+                      plan_facts=None, kitchen_center=None):
+    """`build_room`, answered from the per-room cache when it can be."""
+    if ROOM_BUILD_CACHE_SIZE <= 0:
+        return build_room(
+            room, edges, config, furnished, plan_facts, kitchen_center
+        )
+    key = _room_build_key(
+        room, edges, config, furnished, plan_facts, kitchen_center
+    )
+    cached = _cached_room(key, config)
+    if cached is not None:
+        return cached
+
+    built = build_room(
+        room, edges, config, furnished, plan_facts, kitchen_center
+    )
+    _remember_room(key, built)
+    return built
+
+
+# ================= PARALLEL ROOM BUILDS =================
+# Rooms are furnished from their own polygon, edges, configuration and RNG,
+# plus the whole-plan facts `build_scene` settles before the loop — nothing one
+# room does is read by the next. So the rooms a build has not cached can be
+# furnished side by side in forked workers and handed back in plan order.
+#
+# Open3D meshes do not pickle, and the material registries are keyed by mesh
+# identity, so a worker sends each mesh back as plain arrays with its material
+# records beside it, and the parent rebuilds and re-registers it. The arrays
+# are copied exactly; the exporter reads nothing else, so the GLB is the same
+# byte for byte as a serial build.
+#
+# Workers are forked, never spawned: the web exporter patches this module when
+# it is imported, and a spawned interpreter would furnish with the unpatched
+# functions. Where fork is unavailable the rooms are built in order, here.
+
+#: Worker processes furnishing rooms. 0 or 1 builds them in order in this
+#: process, which is the default.
+ROOM_BUILD_WORKERS = int(os.environ.get("LIVINAI_ROOM_BUILD_WORKERS", "0"))
+
+_ROOM_BUILD_STATE = [
+    _ACTIVE_WALL_OPENINGS,
+    _ACTIVE_ENTRANCE_DOORS,
+    _ACTIVE_DOOR_ROOMS,
+    _ACTIVE_CIRCULATION_DOORS,
+]
+
+
+def register_room_build_state(variable):
+    """Carry a ContextVar that room builds read into the parallel workers.
+
+    A worker starts from a copy of this process but not of the build's
+    context, so anything published for the length of a build — the web
+    exporter's balconies are an example — is registered here and set again in
+    the worker before it furnishes.
+    """
+    if variable not in _ROOM_BUILD_STATE:
+        _ROOM_BUILD_STATE.append(variable)
+    return variable
+
+
+_MESH_ARRAYS = (
+    ("vertices", o3d.utility.Vector3dVector),
+    ("vertex_normals", o3d.utility.Vector3dVector),
+    ("vertex_colors", o3d.utility.Vector3dVector),
+    ("triangles", o3d.utility.Vector3iVector),
+    ("triangle_normals", o3d.utility.Vector3dVector),
+    ("triangle_uvs", o3d.utility.Vector2dVector),
+    ("triangle_material_ids", o3d.utility.IntVector),
+)
+
+
+def _pack_room_build(built):
+    """A room build as picklable arrays, materials and mesh indices.
+
+    Meshes are packed once each into a pool that `meshes` and every object's
+    `meshes` index into, so a mesh shared between them, or one an object lists
+    without the build's own list carrying it, comes back as it went.
+    """
+    from archviz_materials import mesh_material
+    from furniture_catalog import _catalog_spec
+
+    index_of = {}
+    pool = []
+
+    def pooled(mesh):
+        if id(mesh) not in index_of:
+            index_of[id(mesh)] = len(pool)
+            pool.append({
+                "arrays": {
+                    name: np.asarray(getattr(mesh, name)).copy()
+                    for name, _vector in _MESH_ARRAYS
+                },
+                "textures": [np.asarray(image).copy() for image in mesh.textures],
+                "archviz": mesh_material(mesh),
+                "catalog": _catalog_spec(mesh),
+            })
+        return index_of[id(mesh)]
+
+    meshes = [pooled(mesh) for mesh in built["meshes"]]
+    objects = [
+        dict(item, meshes=[pooled(mesh) for mesh in item["meshes"]])
+        for item in built["objects"]
+    ]
+    return dict(built, meshes=meshes, objects=objects, mesh_pool=pool)
+
+
+def _unpack_room_build(packed):
+    from archviz_materials import register_mesh_material
+    from furniture_catalog import _PBR_MESH_MATERIALS
+
+    pool = []
+    for entry in packed["mesh_pool"]:
+        mesh = o3d.geometry.TriangleMesh()
+        for name, vector in _MESH_ARRAYS:
+            values = entry["arrays"][name]
+            if len(values):
+                setattr(mesh, name, vector(values))
+        if entry["textures"]:
+            mesh.textures = [
+                o3d.geometry.Image(np.ascontiguousarray(pixels))
+                for pixels in entry["textures"]
+            ]
+        if entry["archviz"] is not None:
+            register_mesh_material(mesh, *entry["archviz"])
+        if entry["catalog"] is not None:
+            _PBR_MESH_MATERIALS[mesh] = entry["catalog"]
+        pool.append(mesh)
+    built = {key: value for key, value in packed.items() if key != "mesh_pool"}
+    built["meshes"] = [pool[index] for index in packed["meshes"]]
+    built["objects"] = [
+        dict(item, meshes=[pool[index] for index in item["meshes"]])
+        for item in packed["objects"]
+    ]
+    return built
+
+
+def _profiled_build_room(index, job):
+    """`build_room`, as one "room" span when the export is being profiled."""
+    room_type = (job[2] or {}).get("room_type", "Living Room")
+    with stage("room", room=index, roomType=room_type) as span:
+        built = build_room(*job)
+        if span is not None:
+            span["triangles"] = triangle_count(built["meshes"])
+    return built
+
+
+def _build_room_in_worker(state, profiled, index, job):
+    for variable, value in zip(_ROOM_BUILD_STATE, state):
+        variable.set(value)
+    if not profiled:
+        return _pack_room_build(build_room(*job))
+    # The parent's profile is not this process's to add to; record into a
+    # fresh one and send its spans back with the room.
+    with profiling(BuildProfile()) as profile:
+        packed = _pack_room_build(_profiled_build_room(index, job))
+    packed["profile"] = (profile.spans, profile.peak_rss_mb)
+    return packed
+
+
+def _parallel_room_builds(jobs, workers, indices=None):
+    """Build rooms in forked workers; None when that is not possible here.
+
+    `indices` are the rooms' places in the plan, for the profile.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    state = [variable.get() for variable in _ROOM_BUILD_STATE]
+    profile = active_profile()
+    indices = list(range(len(jobs))) if indices is None else list(indices)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            mp_context=multiprocessing.get_context("fork"),
+        ) as pool:
+            packed = list(pool.map(
+                _build_room_in_worker,
+                [state] * len(jobs),
+                [profile is not None] * len(jobs),
+                indices,
+                jobs,
+            ))
+    except BrokenProcessPool as exc:
+        print(f"[WALK] Parallel room build unavailable: {exc}")
+        return None
+    if profile is not None:
+        for item in packed:
+            profile.absorb(*item.pop("profile"))
+    return [_unpack_room_build(item) for item in packed]
+
+
+def build_rooms(jobs, workers=None):
+    """Build every room of a plan, in plan order.
+
+    Each job is the argument tuple of `build_room`. Rooms in the per-room cache
+    are answered from it; with more than one worker, the rest are furnished in
+    parallel processes.
+    """
+    workers = ROOM_BUILD_WORKERS if workers is None else int(workers)
+    use_cache = ROOM_BUILD_CACHE_SIZE > 0
+    with tally("room_cache_lookup"):
+        keys = [_room_build_key(*job) if use_cache else None for job in jobs]
+        results = [
+            _cached_room(key, job[2]) if use_cache else None
+            for key, job in zip(keys, jobs)
+        ]
+    missing = [index for index, built in enumerate(results) if built is None]
+    built_rooms = None
+    if workers > 1 and len(missing) > 1:
+        built_rooms = _parallel_room_builds(
+            [jobs[index] for index in missing], workers, missing
+        )
+    if built_rooms is None:
+        built_rooms = [_profiled_build_room(index, jobs[index]) for index in missing]
+    for index, built in zip(missing, built_rooms):
+        if use_cache:
+            _remember_room(keys[index], built)
+        results[index] = built
+    return results
+
+
 def build_scene(rooms_px, doors_px, windows_px, px_per_m=None, room_configs=None,
                 furnished=True, wall_openings_px=None):
     """Full 3D scene from plan pixels.
@@ -5438,90 +6034,31 @@ def build_scene(rooms_px, doors_px, windows_px, px_per_m=None, room_configs=None
     # the rooms it joins rather than to whichever one happened to be last.
     room_floor_colors = []
 
+    jobs = []
     for i, room in enumerate(rooms_m):
         cfg = room_configs[i] if i < len(room_configs) else {}
-        style = cfg.get("style", "Modern")
         rtype = cfg.get("room_type", "Living Room")
-        P = get_palette(style, cfg)
-        room_floor_colors.append(list(P["floor"]))
-
-        poly = Polygon([(p[0], p[1]) for p in room])
-        if not poly.is_valid:
-            poly = poly.buffer(0)
-        room_polys.append(poly)
-        room_lights.extend(_room_light_specs(poly, cfg))
-
-        # floor + ceiling in the room's style
-        floor = _orient_horizontal_surface(
-            floor_mesh(room, P["floor"]),
-            upward=True,
+        # Cross-room context: does the plan already have a dedicated dining
+        # room, and where is the kitchen? Used so an open living room can host
+        # dining and align it toward the kitchen. And the answer to "is this
+        # the room that eats?", decided once for the whole plan above. Every
+        # dining gate in the furnisher reads this and nothing else, so the
+        # decision cannot be reached twice and come back different.
+        plan_facts = {
+            "_plan_has_dining_room": _plan_has_dining_room,
+            "_livinai_dining_host": i in _dining_hosts,
+            "_livinai_dining_explicit": is_explicit_dining_lounge(rtype),
+        }
+        jobs.append(
+            (room, all_edges[i], cfg, furnished, plan_facts, _kitchen_center)
         )
-        selected_floor_material = floor_material(cfg, rtype, style)
-        minx, miny, maxx, maxy = poly.bounds
-        apply_archviz_material(
-            floor,
-            selected_floor_material,
-            tint=P["floor"],
-            tint_strength=(
-                0.30
-                if selected_floor_material == "bathroom_tile"
-                else 0.16
-            ),
-            # Keep UVs inside one authored texture tile in the PBR renderer;
-            # the source maps already contain a complete board/tile layout.
-            repeat_m=max(maxx - minx, maxy - miny, 1.0),
-            # The tile normal map can expose the room's two triangulation
-            # faces under strong indirect light. Its albedo and calibrated
-            # roughness retain the realistic surface without those facets.
-            detail_maps=selected_floor_material != "bathroom_tile",
-        )
-        meshes.append(floor)
-        ceil = _orient_horizontal_surface(
-            floor_mesh(room, P.get("ceiling", CEILING_COLOR)),
-            upward=False,
-        )
-        ceil.translate((0, 0, WALL_H))
-        meshes.append(ceil)
-
-        selected_wall_material = wall_material(cfg, rtype, style)
-        meshes.extend(build_walls(
-            all_edges[i],
-            P["wall"],
-            trim_color=_mix_color(P["wood_dark"], P["wall"], 0.52),
-        ))
-        meshes.extend(build_wall_finish_skins(
-            room,
-            all_edges[i],
-            P["wall"],
-            selected_wall_material,
-        ))
-        meshes.extend(build_room_trim(room, all_edges[i], P, cfg))
-        if cfg.get("whole_room_design", True):
-            meshes.extend(build_room_design_surfaces(
-                room, all_edges[i], P, cfg
-            ))
-
-        if furnished:
-            cfg = dict(cfg)
-            cfg.setdefault("room_type", rtype)
-            cfg.setdefault("style", style)
-            # Cross-room context: does the plan already have a dedicated dining
-            # room, and where is the kitchen? Used so an open living room can
-            # host dining and align it toward the kitchen.
-            cfg["_plan_has_dining_room"] = _plan_has_dining_room
-            # And the answer to "is this the room that eats?", decided once for
-            # the whole plan above. Every dining gate in the furnisher reads
-            # this and nothing else, so the decision cannot be reached twice
-            # and come back different.
-            cfg["_livinai_dining_host"] = i in _dining_hosts
-            cfg["_livinai_dining_explicit"] = is_explicit_dining_lounge(rtype)
-            furnisher = RoomFurnisher(room, all_edges[i], P, cfg)
-            if _kitchen_center is not None:
-                furnisher._kitchen_position = _kitchen_center
-            fm, fps = furnisher.furnish(rtype)
-            meshes.extend(fm)
-            furniture_fps.extend(fps)
-            furniture_objects.extend(furnisher.editable_objects)
+    for built in build_rooms(jobs):
+        room_floor_colors.append(built["floor_color"])
+        room_polys.append(built["poly"])
+        room_lights.extend(built["lights"])
+        meshes.extend(built["meshes"])
+        furniture_fps.extend(built["footprints"])
+        furniture_objects.extend(built["objects"])
 
     # ---- building cap: hull ceiling + under-floor slab so hairline seams
     # between rooms show as dark shadow lines, never open sky ----
@@ -0,0 +1,133 @@
+"""Simplified stand-ins for furniture seen from across the home.
+
+A catalog sofa, a pleated curtain or a potted plant reaches the browser at the
+tessellation it was authored or built at, and a phone draws every triangle of
+it whether it fills the screen or is a few pixels through a doorway two rooms
+away. In a large home most furniture is the second kind most of the time.
+
+`lod_chain` gives a furniture group's arrays up to len(LOD_LEVELS) coarser
+versions, each Garland–Heckbert quadric decimation (Open3D's) of the one
+before. Open3D keeps no UVs through a decimation, so each simplified vertex
+takes the UV of the nearest full-detail vertex; normals are worked out afresh
+from the simplified surface. A level is only kept when it is markedly smaller
+than the last — boxes and panels have nothing to give up — and a group below
+LOD_MIN_TRIANGLES gets none. The arrays are those `_geometry_arrays` returns,
+in the group's own frame, so a chain serves every placement of the item.
+
+Decimation is slow next to everything else the exporter does, and the same
+catalog model or builder output is exported home after home. Chains are kept
+per process, keyed by a hash of the arrays they were made from.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+import open3d as o3d
+
+
+#: (share of the full group's triangles, distance in metres from which the
+#: level is drawn). The browser draws full detail nearer than the first.
+LOD_LEVELS = ((0.4, 4.5), (0.15, 8.0), (0.05, 13.0))
+
+#: Groups with fewer triangles are drawn at full detail from any distance.
+LOD_MIN_TRIANGLES = 600
+
+# No level is made smaller than this; below it the silhouette goes first.
+_MIN_LEVEL_TRIANGLES = 48
+
+# A decimation that keeps more than this share of the previous level's
+# triangles saved too little to be worth a mesh of its own.
+_MIN_REDUCTION = 0.8
+
+#: Chains one process keeps. 0 turns the cache off.
+LOD_CACHE_SIZE = int(os.environ.get("LIVINAI_LOD_CACHE", "512"))
+
+_LOD_CACHE = OrderedDict()
+
+
+def clear_lod_cache():
+    """Forget every cached chain, e.g. after the engine's sources change."""
+    _LOD_CACHE.clear()
+
+
+def lod_distances():
+    """The distance each level of a chain is drawn from, level 1 first."""
+    return [distance for _ratio, distance in LOD_LEVELS]
+
+
+def _arrays_key(vertices, faces, normals, uvs):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (vertices, faces, normals, uvs):
+        if array is None:
+            digest.update(b"-")
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.digest()
+
+
+def lod_chain(vertices, faces, normals, uvs):
+    """The group's simplified levels, as `[(level, (vertices, faces, normals, uvs))]`.
+
+    `level` counts from 1 into LOD_LEVELS; a level that would not have been
+    markedly smaller than the one before is left out, and the next is made
+    from that one instead. Empty for a group too small to simplify.
+    """
+    if len(faces) < LOD_MIN_TRIANGLES:
+        return []
+    key = _arrays_key(vertices, faces, normals, uvs)
+    chain = _LOD_CACHE.get(key)
+    if chain is not None:
+        _LOD_CACHE.move_to_end(key)
+        return chain
+    chain = _simplify(vertices, faces, uvs)
+    if LOD_CACHE_SIZE > 0:
+        _LOD_CACHE[key] = chain
+        while len(_LOD_CACHE) > LOD_CACHE_SIZE:
+            _LOD_CACHE.popitem(last=False)
+    return chain
+
+
+def _simplify(vertices, faces, uvs):
+    source = o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(np.asarray(vertices, dtype=np.float64)),
+        o3d.utility.Vector3iVector(np.asarray(faces, dtype=np.int32)),
+    )
+    nearest = None
+    if uvs is not None:
+        nearest = o3d.core.nns.NearestNeighborSearch(
+            o3d.core.Tensor(np.asarray(vertices, dtype=np.float32))
+        )
+        nearest.knn_index()
+    chain = []
+    previous = source
+    for level, (ratio, _distance) in enumerate(LOD_LEVELS, start=1):
+        target = int(len(faces) * ratio)
+        if target < _MIN_LEVEL_TRIANGLES:
+            break
+        simplified = previous.simplify_quadric_decimation(target)
+        simplified.remove_unreferenced_vertices()
+        count = len(simplified.triangles)
+        if not count:
+            break
+        if count > _MIN_REDUCTION * len(previous.triangles):
+            continue
+        simplified.compute_vertex_normals()
+        level_vertices = np.asarray(simplified.vertices, dtype=np.float32)
+        level_uvs = None
+        if nearest is not None:
+            indices, _distances = nearest.knn_search(o3d.core.Tensor(level_vertices), 1)
+            level_uvs = np.asarray(uvs)[indices.numpy()[:, 0]]
+        chain.append((level, (
+            level_vertices,
+            np.asarray(simplified.triangles, dtype=np.int64),
+            np.asarray(simplified.vertex_normals, dtype=np.float32),
+            level_uvs,
+        )))
+        previous = simplified
+    return chain
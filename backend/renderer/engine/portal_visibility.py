@@ -0,0 +1,244 @@
+"""Which rooms, and which furniture, can be seen from each room of a home.
+
+The browser draws every room of the home from every camera position, though
+from inside a bedroom nearly all of it is behind walls. The plan says where the
+walls are not: each door, cased opening, window and balcony door is an opening
+record whose `roomIndices` name the rooms it joins, one room for an opening to
+the outside.
+
+`potentially_visible_sets` treats those openings as portals, top-down. A room
+can see another when some straight line passes through every portal on a path
+between them, and a piece of furniture when such a line reaches its footprint.
+Every room and item seen through a chain of portals leading from a room is in
+that room's set.
+
+The test is conservative. It ignores the heights of openings and furniture
+and treats every room as if nothing stood inside it, so a set can hold
+something that is never actually in view, but never misses anything that
+could be. The outside is one more room, so a wing seen across a courtyard
+through two windows still counts, except that a line through it must clear
+the home itself: two windows are only joined across the outside when a
+sight line from one to the other stays out of every room.
+
+Lines are found the usual way for 2D portal sequences: if any line passes
+through a chain of segments, then one passes through endpoints of two of them.
+Each such candidate line is tested against the whole chain at once.
+
+Chains are followed at most MAX_PORTALS deep. A room whose search would have
+gone deeper is not given a cut-off set: it is given every room and every piece
+of furniture, so the browser hides nothing from it, and the guarantee holds.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+from shapely.geometry import LineString, Polygon
+from shapely.ops import unary_union
+from shapely.prepared import prep
+
+
+#: Portals one line of sight may pass through. Deeper than any real home
+#: needs; it bounds the search in pathological plans, whose rooms past it
+#: then see everything.
+MAX_PORTALS = 8
+
+# Each portal is narrowed by this much at either end, so a line grazing a
+# door jamb is not a line through the door.
+_PORTAL_INSET = 0.02
+
+# Points along each window at which sight lines across the outside are tried.
+_OUTSIDE_SAMPLES = 5
+
+_OUTSIDE = -1
+_EPSILON = 1e-9
+
+
+def _portal(points):
+    a, b = (np.asarray(point, dtype=float) for point in points[:2])
+    length = float(np.linalg.norm(b - a))
+    if length <= 2 * _PORTAL_INSET:
+        return None
+    step = (b - a) / length * _PORTAL_INSET
+    return np.array([a + step, b - step])
+
+
+def _footprint(item):
+    """An item's footprint corners in the metadata's (x, -y) plane."""
+    x, _height, z = item["pivot"]
+    yaw = float(item.get("yaw", 0.0))
+    half_width = float(item.get("width", 0.0)) / 2
+    half_depth = float(item.get("depth", 0.0)) / 2
+    cos, sin = np.cos(yaw), np.sin(yaw)
+    corners = []
+    for u, v in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+        local_x, local_y = u * half_width, v * half_depth
+        # Rotated in the plan, where y is up; the metadata's second axis is -y.
+        corners.append((x + local_x * cos - local_y * sin, z - (local_x * sin + local_y * cos)))
+    return np.asarray(corners)
+
+
+@lru_cache(maxsize=None)
+def _endpoint_pairs(count):
+    """Index pairs joining endpoints of two different segments out of `count`."""
+    first, second = np.triu_indices(2 * count, 1)
+    differ = first // 2 != second // 2
+    return first[differ], second[differ]
+
+
+def _lines(origins, ends):
+    """Unit normals and offsets of the lines through each origin and end."""
+    direction = ends - origins
+    length = np.linalg.norm(direction, axis=-1)
+    normals = np.stack((-direction[..., 1], direction[..., 0]), axis=-1)
+    normals = normals / np.maximum(length, _EPSILON)[..., None]
+    return normals, np.sum(normals * origins, axis=-1), length > _EPSILON
+
+
+def _through(normals, offsets, segments):
+    """Which lines pass through every segment.
+
+    A line passes through a segment when its two ends are not strictly on the
+    same side, and not along it: a line running down a wall through two doors
+    in it sees through neither.
+    """
+    sides = np.einsum("...d,sed->...se", normals, segments) - offsets[..., None, None]
+    crossing = (sides[..., 0] * sides[..., 1] <= _EPSILON).all(axis=-1)
+    along = (np.abs(sides) <= _EPSILON).all(axis=-1).any(axis=-1)
+    return crossing & ~along
+
+
+def _meets(reach):
+    """Does a line meet a footprint, from its corners' signed distances?"""
+    return (reach.min(axis=-1) <= _EPSILON) & (reach.max(axis=-1) >= -_EPSILON)
+
+
+def _stabbed(segments):
+    """Does one line pass through every segment of a chain?
+
+    Candidates join endpoints of two different segments. A line through both
+    ends of one segment would run along it, and turning a transversal about
+    one endpoint always meets another segment's endpoint before its own.
+    """
+    if len(segments) < 2:
+        return True
+    points = segments.reshape(-1, 2)
+    first, second = _endpoint_pairs(len(segments))
+    normals, offsets, valid = _lines(points[first], points[second])
+    return bool((valid & _through(normals, offsets, segments)).any())
+
+
+def _seen(segments, footprints):
+    """For each footprint, does a line through the whole chain reach it?
+
+    The candidates are the chain's own lines and, for each footprint, the
+    lines joining a chain endpoint to one of its corners; by the same turning
+    argument, one of them reaches it if any line does.
+    """
+    seen = np.zeros(len(footprints), dtype=bool)
+    points = segments.reshape(-1, 2)
+    if len(segments) >= 2:
+        first, second = _endpoint_pairs(len(segments))
+        normals, offsets, valid = _lines(points[first], points[second])
+        shared = valid & _through(normals, offsets, segments)
+        if shared.any():
+            normals, offsets = normals[shared], offsets[shared]
+            reach = np.einsum("md,tcd->mtc", normals, footprints) - offsets[:, None, None]
+            seen |= _meets(reach).any(axis=0)
+    # (footprints, chain endpoints, corners)
+    origins = np.broadcast_to(points[None, :, None, :], (len(footprints), len(points), 4, 2))
+    ends = np.broadcast_to(footprints[:, None, :, :], origins.shape)
+    normals, offsets, valid = _lines(origins, ends)
+    reach = np.einsum("tpkd,tcd->tpkc", normals, footprints) - offsets[..., None]
+    seen |= (valid & _through(normals, offsets, segments) & _meets(reach)).any(axis=(1, 2))
+    return seen
+
+
+def _seen_across_outside(portals, outward, footprint):
+    """Pairs of outside portals with a sight line between them clear of the home."""
+    home = prep(footprint.buffer(-0.05))
+    steps = np.linspace(0.0, 1.0, _OUTSIDE_SAMPLES)
+    samples = {
+        portal: [portals[portal][0] + (portals[portal][1] - portals[portal][0]) * step for step in steps]
+        for portal in outward
+    }
+    clear = set()
+    for first, second in combinations(outward, 2):
+        if any(
+            not home.intersects(LineString([p, q]))
+            for p in samples[first]
+            for q in samples[second]
+        ):
+            clear.update({(first, second), (second, first)})
+    return clear
+
+
+def potentially_visible_sets(room_count, openings, furniture, room_polygons=None):
+    """For each room, `{"rooms": [...], "furniture": [nodePrefix, ...]}`.
+
+    `openings`, `furniture` and `room_polygons` are as the exporter's metadata
+    lists them. A room's own index and its own furniture are always in its
+    set. Without `room_polygons`, any two windows see each other outside.
+    """
+    portals = []
+    links = {room: [] for room in range(room_count)}
+    links[_OUTSIDE] = []
+    for opening in openings:
+        rooms = [index for index in opening.get("roomIndices", ()) if 0 <= index < room_count]
+        segment = _portal(opening["points"])
+        if segment is None or not rooms:
+            continue
+        a, b = (rooms + [_OUTSIDE])[:2]
+        if a == b:
+            continue
+        links[a].append((len(portals), b))
+        links[b].append((len(portals), a))
+        portals.append(segment)
+    outward = [portal for portal, _other in links[_OUTSIDE]]
+    across = None
+    if room_polygons:
+        footprint = unary_union([Polygon(points).buffer(0) for points in room_polygons])
+        across = _seen_across_outside(portals, outward, footprint)
+    items_by_room = {room: [] for room in range(room_count)}
+    for item in furniture:
+        if item.get("roomIndex") in items_by_room:
+            items_by_room[item["roomIndex"]].append((item["nodePrefix"], _footprint(item)))
+
+    sets = []
+    for start in range(room_count):
+        rooms = {start}
+        seen = {prefix for prefix, _corners in items_by_room[start]}
+        stack = [(start, (), frozenset((start,)))]
+        cut_off = False
+        while stack and not cut_off:
+            region, chain, visited = stack.pop()
+            if len(chain) >= MAX_PORTALS:
+                cut_off = any(other not in visited for _portal, other in links[region])
+                continue
+            for portal, other in links[region]:
+                if other in visited:
+                    continue
+                if region == _OUTSIDE and across is not None and (chain[-1], portal) not in across:
+                    continue
+                extended = chain + (portal,)
+                segments = np.asarray([portals[index] for index in extended])
+                if not _stabbed(segments):
+                    continue
+                if other != _OUTSIDE:
+                    rooms.add(other)
+                    unseen = [(prefix, corners) for prefix, corners in items_by_room[other] if prefix not in seen]
+                    if unseen:
+                        found = _seen(segments, np.asarray([corners for _prefix, corners in unseen]))
+                        seen.update(prefix for (prefix, _corners), hit in zip(unseen, found) if hit)
+                stack.append((other, extended, visited | {other}))
+        if cut_off:
+            # Something may be in view past the limit; see the module docstring.
+            rooms = set(range(room_count))
+            seen = {item["nodePrefix"] for item in furniture}
+        sets.append({
+            "rooms": sorted(rooms),
+            "furniture": [item["nodePrefix"] for item in furniture if item["nodePrefix"] in seen],
+        })
+    return sets
@@ -13,13 +13,17 @@ import json
 import math
 import os
 import sys
+import uuid
 from collections import defaultdict
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
 from PIL import Image
+from shapely import STRtree
+from shapely.prepared import prep
 
 
 # This repository vendors the exact Livinai_web renderer input beside the
@@ -37,14 +41,38 @@ if TRIMESH_PACKAGES.is_dir() and str(TRIMESH_PACKAGES) not in sys.path:
 import trimesh  # noqa: E402
 import plan_walkthrough as original  # noqa: E402
 import archviz_materials as archviz_materials  # noqa: E402
+import asset_pack  # noqa: E402
 from archviz_materials import apply_archviz_material, material_record_for_mesh  # noqa: E402
+from build_profile import profiling, stage, tally, triangle_count  # noqa: E402
+import furniture_catalog  # noqa: E402
+from furniture_catalog import _catalog_spec, downsample_texture  # noqa: E402
 from furniture_variations import install as install_furniture_variations  # noqa: E402
+from glb_writer import StreamingGlbWriter  # noqa: E402
+import mesh_lod  # noqa: E402
+from portal_visibility import potentially_visible_sets  # noqa: E402
 
 
 WEB_SPATIAL_BOOST = 1.12
 WEB_TEXTURE_MAX_SIZE = 256
+# Catalog maps are brought down to this as each model is parsed, rather than
+# recolored at full size and resized here at the end (see furniture_catalog).
+furniture_catalog.TEXTURE_MAX_SIZE = WEB_TEXTURE_MAX_SIZE
 BALCONY_OPENING_HEIGHT = 2.38
 
+# How the GLB's geometry is encoded and grouped. "standard" is full-precision
+# float32, as every scene before the option existed; "quantized" writes it under
+# KHR_mesh_quantization (see glb_writer), which the bundled GLTFLoader reads
+# without a decoder. "batched" merges static architecture into one node per room
+# and material, with each source mesh's index range in the metadata (see
+# `_architecture_parts`), and "mobile" does both. Textures are the same in all.
+# "mobile" also gives furniture simplified levels under MSFT_lod (see mesh_lod),
+# which the phone walkthrough swaps in by distance; a loader that does not know
+# the extension draws full detail.
+EXPORT_PROFILES = ("standard", "quantized", "batched", "mobile")
+QUANTIZED_PROFILES = ("quantized", "mobile")
+BATCHED_PROFILES = ("batched", "mobile")
+LOD_PROFILES = ("mobile",)
+
 # Practical residential planning dimensions, in metres.  These are deliberately
 # conservative enough for a walkthrough while still allowing compact apartments
 # to step down to smaller furniture instead of becoming empty.
@@ -163,7 +191,7 @@ def _forced_dining_pose(self, selected, position, structural_yaws):
         centre = np.array([x, y], dtype=float)
         for candidate_yaw in yaws:
             footprint = original.footprint_poly(centre, candidate_yaw, width, depth)
-            if not footprint.within(safe_room):
+            if not self._inside(footprint, safe_room):
                 continue
             if any(footprint.intersects(zone) for zone in keepout):
                 continue
@@ -1470,6 +1498,10 @@ def _wall_slots_with_windows(self, include_windows=False):
     """
     if not include_windows:
         return _ORIGINAL_WALL_SLOTS(self)
+    return self._slot_table("glazed", lambda: _wall_runs_past_windows(self))
+
+
+def _wall_runs_past_windows(self):
     slots = []
     for e in self.edges:
         length = e["length"]
@@ -1694,6 +1726,29 @@ def balcony_opening_context(
         _ACTIVE_BALCONIES.reset(balcony_token)
 
 
+def _balcony_room_context(poly):
+    """The balcony curtain owners a room's trim can see, for its cache key."""
+    return [
+        {
+            "midpoint": owner["midpoint"].tolist(),
+            "length": owner["length"],
+            "owner": owner["room_centroid"].tolist(),
+        }
+        for owner in _ACTIVE_BALCONY_CURTAIN_OWNERS.get()
+        if original.Point(*owner["midpoint"]).distance(poly)
+        <= original.ROOM_CONTEXT_REACH
+    ]
+
+
+original.register_room_build_context(_balcony_room_context)
+for _variable in (
+    _ACTIVE_BALCONIES,
+    _ACTIVE_BALCONY_SCALE,
+    _ACTIVE_BALCONY_CURTAIN_OWNERS,
+):
+    original.register_room_build_state(_variable)
+
+
 def _strict_aligned_opening_candidates(all_room_edges, a, b):
     """Return only wall edges that genuinely run along an authored opening."""
     a = np.asarray(a, dtype=float)
@@ -5632,7 +5687,14 @@ def scene_cache_key(payload: dict) -> str:
     return hashlib.sha256(encoded).hexdigest()[:24]
 
 
-def interior_plan_source_version() -> str:
+#: Where a build step recorded the source fingerprint, when one did. Both the
+#: Modal image and backend/Dockerfile write it once their files are final, so a
+#: warm container answers a cache hit without reading the engine or walking the
+#: furniture catalog. Unset, the fingerprint is computed on first use.
+SOURCE_MANIFEST_ENV = "WALKTHROUGH_SOURCE_MANIFEST"
+
+
+def compute_source_version() -> str:
     """Invalidate exports whenever Interior_Plan logic or catalog assets change."""
     digest = hashlib.sha256()
     digest.update(Path(__file__).resolve().read_bytes())
@@ -5646,19 +5708,82 @@ def interior_plan_source_version() -> str:
         if path.is_file():
             digest.update(filename.encode())
             digest.update(path.read_bytes())
-    asset_root = INTERIOR_PLAN_ROOT / "assets" / "furniture_catalog"
+    asset_root = furniture_catalog.CATALOG_ROOT
+    packed = set()
+    pack = asset_pack.open_pack()
+    if pack is not None and pack.texture_max_size == furniture_catalog.TEXTURE_MAX_SIZE:
+        # The pack's hash covers every byte of every model and map it serves,
+        # so it stands in for stat-ing those files. Everything else in the
+        # catalog — wall art, for one — is still read from disk, and hashed.
+        digest.update(b"asset-pack:" + pack.hash.encode())
+        packed = set(pack.header["models"])
     if asset_root.is_dir():
         for path in sorted(item for item in asset_root.rglob("*") if item.is_file()):
+            name = path.relative_to(asset_root).as_posix()
+            if name in packed:
+                continue
             stat = path.stat()
-            digest.update(path.relative_to(asset_root).as_posix().encode())
+            digest.update(name.encode())
             digest.update(str(stat.st_size).encode())
             digest.update(str(stat.st_mtime_ns).encode())
     variations_path = Path(__file__).resolve().with_name("furniture_variations.py")
     if variations_path.is_file():
         digest.update(variations_path.read_bytes())
+    for filename in ("glb_writer.py", "mesh_lod.py", "portal_visibility.py"):
+        writer_path = Path(__file__).resolve().with_name(filename)
+        if writer_path.is_file():
+            digest.update(writer_path.read_bytes())
     return digest.hexdigest()[:16]
 
 
+@lru_cache(maxsize=1)
+def interior_plan_source_version() -> str:
+    """The source fingerprint, worked out once per process.
+
+    Sources and assets do not change under a running worker, so hashing them on
+    every build — cache hits included — only added latency to the answer users
+    wait on most. A manifest written at image build time is preferred over
+    hashing at all; an unreadable one falls back to hashing.
+    """
+    manifest = os.environ.get(SOURCE_MANIFEST_ENV)
+    if manifest:
+        try:
+            version = json.loads(Path(manifest).read_text(encoding="utf-8"))[
+                "interiorPlanSource"
+            ]
+            if isinstance(version, str) and version:
+                return version
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    return compute_source_version()
+
+
+def invalidate_source_version():
+    """Forget the fingerprint and every room built under it.
+
+    For a long-lived process whose sources, catalog or asset pack were changed
+    in place; the next call re-reads the manifest or hashes again, and the
+    next asset asks for the pack afresh.
+    """
+    interior_plan_source_version.cache_clear()
+    asset_pack.forget_pack()
+    archviz_materials._texture_pixels.cache_clear()
+    original.clear_room_build_cache()
+    mesh_lod.clear_lod_cache()
+
+
+def write_source_manifest(path) -> str:
+    """Hash the sources now and record the result for later processes."""
+    version = compute_source_version()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"interiorPlanSource": version}, separators=(",", ":")),
+        encoding="utf-8",
+    )
+    return version
+
+
 def _image_array(image):
     if image is None:
         return None
@@ -5668,15 +5793,7 @@ def _image_array(image):
     if pixels.ndim == 2:
         pixels = np.repeat(pixels[:, :, None], 3, axis=2)
     pixels = np.ascontiguousarray(pixels[:, :, :3].astype(np.uint8))
-    height, width = pixels.shape[:2]
-    if max(width, height) > WEB_TEXTURE_MAX_SIZE:
-        scale = WEB_TEXTURE_MAX_SIZE / max(width, height)
-        resized = Image.fromarray(pixels, "RGB").resize(
-            (max(1, round(width * scale)), max(1, round(height * scale))),
-            Image.Resampling.LANCZOS,
-        )
-        pixels = np.ascontiguousarray(np.asarray(resized, dtype=np.uint8))
-    return pixels
+    return downsample_texture(pixels, WEB_TEXTURE_MAX_SIZE)
 
 
 def _image_hash(pixels):
@@ -5688,7 +5805,41 @@ def _image_hash(pixels):
     return digest.hexdigest()
 
 
-def _material_spec(mesh):
+def _material_identity(mesh):
+    """What a mesh's material is built from, when meshes share it.
+
+    A catalog mesh shares its model's spec, and an archviz mesh its registered
+    (name, tint, strength, detail maps); `material_record_for_mesh` builds the
+    same record from either, whichever mesh asks. A mesh with only a texture
+    or vertex colours of its own has no shared source, and None is returned.
+    The source comes back too, to be held while its `id` is in use.
+    """
+    catalog = _catalog_spec(mesh)
+    if catalog is not None:
+        return ("catalog", id(catalog)), catalog
+    registered = archviz_materials.mesh_material(mesh)
+    if registered is not None:
+        return ("archviz", registered), registered
+    return None, None
+
+
+def _material_spec(mesh, memo=None):
+    """The material's grouping key and its web-ready textures.
+
+    Hundreds of meshes share a dozen materials, and building the spec reads
+    the maps, resizes them and hashes every pixel. With `memo` — a dict kept
+    for one export — that is done once per material source, and every later
+    mesh of the same source gets the same key and the same spec object.
+    """
+    identity, source = _material_identity(mesh) if memo is not None else (None, None)
+    if identity is not None:
+        remembered = memo.get(identity)
+        if remembered is not None:
+            # `material_record_for_mesh` fills in missing normals as it goes,
+            # and the geometry written later reads them.
+            if not mesh.has_vertex_normals():
+                mesh.compute_vertex_normals()
+            return remembered[1]
     record = material_record_for_mesh(mesh)
     color = np.clip(np.asarray(record.base_color, dtype=float), 0, 1)
     albedo = _image_array(getattr(record, "albedo_img", None))
@@ -5711,7 +5862,7 @@ def _material_spec(mesh):
         _image_hash(normal),
         _image_hash(arm),
     )
-    return key, {
+    result = key, {
         "color": color,
         "roughness": float(record.base_roughness),
         "metallic": float(record.base_metallic),
@@ -5719,17 +5870,38 @@ def _material_spec(mesh):
         "normal": normal,
         "arm": arm,
     }
+    if identity is not None:
+        memo[identity] = (source, result)
+    return result
 
 
-def _geometry_arrays(mesh):
-    vertices = np.asarray(mesh.vertices, dtype=np.float32)
+def _geometry_arrays(mesh, frame=None):
+    """The mesh's glTF arrays: Y-up vertices, faces, normals and UVs.
+
+    With `frame` — a furniture item's plan `(position, yaw)` — the vertices and
+    normals are given in the item's own frame, as its builder made them before
+    `place_meshes` turned and moved them. Turning them back leaves float noise
+    of the order of 1e-16, enough to tip a float32 rounding, so they are snapped
+    to a micron grid first: two placements of one build then come out bit for
+    bit the same and can share one glTF mesh (see `_furniture_placement`).
+    """
+    vertices = np.asarray(mesh.vertices, dtype=float)
     faces = np.asarray(mesh.triangles, dtype=np.int64)
     if not len(vertices) or not len(faces):
         return None
-    normals = np.asarray(mesh.vertex_normals, dtype=np.float32)
+    normals = np.asarray(mesh.vertex_normals, dtype=float)
     if len(normals) != len(vertices):
         mesh.compute_vertex_normals()
-        normals = np.asarray(mesh.vertex_normals, dtype=np.float32)
+        normals = np.asarray(mesh.vertex_normals, dtype=float)
+    if frame is not None:
+        position, yaw = frame
+        # Row vectors times Rz(yaw) undo the Rz(yaw) place_meshes applied.
+        rotation = original._rotz(yaw)
+        # Adding zero turns the -0.0 rounding leaves on some axes into 0.0.
+        vertices = np.round((vertices - (position[0], position[1], 0.0)) @ rotation, 6) + 0.0
+        normals = np.round(normals @ rotation, 6) + 0.0
+    vertices = vertices.astype(np.float32)
+    normals = normals.astype(np.float32)
     # Interior_Plan is Z-up. glTF/Three is Y-up; this is a pure -90° X turn.
     vertices = vertices[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=np.float32)
     normals = normals[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=np.float32)
@@ -5777,6 +5949,31 @@ def _make_material(name, spec):
     return trimesh.visual.material.PBRMaterial(**kwargs)
 
 
+def _furniture_placement(frame):
+    """The glTF node transform that puts an item's own frame back in the plan.
+
+    Plan Z is glTF Y, and a turn by `yaw` about plan Z is the same turn about
+    glTF Y; the plan position (x, y) is (x, 0, -y).
+    """
+    position, yaw = frame
+    return {
+        "translation": [float(position[0]), 0.0, float(-position[1])],
+        "rotation": [0.0, math.sin(yaw / 2), 0.0, math.cos(yaw / 2)],
+    }
+
+
+def _geometry_digest(mesh, material_key):
+    """Identifies a combined group's encoded geometry and material exactly."""
+    digest = hashlib.blake2b(repr(material_key).encode(), digest_size=16)
+    uv = getattr(mesh.visual, "uv", None)
+    for array in (mesh.vertices, mesh.faces, mesh.vertex_normals, uv):
+        if array is not None:
+            array = np.asarray(array)
+            digest.update(str((array.dtype.str, array.shape)).encode())
+            digest.update(array.tobytes())
+    return digest.digest()
+
+
 def _combine(parts, material, name):
     vertices = []
     normals = []
@@ -5809,6 +6006,29 @@ def _combine(parts, material, name):
     )
 
 
+def _architecture_parts(mesh_indices, parts):
+    """Where each architecture mesh sits in its batch's index buffer.
+
+    `_combine` appends the parts' triangles in order, so mesh k's are the
+    `indexCount` indices from `firstIndex`. With its bounds (glTF axes, metres)
+    the browser can pick out the camera-facing wall and draw the batch around
+    it — two draw ranges, or a zero-area index patch — without a node per wall.
+    """
+    records = []
+    first = 0
+    for mesh_index, (vertices, faces, _normals, _uvs) in zip(mesh_indices, parts):
+        count = int(faces.size)
+        records.append({
+            "mesh": mesh_index,
+            "firstIndex": first,
+            "indexCount": count,
+            "min": [round(float(value), 4) for value in vertices.min(axis=0)],
+            "max": [round(float(value), 4) for value in vertices.max(axis=0)],
+        })
+        first += count
+    return records
+
+
 def _is_ceiling_mesh(mesh) -> bool:
     """Identify removable ceiling/cap geometry without touching furniture."""
     vertices = np.asarray(mesh.vertices, dtype=float)
@@ -5895,12 +6115,8 @@ def _carve_balcony_openings(mesh, balcony_segments):
 
 def _is_curtain_fabric(mesh):
     """Recognize mapped curtain textiles so wall carving never deletes them."""
-    registered = getattr(archviz_materials, "_MESH_MATERIALS", {}).get(id(mesh))
-    return bool(
-        registered is not None
-        and registered[0] is mesh
-        and registered[1] == "curtain_fabric"
-    )
+    registered = archviz_materials.mesh_material(mesh)
+    return bool(registered is not None and registered[0] == "curtain_fabric")
 
 
 def _refine_door_threshold(mesh):
@@ -6021,6 +6237,51 @@ def build_realtime_scene(
     configs,
     pixels_per_meter,
     wall_openings=None,
+    export_profile="standard",
+    profile=None,
+    chunked=False,
+):
+    """Export the plan to `output_path` and return the scene's metadata.
+
+    With a `build_profile.BuildProfile` as `profile`, every stage is timed
+    into it and its summary is returned as the metadata's `profile`. The GLB
+    is the same either way.
+
+    With `chunked`, `output_path` is a directory and the scene is written into
+    it as one GLB per room's shell and one per room's furniture, each named by
+    its content hash and listed in the metadata's `chunks`, spawn room first.
+    """
+    if export_profile not in EXPORT_PROFILES:
+        raise ValueError(f"Unknown export profile {export_profile!r}.")
+    with profiling(profile), stage("export", exportProfile=export_profile):
+        metadata = _export_realtime_scene(
+            output_path,
+            rooms,
+            doors,
+            windows,
+            balconies,
+            configs,
+            pixels_per_meter,
+            wall_openings,
+            export_profile,
+            chunked,
+        )
+    if profile is not None:
+        metadata["profile"] = profile.summary()
+    return metadata
+
+
+def _export_realtime_scene(
+    output_path,
+    rooms,
+    doors,
+    windows,
+    balconies,
+    configs,
+    pixels_per_meter,
+    wall_openings,
+    export_profile,
+    chunked,
 ):
     measured_pixels_per_meter = (
         float(pixels_per_meter)
@@ -6028,12 +6289,13 @@ def build_realtime_scene(
         else original.estimate_px_per_m(rooms, doors)
     )
     scene_pixels_per_meter = measured_pixels_per_meter / WEB_SPATIAL_BOOST
-    scene_doors, kitchen_plans = plan_kitchen_openings(
-        rooms,
-        doors,
-        configs,
-        scene_pixels_per_meter,
-    )
+    with stage("kitchen_openings"):
+        scene_doors, kitchen_plans = plan_kitchen_openings(
+            rooms,
+            doors,
+            configs,
+            scene_pixels_per_meter,
+        )
     # A cased opening is a doorway as far as the walls are concerned: the same
     # cut, through every coincident edge, so the walkthrough can pass. Merging
     # them here rather than giving them an opening type of their own is what
@@ -6059,7 +6321,7 @@ def build_realtime_scene(
         rooms=rooms,
         doors=scene_doors,
         configs=configs,
-    ):
+    ), stage("build_scene", rooms=len(rooms)) as span:
         scene_data = original.build_scene(
             rooms,
             scene_doors,
@@ -6069,6 +6331,8 @@ def build_realtime_scene(
             furnished=True,
             wall_openings_px=cased_openings,
         )
+        if span is not None:
+            span["triangles"] = triangle_count(scene_data["meshes"])
     scale = scene_pixels_per_meter / original.SCALE_BOOST
     room_shapes = []
     room_polygons = []
@@ -6086,20 +6350,36 @@ def build_realtime_scene(
         if len(item) >= 2
     ]
 
+    # Every piece of furniture and every opening is matched to a room below.
+    # The shapes they are matched against are built once here — each room's
+    # 3 cm grace buffer prepared, each boundary kept — and indexed by their
+    # bounding boxes, so a lookup tests only the rooms that could answer it
+    # instead of buffering and measuring every room for every item. The exact
+    # tests and the order ties resolve in are the ones the scans used.
+    room_covers = [prep(polygon.buffer(0.03)) for polygon in room_shapes]
+    room_cover_index = STRtree([cover.context for cover in room_covers])
+    room_boundaries = [polygon.boundary for polygon in room_shapes]
+    room_boundary_index = STRtree(room_boundaries)
+
     def room_index_for_point(x, y):
         point = original.Point(float(x), float(y))
-        containing = [index for index, polygon in enumerate(room_shapes) if polygon.buffer(0.03).covers(point)]
-        if containing:
-            return containing[0]
+        for index in sorted(room_cover_index.query(point).tolist()):
+            if room_covers[index].covers(point):
+                return index
         return min(range(len(room_shapes)), key=lambda index: room_shapes[index].distance(point))
 
     object_by_mesh = {}
     asset_by_mesh = {}
     furniture = []
+    frames = {}
     for index, item in enumerate(scene_data.get("furniture_objects", [])):
         for mesh in item["meshes"]:
             object_by_mesh[id(mesh)] = index
             asset_by_mesh[id(mesh)] = item["asset_key"]
+        frames[index] = (
+            np.asarray(item["position"][:2], dtype=float),
+            float(item.get("yaw", 0.0)),
+        )
         furniture.append({
             "index": index,
             "label": item["asset_key"].replace("_", " ").title(),
@@ -6111,56 +6391,197 @@ def build_realtime_scene(
             "depth": float(item.get("depth", 0.0)),
         })
 
-    groups = defaultdict(list)
+    # Meshes are grouped by owner and material, one draw call per group. The
+    # groups are worked out first, so each one can be combined and written to
+    # the file the moment its last mesh is reached, and its arrays let go;
+    # holding every group until the end kept the whole home in memory twice.
+    group_order = {}
+    group_remaining = defaultdict(int)
     specs = {}
-    for mesh_index, mesh in enumerate(scene_data["meshes"]):
-        object_index = object_by_mesh.get(id(mesh))
-        if object_index is None and not _is_curtain_fabric(mesh):
-            _carve_balcony_openings(mesh, balcony_segments)
-        if object_index is None and _is_door_threshold(mesh):
-            _refine_door_threshold(mesh)
-        arrays = _geometry_arrays(mesh)
-        if arrays is None:
-            continue
-        material_key, spec = _material_spec(mesh)
-        if str(asset_by_mesh.get(id(mesh), "")).endswith("wardrobe"):
-            spec = _wardrobe_finish(spec)
-            material_key = (
-                "wardrobe_unified_finish",
-                round(float(spec["roughness"]), 3),
-                round(float(spec["metallic"]), 3),
-            )
-        if object_index is not None:
-            owner = f"furniture_{object_index:03d}"
-        elif _is_ceiling_mesh(mesh):
-            owner = "ceiling"
-        elif _is_overhead_mesh(mesh):
-            owner = "overhead"
-        else:
-            # Keep architectural pieces individually addressable in the browser.
-            # The walkthrough can then hide only the camera-facing fourth wall
-            # instead of clipping the room, floor, and furniture as one volume.
-            owner = f"architecture_{mesh_index:04d}"
-        group_key = (owner, material_key)
-        groups[group_key].append(arrays)
-        specs[material_key] = spec
-
-    export_scene = trimesh.Scene()
-    for group_index, ((owner, material_key), parts) in enumerate(groups.items()):
-        node_name = f"{owner}_material_{group_index:03d}"
-        material = _make_material(f"livinai_{group_index:03d}", specs[material_key])
-        export_scene.add_geometry(
-            _combine(parts, material, node_name),
-            node_name=node_name,
-            geom_name=node_name,
-        )
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    temporary = output_path.with_suffix(".building.glb")
-    temporary.write_bytes(export_scene.export(file_type="glb"))
-    temporary.replace(output_path)
+    spec_memo = {}
+    members = []
+    batched = export_profile in BATCHED_PROFILES
+    simplified = export_profile in LOD_PROFILES
+    batch_members = defaultdict(list)
+    architecture = []
+    # In a chunked export every group belongs to one room's shell or one
+    # room's furniture, and each chunk's extent is kept for the manifest.
+    chunk_of = {}
+    chunk_bounds = {}
+    with stage("group_meshes", meshes=len(scene_data["meshes"])):
+        for mesh_index, mesh in enumerate(scene_data["meshes"]):
+            object_index = object_by_mesh.get(id(mesh))
+            if object_index is None and not _is_curtain_fabric(mesh):
+                with tally("balcony_carving"):
+                    _carve_balcony_openings(mesh, balcony_segments)
+            if object_index is None and _is_door_threshold(mesh):
+                with tally("door_thresholds"):
+                    _refine_door_threshold(mesh)
+            # The same test `_geometry_arrays` makes before it returns None.
+            if not len(mesh.vertices) or not len(mesh.triangles):
+                continue
+            with tally("material_spec"):
+                material_key, spec = _material_spec(mesh, spec_memo)
+            if str(asset_by_mesh.get(id(mesh), "")).endswith("wardrobe"):
+                spec = _wardrobe_finish(spec)
+                material_key = (
+                    "wardrobe_unified_finish",
+                    round(float(spec["roughness"]), 3),
+                    round(float(spec["metallic"]), 3),
+                )
+            room_index = None
+            if object_index is not None:
+                room_index = furniture[object_index]["roomIndex"]
+            elif batched or chunked:
+                center = mesh.get_axis_aligned_bounding_box().get_center()
+                room_index = room_index_for_point(center[0], center[1])
+            # A chunk holds one room, so its ceilings and overhead fixtures
+            # cannot share a node with the next room's: they are split by
+            # room, still under the prefixes the browser looks for.
+            room_suffix = f"_room_{room_index:02d}" if chunked and object_index is None else ""
+            if object_index is not None:
+                owner = f"furniture_{object_index:03d}"
+            elif _is_ceiling_mesh(mesh):
+                owner = f"ceiling{room_suffix}"
+            elif _is_overhead_mesh(mesh):
+                owner = f"overhead{room_suffix}"
+            elif batched:
+                # One node per room and material, hundreds of walls, skins and
+                # trims in a handful of draw calls. Each piece stays
+                # addressable by its index range instead of by its node.
+                owner = f"architecture_room_{room_index:02d}"
+            else:
+                # Keep architectural pieces individually addressable in the
+                # browser. The walkthrough can then hide only the camera-facing
+                # fourth wall instead of clipping the room, floor, and
+                # furniture as one volume.
+                owner = f"architecture_{mesh_index:04d}"
+            group_key = (owner, material_key)
+            group_order.setdefault(group_key, len(group_order))
+            group_remaining[group_key] += 1
+            members.append((mesh, group_key, frames.get(object_index)))
+            specs[material_key] = spec
+            if chunked:
+                chunk = ("shell" if object_index is None else "furniture", room_index)
+                chunk_of[group_key] = chunk
+                box = mesh.get_axis_aligned_bounding_box()
+                low, high = box.get_min_bound(), box.get_max_bound()
+                if chunk in chunk_bounds:
+                    low = np.minimum(low, chunk_bounds[chunk][0])
+                    high = np.maximum(high, chunk_bounds[chunk][1])
+                chunk_bounds[chunk] = (low, high)
+            if batched and owner.startswith("architecture_room_"):
+                batch_members[group_key].append(mesh_index)
+
+    writing = stage("write_glb", drawCalls=len(group_order))
+    quantize = export_profile in QUANTIZED_PROFILES
+    token = uuid.uuid4().hex
+    writers = {}
+    with writing as span, ExitStack() as open_writers:
+
+        def writer_for(chunk):
+            # Chunks are written under a hidden name and renamed to their
+            # content hash once complete, as the worker does with a scene.
+            if chunk not in writers:
+                path = (
+                    Path(output_path) / f".chunk-{chunk[0]}-{chunk[1]:02d}.{token}.glb"
+                    if chunked
+                    else output_path
+                )
+                writers[chunk] = open_writers.enter_context(
+                    StreamingGlbWriter(path, quantize=quantize)
+                )
+            return writers[chunk]
+
+        if not chunked:
+            writer_for(None)
+        pending = defaultdict(list)
+        # Furniture groups are written in their item's own frame and placed by
+        # their node, so a set of dining chairs, stools or nightstands built
+        # alike is one glTF mesh under several `furniture_NNN_` nodes: each
+        # still a node of its own for the editor to pick up and move, and the
+        # geometry stored, parsed and uploaded once. EXT_mesh_gpu_instancing
+        # would fold the items into one node the editor could not split.
+        # In the mobile profile each mesh also carries its simplified levels,
+        # which its instances share with it.
+        instances = {}
+        for mesh, group_key, frame in members:
+            with tally("geometry_arrays"):
+                pending[group_key].append(_geometry_arrays(mesh, frame))
+            group_remaining[group_key] -= 1
+            if group_remaining[group_key]:
+                continue
+            owner, material_key = group_key
+            group_index = group_order[group_key]
+            node_name = f"{owner}_material_{group_index:03d}"
+            material = _make_material(f"livinai_{group_index:03d}", specs[material_key])
+            chunk = chunk_of.get(group_key)
+            writer = writer_for(chunk)
+            parts = pending.pop(group_key)
+            if group_key in batch_members:
+                architecture.append({
+                    "node": node_name,
+                    "roomIndex": int(owner.rsplit("_", 1)[1]),
+                    "parts": _architecture_parts(batch_members.pop(group_key), parts),
+                })
+            with tally("combine"):
+                combined = _combine(parts, material, node_name)
+            if span is not None:
+                span["triangles"] = span.get("triangles", 0) + len(combined.faces)
+            if frame is None:
+                with tally("glb_write"):
+                    writer.add(combined, node_name, order=group_index)
+                continue
+            placement = _furniture_placement(frame)
+            # Mesh indices belong to one file, so chunks share nothing.
+            identity = (chunk, _geometry_digest(combined, material_key))
+            if identity not in instances:
+                with tally("glb_write"):
+                    mesh_index = writer.add_mesh(combined, node_name)
+                chain = []
+                if simplified and mesh_index is not None:
+                    with tally("lod_chain"):
+                        chain = mesh_lod.lod_chain(
+                            combined.vertices,
+                            combined.faces,
+                            combined.vertex_normals,
+                            getattr(combined.visual, "uv", None),
+                        )
+                lods = []
+                for position, (_level, arrays) in enumerate(chain, start=1):
+                    name = f"{node_name}_lod{position}"
+                    with tally("glb_write"):
+                        lods.append(writer.add_mesh(_combine([arrays], material, name), name))
+                # Which of LOD_LEVELS each stand-in is, so the browser knows
+                # from how far to draw it when a level was left out.
+                extras = {"lodLevels": [level for level, _arrays in chain]} if chain else None
+                instances[identity] = (mesh_index, lods, extras)
+            mesh_index, lods, extras = instances[identity]
+            if mesh_index is not None:
+                writer.add_instance(
+                    mesh_index,
+                    node_name,
+                    order=group_index,
+                    placement=placement,
+                    lods=lods,
+                    extras=extras,
+                )
 
     spawn = np.asarray(scene_data["spawn"], dtype=float)
+    chunks = []
+    if chunked:
+        with stage("name_chunks", chunks=len(writers)):
+            chunks = _name_chunks(writers, chunk_of, chunk_bounds)
+        # The spawn room first, its shell before its furniture, then the
+        # others nearest first: the order the browser should fetch them in.
+        spawn_point = original.Point(float(spawn[0]), float(spawn[1]))
+        spawn_room = room_index_for_point(spawn[0], spawn[1])
+        chunks.sort(key=lambda chunk: (
+            chunk["roomIndex"] != spawn_room,
+            room_shapes[chunk["roomIndex"]].distance(spawn_point),
+            chunk["roomIndex"],
+            chunk["kind"] != "shell",
+        ))
     room_centers = []
     for polygon in room_shapes:
         point = polygon.representative_point()
@@ -6170,16 +6591,25 @@ def build_realtime_scene(
         a = original.px_to_m_real(item[0], scale)
         b = original.px_to_m_real(item[1], scale)
         midpoint = original.Point((float(a[0]) + float(b[0])) / 2, (float(a[1]) + float(b[1])) / 2)
-        nearest = sorted(
-            range(len(room_shapes)),
-            key=lambda index: room_shapes[index].boundary.distance(midpoint),
-        )
-        room_indices = [
-            index for index in nearest
-            if room_shapes[index].boundary.distance(midpoint) <= 0.38
-        ][:2]
-        if not room_indices and nearest:
-            room_indices = [nearest[0]]
+        # The index only narrows the search; the 0.38 m test is still made on
+        # the measured distance, with a hair of slack in the query so a room
+        # exactly at the limit is never lost to rounding in the tree.
+        nearby = room_boundary_index.query(
+            midpoint, predicate="dwithin", distance=0.38 + 1e-6
+        ).tolist()
+        distances = {
+            index: room_boundaries[index].distance(midpoint)
+            for index in nearby
+        }
+        room_indices = sorted(
+            (index for index in nearby if distances[index] <= 0.38),
+            key=lambda index: (distances[index], index),
+        )[:2]
+        if not room_indices and room_shapes:
+            room_indices = [min(
+                range(len(room_shapes)),
+                key=lambda index: room_boundaries[index].distance(midpoint),
+            )]
         return {
             "type": opening_type,
             "points": [
@@ -6197,11 +6627,11 @@ def build_realtime_scene(
     polygons = list(allowed.geoms) if hasattr(allowed, "geoms") else [allowed]
     for polygon in polygons:
         walkable.append([[float(x), float(-y)] for x, y in polygon.exterior.coords])
-    return {
+    metadata = {
         "layoutStandard": "residential-clearance-v2-kitchen-triangle",
         "kitchenPlans": kitchen_plans,
         "meshes": len(scene_data["meshes"]),
-        "drawCalls": len(groups),
+        "drawCalls": len(group_order),
         "walkableArea": float(allowed.area),
         "spawn": [float(spawn[0]), original.EYE_HEIGHT, float(-spawn[1])],
         "spawnYaw": float(scene_data.get("spawn_yaw", 0.0) - math.pi / 2),
@@ -6211,3 +6641,50 @@ def build_realtime_scene(
         "walkable": walkable,
         "furniture": furniture,
     }
+    # What can be seen from each room through its doors, windows and cased
+    # openings, so the browser can leave the rest of the home undrawn.
+    with stage("visibility", rooms=len(room_shapes), openings=len(openings)):
+        metadata["potentiallyVisible"] = potentially_visible_sets(
+            len(room_shapes), openings, furniture, room_polygons
+        )
+    if batched:
+        metadata["architecture"] = architecture
+    if simplified:
+        metadata["lodDistances"] = mesh_lod.lod_distances()
+    if chunked:
+        metadata["chunks"] = chunks
+    return metadata
+
+
+def _name_chunks(writers, chunk_of, chunk_bounds):
+    """Rename each finished chunk to its content hash and describe it.
+
+    Named like a scene, by the first 24 hex digits of a hash, so the same
+    `{name}.glb` rule admits both. Two homes with a room built alike share
+    that room's file.
+    """
+    draw_calls = defaultdict(int)
+    for chunk in chunk_of.values():
+        draw_calls[chunk] += 1
+    chunks = []
+    for (kind, room_index), writer in writers.items():
+        digest = hashlib.sha256()
+        with open(writer.path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+        path = writer.path.with_name(f"{digest.hexdigest()[:24]}.glb")
+        os.replace(writer.path, path)
+        low, high = chunk_bounds[(kind, room_index)]
+        chunks.append({
+            "kind": kind,
+            "roomIndex": room_index,
+            "model": path.name,
+            "bytes": path.stat().st_size,
+            # In glTF axes, as the browser places them: plan y is -z.
+            "bounds": {
+                "min": [float(low[0]), float(low[2]), float(-high[1])],
+                "max": [float(high[0]), float(high[2]), float(-low[1])],
+            },
+            "drawCalls": draw_calls[(kind, room_index)],
+        })
+    return chunks
@@ -0,0 +1,349 @@
+"""Keep the directory of built walkthroughs inside a byte budget.
+
+Every build leaves a `{cache_id}.glb` and `{cache_id}.json` in OUTPUT_DIR, and
+nothing used to remove them: the local `generated/` folder and the Modal volume
+only grew, and a volume with thousands of stale scenes is slow to list and slow
+to reload. A worker killed mid-build also left its `.{cache_id}.{token}.glb`
+behind for good.
+
+`OutputCache` keeps a small index file beside the scenes, and `collect`
+removes the least recently served ones once the directory is over budget.
+Serving a scene must stay cheap, so a hit or a download does not rewrite the
+index: it touches the scene's file, whose time `collect` reads as its last
+use, and appends one line to a log of uses that `collect` folds into the
+index's counts. Only a build and a collection rewrite the index. `collect`
+also sweeps hidden files — temporaries, abandoned build leases — that nothing
+has touched for longer than any build can take.
+
+A chunked scene (see `build_realtime_scene`) is a `{cache_id}.json` whose
+`chunks` list its files, each `{hash}.glb` named by its own content, so two
+scenes with a room built alike share that room's file. Its chunks count towards
+the scene's bytes and go with it once no other scene lists them; a chunk no
+scene lists is swept like a temporary.
+
+The index is a convenience, not a source of truth. The scenes on disk are what
+exists; an entry with no files is dropped, and a scene with no entry is adopted
+with its file time as its last use. Processes on one machine take a lock to
+rewrite it. Machines sharing a volume do not see each other's lock, so there
+the last commit wins and a few access times or counts can be lost. That costs
+some accuracy in which scene goes first, never a scene that is being built.
+
+This module imports nothing from the exporter, so the Modal `model` endpoint
+can use it without loading Open3D.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: one developer machine, one process at a time
+    fcntl = None
+
+
+# 0 turns eviction off; stale temporaries are still swept.
+OUTPUT_CACHE_BYTES = int(
+    float(os.environ.get("LIVINAI_OUTPUT_CACHE_MB", "4096")) * 1024 * 1024
+)
+# Older than the longest build (Modal stops one at 900 s), with room to spare.
+STALE_TEMPORARY_SECONDS = float(
+    os.environ.get("LIVINAI_STALE_TEMPORARY_SECONDS", "3600")
+)
+
+INDEX_NAME = ".cache-index.json"
+_LOCK_NAME = ".cache-index.lock"
+_USES_NAME = ".cache-uses.log"
+_SCENE_SUFFIXES = (".glb", ".json")
+
+
+class OutputCache:
+    """Access times, hit counts and eviction for one output directory."""
+
+    def __init__(self, root, budget=None, stale_after=None):
+        self.root = Path(root)
+        self.budget = OUTPUT_CACHE_BYTES if budget is None else budget
+        self.stale_after = (
+            STALE_TEMPORARY_SECONDS if stale_after is None else stale_after
+        )
+        self.index_path = self.root / INDEX_NAME
+
+    # -- the index ---------------------------------------------------------
+
+    def _read_index(self):
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("counts", {})
+        return index
+
+    @contextmanager
+    def _index(self):
+        """The index, locked, written back when the block exits cleanly."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / _LOCK_NAME, "a+") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self._read_index()
+            yield index
+            temporary = self.index_path.with_name(f"{INDEX_NAME}.{os.getpid()}")
+            temporary.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+            os.replace(temporary, self.index_path)
+
+    def record(self, cache_id, event, now=None):
+        """Note that a scene was served: "hit", "build" or "download".
+
+        A hit and a build are what the hit rate counts. A download is the API
+        fetching the file it was told about, which says the scene is still in
+        use without being a second request for it.
+
+        A build rewrites the index under its lock. A hit or a download only
+        touches the scene's metadata and logs the use: the API downloads a
+        chunked scene a chunk at a time, by the chunk's name, and touching the
+        chunk is a use of every scene listing it once `collect` looks.
+        """
+        now = time.time() if now is None else now
+        if event != "build":
+            self._touch(cache_id, now)
+            self._log_use(event)
+            return
+        with self._index() as index:
+            entry = index["entries"].setdefault(cache_id, {})
+            entry["served"] = now
+            chunks = self._manifest_chunks(cache_id)
+            if chunks:
+                entry["chunks"] = chunks
+            entry["bytes"] = self._scene_bytes(cache_id, chunks)
+            counts = index["counts"]
+            counts[event] = counts.get(event, 0) + 1
+
+    def _touch(self, cache_id, now):
+        for suffix in (".json", ".glb"):
+            try:
+                os.utime(self.root / f"{cache_id}{suffix}", (now, now))
+                return
+            except FileNotFoundError:
+                continue
+
+    def _log_use(self, event):
+        """Append one use to the log, never to a log `_fold_uses` has claimed.
+
+        Appenders share a lock on the log file; a fold takes it exclusively to
+        move the file aside, so no append is half-way through when it does.
+        One that opened the file just before it moved finds, once it holds
+        the lock, that the name now points elsewhere, and opens it again.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / _USES_NAME
+        while True:
+            with open(path, "a", encoding="utf-8") as log:
+                if fcntl is not None:
+                    fcntl.flock(log, fcntl.LOCK_SH)
+                    try:
+                        current = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if not os.path.samestat(os.fstat(log.fileno()), current):
+                        continue
+                log.write(f"{event}\n")
+                return
+
+    @staticmethod
+    def _logged_uses(path):
+        counts = {}
+        try:
+            lines = Path(path).read_text(encoding="utf-8").split()
+        except FileNotFoundError:
+            return counts
+        for event in lines:
+            counts[event] = counts.get(event, 0) + 1
+        return counts
+
+    def _fold_uses(self, counts):
+        """Move the logged uses into the index's counts; under the lock."""
+        log = self.root / _USES_NAME
+        claimed = log.with_name(f"{_USES_NAME}.{os.getpid()}")
+        try:
+            handle = open(log, "rb")
+        except FileNotFoundError:
+            return
+        with handle:
+            if fcntl is not None:
+                # Wait out appends in progress; see `_log_use`.
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            # Uses logged from here on start a new log for the next collection.
+            os.replace(log, claimed)
+        for event, count in self._logged_uses(claimed).items():
+            counts[event] = counts.get(event, 0) + count
+        claimed.unlink()
+
+    def _scene_bytes(self, cache_id, chunks=()):
+        total = 0
+        names = [f"{cache_id}{suffix}" for suffix in _SCENE_SUFFIXES]
+        for name in names + [f"{chunk}.glb" for chunk in chunks]:
+            try:
+                total += (self.root / name).stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _manifest_chunks(self, cache_id, entry=None):
+        """The chunk names a scene's metadata lists; empty for a one-file scene."""
+        if entry is not None and "chunks" in entry:
+            return entry["chunks"]
+        try:
+            metadata = json.loads((self.root / f"{cache_id}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return []
+        chunks = metadata.get("chunks") if isinstance(metadata, dict) else None
+        return [os.path.splitext(chunk["model"])[0] for chunk in chunks or ()]
+
+    # -- collection --------------------------------------------------------
+
+    def _listing(self, now, entries):
+        """Complete scenes, the chunks they list, and stale files.
+
+        Scenes are {cache_id: (bytes, mtime, chunk names)}, their bytes not
+        counting chunks, which are {name: (bytes, mtime)}.
+        """
+        halves = {}
+        stale = []
+        with os.scandir(self.root) as listing:
+            for item in listing:
+                if not item.is_file():
+                    continue
+                name = item.name
+                stat = item.stat()
+                if name.startswith("."):
+                    if name.startswith((INDEX_NAME, _LOCK_NAME, _USES_NAME)):
+                        continue
+                    if now - stat.st_mtime > self.stale_after:
+                        stale.append(item.path)
+                    continue
+                stem, suffix = os.path.splitext(name)
+                if suffix in _SCENE_SUFFIXES:
+                    halves.setdefault(stem, []).append((item.path, stat))
+        scenes = {}
+        loose = {}
+        for stem, parts in halves.items():
+            if len(parts) == len(_SCENE_SUFFIXES):
+                scenes[stem] = (
+                    sum(stat.st_size for _path, stat in parts),
+                    max(stat.st_mtime for _path, stat in parts),
+                    (),
+                )
+                continue
+            path, stat = parts[0]
+            if path.endswith(".json"):
+                chunks = self._manifest_chunks(stem, entries.get(stem))
+                if chunks:
+                    scenes[stem] = (stat.st_size, stat.st_mtime, tuple(chunks))
+                    continue
+            loose[stem] = (path, stat)
+        listed = {chunk for _size, _mtime, chunks in scenes.values() for chunk in chunks}
+        chunks = {}
+        for stem, (path, stat) in loose.items():
+            if stem in listed:
+                chunks[stem] = (stat.st_size, stat.st_mtime)
+            elif now - stat.st_mtime > self.stale_after:
+                # Half a scene — a worker killed between its two renames — or
+                # a chunk no scene lists any more. Neither can be served, and
+                # the next request rebuilds what it needs whole.
+                stale.append(path)
+        return scenes, chunks, stale
+
+    def collect(self, now=None):
+        """Sweep stale hidden files, then evict down to the budget.
+
+        The most recently served scene is always kept, even alone over budget:
+        it is usually the one that was just built for the request waiting on
+        it. Returns what was removed.
+        """
+        now = time.time() if now is None else now
+        with self._index() as index:
+            entries = index["entries"]
+            scenes, chunks, stale = self._listing(now, entries)
+            swept = 0
+            for path in stale:
+                try:
+                    os.unlink(path)
+                    swept += 1
+                except FileNotFoundError:
+                    pass
+
+            for cache_id in list(entries):
+                if cache_id not in scenes:
+                    del entries[cache_id]
+            for cache_id, (size, mtime, listed) in scenes.items():
+                # Hits and downloads since the last collection touched the
+                # scene's files or the chunks it lists.
+                used = max([mtime] + [chunks[chunk][1] for chunk in listed if chunk in chunks])
+                entry = entries.setdefault(cache_id, {"served": used})
+                entry["served"] = max(entry.get("served", used), used)
+                entry["bytes"] = size + sum(chunks.get(chunk, (0,))[0] for chunk in listed)
+                if listed:
+                    entry["chunks"] = list(listed)
+
+            evicted = []
+            # A chunk two scenes list is on disk once.
+            total = sum(size for size, _mtime, _listed in scenes.values())
+            total += sum(size for size, _mtime in chunks.values())
+            if self.budget > 0 and total > self.budget:
+                by_age = sorted(entries, key=lambda key: (entries[key]["served"], key))
+                for cache_id in by_age[:-1]:
+                    if total <= self.budget:
+                        break
+                    # Metadata first: without it the scene already reads as
+                    # missing, so nothing is handed a model about to vanish.
+                    for suffix in (".json", ".glb"):
+                        (self.root / f"{cache_id}{suffix}").unlink(missing_ok=True)
+                    entries.pop(cache_id)
+                    total -= scenes[cache_id][0]
+                    evicted.append(cache_id)
+                    still_listed = {
+                        chunk for entry in entries.values() for chunk in entry.get("chunks", ())
+                    }
+                    for chunk in scenes[cache_id][2]:
+                        if chunk in still_listed or chunk not in chunks:
+                            continue
+                        # A chunk this recent may be one a build in flight is
+                        # about to list; it is swept later if it is not.
+                        size, mtime = chunks.pop(chunk)
+                        if now - mtime <= self.stale_after:
+                            continue
+                        (self.root / f"{chunk}.glb").unlink(missing_ok=True)
+                        total -= size
+
+            counts = index["counts"]
+            self._fold_uses(counts)
+            counts["evicted"] = counts.get("evicted", 0) + len(evicted)
+            counts["swept"] = counts.get("swept", 0) + swept
+        return {"evicted": evicted, "swept": swept}
+
+    # -- reporting ---------------------------------------------------------
+
+    def stats(self):
+        """Entries, bytes and the hit rate, from the index as last written.
+
+        Counts include the uses logged since; nothing is written.
+        """
+        index = self._read_index()
+        entries = index["entries"]
+        counts = dict(index["counts"])
+        for event, count in self._logged_uses(self.root / _USES_NAME).items():
+            counts[event] = counts.get(event, 0) + count
+        hits = counts.get("hit", 0)
+        requests = hits + counts.get("build", 0)
+        return {
+            "entries": len(entries),
+            "bytes": sum(entry.get("bytes", 0) for entry in entries.values()),
+            "budget": self.budget,
+            "hitRate": hits / requests if requests else None,
+            **counts,
+        }
@@ -4,14 +4,25 @@ The Node API launches this worker with request/response JSON file paths. Using
 files keeps the protocol reliable even though the original scene builder emits
 progress diagnostics on stdout. Generated models are content-addressed and
 written atomically, so concurrent requests can safely converge on one cache.
+
+`render_worker.py --serve` is the same worker kept alive: it imports the
+exporter and parses the furniture catalog once, forks a pool of builders from
+that warm process, and takes requests as JSON lines on stdin. See `serve`.
 """
 
 from __future__ import annotations
 
 import json
+import multiprocessing
 import os
+import socket
 import sys
+import threading
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 
@@ -21,10 +32,14 @@ if str(ENGINE_ROOT) not in sys.path:
     sys.path.insert(0, str(ENGINE_ROOT))
 
 from webgl_walkthrough import (  # noqa: E402
+    EXPORT_PROFILES,
     build_realtime_scene,
     interior_plan_source_version,
     scene_cache_key,
+    write_source_manifest,
 )
+from build_profile import BuildProfile  # noqa: E402
+from output_cache import OutputCache  # noqa: E402
 
 
 # Content-addressed exports live next to the renderer by default. Modal mounts a
@@ -34,6 +49,170 @@ OUTPUT_DIR = Path(os.environ.get("WALKTHROUGH_OUTPUT_DIR") or (ROOT / "generated
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+# ================= OUTPUT CACHE =================
+# Every scene served is noted — a build in the directory's index, a hit on the
+# scene's own file — and every completed build is followed by a collection
+# that keeps the directory inside LIVINAI_OUTPUT_CACHE_MB. See output_cache.py.
+# None of it may fail a request: a scene that was built or found is returned
+# even if its bookkeeping was not.
+
+def _output_cache(action, *args):
+    try:
+        return getattr(OutputCache(OUTPUT_DIR), action)(*args)
+    except OSError as error:
+        print(f"[WALK] Output cache {action} failed: {error}", file=sys.stderr)
+        return None
+
+
+# ================= SINGLE FLIGHT =================
+# The same deterministic scene is often asked for twice at once: the app
+# retries a slow request, or two phones open the same home. Each used to build
+# it in full — minutes of CPU apiece — and the two converged harmlessly on
+# `os.replace`. Now the first request takes a lease on the cache id, a file
+# beside the outputs, and every other request for that id waits for its files
+# instead of building them again.
+#
+# A lease is only good until it expires, and the builder renews it while it
+# works, so a build that dies without cleaning up — a killed process, a lost
+# container — delays the next request by one lease, not forever. A waiter that
+# finds the lease gone or expired with no files to show for it builds the scene
+# itself.
+
+BUILD_LEASE_SECONDS = float(os.environ.get("LIVINAI_BUILD_LEASE_SECONDS", "120"))
+BUILD_WAIT_POLL_SECONDS = float(os.environ.get("LIVINAI_BUILD_WAIT_POLL_SECONDS", "1"))
+
+# A volume shared between machines (Modal's) only shows one machine's writes to
+# another after the writer commits and the reader reloads. `share_output_volume`
+# installs those two calls; on one machine's disk they are not needed.
+_VOLUME = {"commit": None, "reload": None}
+
+
+def share_output_volume(commit, reload):
+    """Make leases visible across machines that share OUTPUT_DIR as a volume.
+
+    Leases then stop being strictly exclusive: two machines that take the
+    same lease within one commit of each other can both build, exactly as
+    before leases existed. Every other overlap waits.
+    """
+    _VOLUME["commit"] = commit
+    _VOLUME["reload"] = reload
+
+
+def _volume(action):
+    call = _VOLUME[action]
+    if call is None:
+        return
+    try:
+        call()
+    except Exception as error:
+        # A reload refused because a file is open, or a commit racing another:
+        # the lease is an optimisation, so neither is worth failing a build.
+        print(f"[WALK] Output volume {action} failed: {error}", file=sys.stderr)
+
+
+def _lease_record(path):
+    """The lease at `path`, or None when there is none.
+
+    A lease caught half-written is treated as freshly taken.
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {"owner": None, "expires": time.time() + BUILD_LEASE_SECONDS}
+
+
+def _write_lease(path, owner, exclusive):
+    record = json.dumps({
+        "owner": owner,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "expires": time.time() + BUILD_LEASE_SECONDS,
+    })
+    if exclusive:
+        try:
+            descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+            handle.write(record)
+    else:
+        renewal = path.with_name(f"{path.name}.{owner}")
+        renewal.write_text(record, encoding="utf-8")
+        os.replace(renewal, path)
+    _volume("commit")
+    return True
+
+
+def _break_expired_lease(path, record, breaker):
+    """Remove the expired lease `record` from `path`, and nothing newer.
+
+    The lease is moved aside before it is looked at again, and only one
+    process can move a given file. If what was moved is not the lease that
+    expired — another waiter broke it and took a fresh one in between — it is
+    put back, unless yet another lease has been taken there since.
+    """
+    aside = path.with_name(f"{path.name}.{breaker}.expired")
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        return
+    moved = _lease_record(aside) or {}
+    if moved.get("owner") != record.get("owner"):
+        try:
+            os.link(aside, path)
+        except FileExistsError:
+            pass
+    aside.unlink(missing_ok=True)
+
+
+@contextmanager
+def single_flight(cache_id, ready):
+    """Hold the build lease for `cache_id`, or wait for whoever holds it.
+
+    Yields True when `ready()` says the outputs already exist, whether they
+    did on arrival or appeared while waiting. Otherwise yields False with the
+    lease held, renewed until the block exits.
+    """
+    lease = OUTPUT_DIR / f".{cache_id}.lease"
+    owner = uuid.uuid4().hex
+    while True:
+        _volume("reload")
+        if ready():
+            yield True
+            return
+        if _write_lease(lease, owner, exclusive=True):
+            break
+        record = _lease_record(lease)
+        if record is not None and record.get("expires", 0) < time.time():
+            print(f"[WALK] Build lease for {cache_id} expired; taking it over", file=sys.stderr)
+            _break_expired_lease(lease, record, owner)
+            continue
+        time.sleep(BUILD_WAIT_POLL_SECONDS)
+
+    stopped = threading.Event()
+
+    def renew():
+        while not stopped.wait(BUILD_LEASE_SECONDS / 3):
+            if (_lease_record(lease) or {}).get("owner") == owner:
+                _write_lease(lease, owner, exclusive=False)
+
+    renewer = threading.Thread(target=renew, name=f"lease-{cache_id[:8]}", daemon=True)
+    renewer.start()
+    try:
+        # Someone may have finished between the last look and the lease.
+        yield ready()
+    finally:
+        stopped.set()
+        renewer.join()
+        if (_lease_record(lease) or {}).get("owner") == owner:
+            lease.unlink(missing_ok=True)
+            _volume("commit")
+
+
 def room_configs(room_configs, settings):
     """Match Livinai_web/backend/app.py::_exact_room_configs exactly."""
     return [
@@ -77,6 +256,14 @@ def build(payload):
     configs = room_configs(payload.get("roomConfigs") or [], settings)
     if len(configs) != len(rooms):
         raise ValueError("Every room must have one room configuration.")
+    export_profile = payload.get("exportProfile") or "standard"
+    if export_profile not in EXPORT_PROFILES:
+        raise ValueError(
+            f"exportProfile must be one of {', '.join(EXPORT_PROFILES)}."
+        )
+    # One GLB per room's shell and furniture instead of one for the home, so
+    # a client can show the spawn room before the rest has downloaded.
+    chunked = payload.get("chunked") is True
 
     cache_payload = {
         "rooms": rooms,
@@ -90,46 +277,295 @@ def build(payload):
         "format": "interior-plan-gltf-v41-cased-openings",
         "interiorPlanSource": interior_plan_source_version(),
     }
+    if export_profile != "standard":
+        # Only named when it is not the default, so every scene cached before
+        # the option existed keeps its key.
+        cache_payload["exportProfile"] = export_profile
+    if chunked:
+        cache_payload["chunked"] = True
     cache_id = scene_cache_key(cache_payload)
     model_path = OUTPUT_DIR / f"{cache_id}.glb"
     metadata_path = OUTPUT_DIR / f"{cache_id}.json"
 
-    if model_path.is_file() and metadata_path.is_file():
-        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
-        return {"success": True, "cached": True, "modelName": model_path.name, **metadata}
+    def ready():
+        if not chunked:
+            return model_path.is_file() and metadata_path.is_file()
+        # A chunked scene is its metadata and every chunk it lists. Chunks are
+        # shared between scenes, so one can be gone while the metadata stays.
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return False
+        return all((OUTPUT_DIR / chunk["model"]).is_file() for chunk in metadata["chunks"])
+
+    def cached():
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            # Evicted between the check and the read: build it again, under
+            # the lease like any other build.
+            return None
+        _output_cache("record", cache_id, "hit")
+        return {"success": True, "cached": True, "modelName": _model_name(model_path, metadata), **metadata}
+
+    if ready():
+        response = cached()
+        if response is not None:
+            return response
+
+    while True:
+        with single_flight(cache_id, ready) as built_elsewhere:
+            if built_elsewhere:
+                response = cached()
+                if response is not None:
+                    return response
+                # Ready when looked at, gone when read. The lease may not be
+                # ours — `single_flight` does not take one for a scene that
+                # is already there — so go round and take it before building.
+                continue
+            response = _build_scene(
+                cache_id,
+                model_path,
+                metadata_path,
+                rooms,
+                doors,
+                windows,
+                balconies,
+                configs,
+                payload.get("pixelsPerMeter"),
+                wall_openings,
+                export_profile,
+                chunked,
+            )
+        break
+    _output_cache("record", cache_id, "build")
+    _output_cache("collect")
+    return response
+
+
+def _model_name(model_path, metadata):
+    """The file a response names as its model.
+
+    For a chunked scene, the spawn room's shell: every response still names
+    one servable file, and a client that knows nothing of `chunks` is handed
+    the room it starts in rather than an error.
+    """
+    chunks = metadata.get("chunks")
+    return chunks[0]["model"] if chunks else model_path.name
 
+
+# ================= BUILD PROFILE =================
+# Opt-in. With LIVINAI_BUILD_PROFILE=1 a build's metadata carries a `profile`:
+# wall and CPU seconds, peak memory and triangles per stage and per room (see
+# engine/interior_plan/build_profile.py). It describes the build that produced
+# the files, so a cache hit hands back the original build's profile. With
+# LIVINAI_BUILD_TRACE_DIR set, each build also writes `{cache_id}.trace.json`
+# there, for chrome://tracing or Perfetto.
+BUILD_TRACE_DIR = os.environ.get("LIVINAI_BUILD_TRACE_DIR") or None
+BUILD_PROFILE = (
+    os.environ.get("LIVINAI_BUILD_PROFILE", "") not in ("", "0")
+    or BUILD_TRACE_DIR is not None
+)
+
+
+def _build_scene(cache_id, model_path, metadata_path, rooms, doors, windows,
+                 balconies, configs, pixels_per_meter, wall_openings,
+                 export_profile, chunked=False):
     token = uuid.uuid4().hex
     temporary_model = OUTPUT_DIR / f".{cache_id}.{token}.glb"
     temporary_metadata = OUTPUT_DIR / f".{cache_id}.{token}.json"
+    profile = BuildProfile() if BUILD_PROFILE else None
     try:
+        # Chunks are written straight into OUTPUT_DIR: each is renamed to its
+        # content hash only once complete, so none is ever seen half-written.
         metadata = build_realtime_scene(
-            temporary_model,
+            OUTPUT_DIR if chunked else temporary_model,
             rooms,
             doors,
             windows,
             balconies,
             configs,
-            payload.get("pixelsPerMeter"),
+            pixels_per_meter,
             wall_openings=wall_openings,
+            export_profile=export_profile,
+            profile=profile,
+            chunked=chunked,
         )
+        if profile is not None and BUILD_TRACE_DIR:
+            trace_dir = Path(BUILD_TRACE_DIR)
+            trace_dir.mkdir(parents=True, exist_ok=True)
+            profile.write_chrome_trace(trace_dir / f"{cache_id}.trace.json")
         temporary_metadata.write_text(
             json.dumps(metadata, separators=(",", ":")),
             encoding="utf-8",
         )
-        # Another worker may have completed the same deterministic scene first.
-        # Replacing is safe because both files are already complete and share the
-        # same source/configuration hash.
-        os.replace(temporary_model, model_path)
+        # The lease makes a second build of the same scene rare, not
+        # impossible (see `share_output_volume`). Replacing is still safe
+        # because both files are already complete and share the same
+        # source/configuration hash.
+        if not chunked:
+            os.replace(temporary_model, model_path)
         os.replace(temporary_metadata, metadata_path)
-        return {"success": True, "cached": False, "modelName": model_path.name, **metadata}
+        return {"success": True, "cached": False, "modelName": _model_name(model_path, metadata), **metadata}
     finally:
         temporary_model.unlink(missing_ok=True)
         temporary_metadata.unlink(missing_ok=True)
 
 
+# ================= LONG-LIVED WORKER =================
+# Every one-shot export pays for Python, Open3D, trimesh and shapely, the
+# exporter's own modules and the furniture variations it installs, before it
+# does any work — seconds of imports for a build that may be served from cache
+# in milliseconds. The server pays for them once.
+#
+# Protocol: one JSON object per line on stdin, `{"id": ..., "payload": {...}}`,
+# and one per line on stdout, `{"id": ..., "response": {...}}`, where the
+# response is exactly what the file protocol writes. Responses come back in the
+# order builds finish, not the order they were asked for. The builder prints
+# its diagnostics on stdout, so the protocol keeps the real stdout to itself
+# and everything else written there — Python or native — goes to stderr.
+
+# Builder processes forked from the warm server. Each runs one export at a time.
+SERVE_WORKERS = max(1, int(os.environ.get("LIVINAI_RENDER_WORKERS", "1") or 1))
+# Requests allowed to wait for a free builder. One more than this is turned away
+# at once, as busy, rather than left to time out at the back of a long queue.
+SERVE_QUEUE = max(0, int(os.environ.get("LIVINAI_RENDER_QUEUE", "8") or 0))
+BUSY_ERROR = "The walkthrough renderer is busy. Please try again in a moment."
+
+
+def _build_response(payload):
+    """`build`, reduced to the response the file protocol would write."""
+    try:
+        return build(payload)
+    except Exception as error:
+        return {"success": False, "error": str(error)}
+
+
+def _preload():
+    """Load what every build would otherwise load for itself."""
+    import asset_pack
+    import furniture_catalog
+
+    models = furniture_catalog.preload_catalog()
+    pack = asset_pack.open_pack()
+    loaded = (
+        f"asset pack {pack.hash} mapped"
+        if pack is not None
+        else f"{models} catalog models preloaded"
+    )
+    print(f"[WALK] Render server ready: {loaded}", file=sys.stderr)
+
+
+def serve(source=None, sink=None, workers=None, queue=None):
+    """Answer JSON-line build requests until `source` closes."""
+    if sink is None:
+        # Keep the real stdout for responses and point file descriptor 1 at
+        # stderr, so nothing the builder or Open3D prints can land mid-line.
+        sink = os.fdopen(os.dup(1), "w", encoding="utf-8")
+        os.dup2(2, 1)
+        sys.stdout = sys.stderr
+    source = source or sys.stdin
+    workers = SERVE_WORKERS if workers is None else workers
+    queue = SERVE_QUEUE if queue is None else queue
+    _preload()
+
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    )
+    lock = threading.Lock()
+    state = {"pending": 0, "pool": ProcessPoolExecutor(workers, mp_context=context)}
+
+    def replace(broken):
+        """The pool to use now that `broken` has lost a builder."""
+        with lock:
+            if state["pool"] is broken:
+                broken.shutdown(wait=False)
+                state["pool"] = ProcessPoolExecutor(workers, mp_context=context)
+            return state["pool"]
+
+    def answer(request_id, response):
+        with lock:
+            sink.write(json.dumps({"id": request_id, "response": response},
+                                  separators=(",", ":")) + "\n")
+            sink.flush()
+
+    def finished(request_id, future, pool):
+        try:
+            response = future.result()
+        except BrokenProcessPool:
+            # A builder died outright — a native crash, or the kernel's OOM
+            # killer. Everything queued on that pool fails with it; the next
+            # request gets a fresh one.
+            response = {"success": False, "error": "The walkthrough renderer stopped unexpectedly."}
+            replace(pool)
+        except Exception as error:
+            response = {"success": False, "error": str(error)}
+        with lock:
+            state["pending"] -= 1
+        answer(request_id, response)
+
+    for line in source:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            request_id, payload = request.get("id"), request["payload"]
+        except (ValueError, KeyError, AttributeError) as error:
+            answer(None, {"success": False, "error": f"Malformed request: {error}"})
+            continue
+        with lock:
+            busy = state["pending"] >= workers + queue
+            if not busy:
+                state["pending"] += 1
+            pool = state["pool"]
+        if busy:
+            answer(request_id, {"success": False, "error": BUSY_ERROR})
+            continue
+        try:
+            future = pool.submit(_build_response, payload)
+        except BrokenProcessPool:
+            # Broken since the last request, before its callback replaced it.
+            pool = replace(pool)
+            future = pool.submit(_build_response, payload)
+        future.add_done_callback(
+            lambda done, request_id=request_id, pool=pool: finished(request_id, done, pool)
+        )
+    state["pool"].shutdown(wait=True)
+
+
 def main():
+    if len(sys.argv) == 2 and sys.argv[1] == "--serve":
+        serve()
+        return
+    if len(sys.argv) == 2 and sys.argv[1] == "--cache-stats":
+        # Collecting first, so the numbers describe what is on disk now.
+        _output_cache("collect")
+        print(json.dumps(_output_cache("stats"), indent=2))
+        return
+    if len(sys.argv) == 3 and sys.argv[1] == "--compile-asset-pack":
+        # An image build step, before the manifest: decode and parse every
+        # asset once, here, rather than in every cold process. See asset_pack.
+        import asset_pack
+
+        header = asset_pack.compile_pack(Path(sys.argv[2]).resolve())
+        print(
+            f"asset pack {header['hash']}: {len(header['textures'])} archviz maps, "
+            f"{len(header['models'])} catalog models at {header['textureMaxSize']} px"
+        )
+        return
+    if len(sys.argv) == 3 and sys.argv[1] == "--write-source-manifest":
+        # An image build step: record the fingerprint once the files are final,
+        # so no request ever has to hash them. See SOURCE_MANIFEST_ENV.
+        print(write_source_manifest(Path(sys.argv[2]).resolve()))
+        return
     if len(sys.argv) != 3:
-        raise SystemExit("usage: render_worker.py REQUEST_JSON RESPONSE_JSON")
+        raise SystemExit(
+            "usage: render_worker.py REQUEST_JSON RESPONSE_JSON\n"
+            "       render_worker.py --serve\n"
+            "       render_worker.py --cache-stats\n"
+            "       render_worker.py --compile-asset-pack PACK\n"
+            "       render_worker.py --write-source-manifest MANIFEST_JSON"
+        )
     request_path = Path(sys.argv[1]).resolve()
     response_path = Path(sys.argv[2]).resolve()
     try:
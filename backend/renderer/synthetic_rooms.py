@@ -0,0 +1,104 @@
+"""A stand-in for `plan_walkthrough.build_room`, shared by the room tests.
+
+A room is a textured floor with an archviz finish and a catalog chair
+registered with a PBR spec, with an editable group pointing at the chair: every
+kind of mesh and material record a real room carries, with no texture assets
+to read. Each room is seeded from its first corner, so the same job always
+builds the same room, and the name in each job's configuration is logged in
+`BUILT`, so a test can count what was actually furnished.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import archviz_materials  # noqa: E402
+import furniture_catalog  # noqa: E402
+import plan_walkthrough  # noqa: E402
+
+SPEC = {
+    "albedo": np.full((8, 8, 3), 120, dtype=np.uint8),
+    "normal": None,
+    "arm": None,
+    "roughness": 0.5,
+    "metallic": 0.0,
+}
+
+#: The configured name of every room `synthetic_room` built, in order.
+BUILT = []
+
+
+def synthetic_room(room, edges, config=None, furnished=True, plan_facts=None,
+                   kitchen_center=None):
+    BUILT.append((config or {}).get("name"))
+    rng = np.random.default_rng(int(room[0][0] * 10))
+    floor = o3d.geometry.TriangleMesh.create_box(3.0, 4.0, 0.01)
+    floor.translate(rng.random(3))
+    floor.triangle_uvs = o3d.utility.Vector2dVector(
+        rng.random((len(floor.triangles) * 3, 2))
+    )
+    floor.triangle_material_ids = o3d.utility.IntVector(
+        np.zeros(len(floor.triangles), dtype=np.int32)
+    )
+    floor.textures = [o3d.geometry.Image(SPEC["albedo"])]
+    floor.compute_vertex_normals()
+    archviz_materials.register_mesh_material(floor, "oak", (0.6, 0.5, 0.4), 0.16)
+    chair = o3d.geometry.TriangleMesh.create_sphere(0.3)
+    chair.vertex_colors = o3d.utility.Vector3dVector(
+        rng.random((len(chair.vertices), 3))
+    )
+    chair.compute_vertex_normals()
+    furniture_catalog._PBR_MESH_MATERIALS[chair] = SPEC
+    return dict(
+        meshes=[floor, chair],
+        footprints=[],
+        objects=[{"asset_key": "chair", "meshes": [chair]}],
+        poly=plan_walkthrough.Polygon(room),
+        lights=[],
+        floor_color=[0.6, 0.5, 0.4],
+    )
+
+
+def jobs(count=4, configs=None):
+    """`build_room` arguments for `count` 3 x 4 m rooms in a row along x.
+
+    Each room shares a wall with the next and is named `r{x}` after its left
+    edge; `configs` replaces a room's configuration by that name.
+    """
+    configs = configs or {}
+    return [
+        ([(x, 0), (x + 3, 0), (x + 3, 4), (x, 4)], [],
+         configs.get(f"r{x}", {"name": f"r{x}"}), True, {}, None)
+        for x in range(0, 3 * count, 3)
+    ]
+
+
+def assert_same_room(expected, actual):
+    """Two builds of one room carry the same meshes and material records."""
+    assert actual["poly"].equals(expected["poly"])
+    assert len(actual["meshes"]) == len(expected["meshes"])
+    for left, right in zip(expected["meshes"], actual["meshes"]):
+        for name, _vector in plan_walkthrough._MESH_ARRAYS:
+            assert np.array_equal(
+                np.asarray(getattr(left, name)),
+                np.asarray(getattr(right, name)),
+            ), name
+        assert [np.asarray(image).tobytes() for image in left.textures] == [
+            np.asarray(image).tobytes() for image in right.textures
+        ]
+        assert archviz_materials.mesh_material(right) == (
+            archviz_materials.mesh_material(left)
+        )
+        spec = furniture_catalog._catalog_spec(right)
+        assert (spec is None) == (furniture_catalog._catalog_spec(left) is None)
+    floor, chair = actual["meshes"][:2]
+    assert actual["objects"][0]["meshes"][0] is chair
+    assert archviz_materials.mesh_material(floor)[0] == "oak"
+    assert np.array_equal(furniture_catalog._catalog_spec(chair)["albedo"],
+                          SPEC["albedo"])
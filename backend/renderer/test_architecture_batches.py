@@ -0,0 +1,173 @@
+"""Does a batched export keep every wall findable without a node per wall?
+
+Run with `python test_architecture_batches.py` (or pytest) from this directory.
+
+The plan is two 4 x 3 m rooms side by side. `build_scene` is replaced by a
+synthetic one — coloured boxes for walls and floors and one chair — so the
+exporter's grouping and writing run for real without any texture assets. The
+same scene is exported per mesh and batched, and every index range the batched
+metadata records is checked against the triangles the per-mesh export wrote
+for that mesh.
+"""
+
+import json
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+import trimesh
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import webgl_walkthrough  # noqa: E402
+from webgl_walkthrough import original  # noqa: E402
+
+# One plan pixel to one metre once the exporter's spatial boosts are applied.
+PIXELS_PER_METER = webgl_walkthrough.WEB_SPATIAL_BOOST * original.SCALE_BOOST
+ROOMS = [
+    [(0, 0), (4, 0), (4, -3), (0, -3)],
+    [(4, 0), (8, 0), (8, -3), (4, -3)],
+]
+PLASTER = (0.92, 0.90, 0.86)
+ACCENT = (0.45, 0.55, 0.62)
+
+
+def box(size, corner, color):
+    mesh = o3d.geometry.TriangleMesh.create_box(*size)
+    mesh.translate(corner)
+    mesh.paint_uniform_color(color)
+    mesh.compute_vertex_normals()
+    return mesh
+
+
+def synthetic_scene(*args, **kwargs):
+    meshes = []
+    for left in (0.0, 4.0):
+        meshes.append(box((4.0, 3.0, 0.05), (left, 0.0, -0.05), (0.6, 0.5, 0.4)))
+        meshes.append(box((4.0, 0.1, 2.4), (left, 0.0, 0.0), PLASTER))
+        meshes.append(box((4.0, 0.1, 2.4), (left, 2.9, 0.0), ACCENT))
+        meshes.append(box((0.1, 3.0, 2.4), (left + 0.05, 0.0, 0.0), PLASTER))
+        meshes.append(box((0.1, 3.0, 2.4), (left + 3.85, 0.0, 0.0), PLASTER))
+    chair = box((0.5, 0.5, 0.9), (1.0, 1.0, 0.0), (0.3, 0.2, 0.1))
+    meshes.append(chair)
+    allowed = original.Polygon([(0.3, 0.3), (7.7, 0.3), (7.7, 2.7), (0.3, 2.7)])
+    return {
+        "meshes": meshes,
+        "furniture_objects": [{
+            "asset_key": "dining_chair",
+            "meshes": [chair],
+            "position": (1.25, 1.25),
+        }],
+        "spawn": (2.0, 1.5),
+        "allowed": allowed,
+    }
+
+
+def export(profile):
+    build_scene = original.build_scene
+    original.build_scene = synthetic_scene
+    path = Path(tempfile.mkdtemp(prefix="batch-test-")) / f"{profile}.glb"
+    try:
+        metadata = webgl_walkthrough.build_realtime_scene(
+            path, ROOMS, [], [], [],
+            [{"room_type": "Bedroom"}, {"room_type": "Office"}],
+            PIXELS_PER_METER,
+            export_profile=profile,
+        )
+    finally:
+        original.build_scene = build_scene
+    scene = trimesh.load(path, force="scene", process=False)
+    scene.metadata["path"] = path
+    return metadata, scene
+
+
+def gltf_json(path):
+    data = Path(path).read_bytes()
+    (length,) = struct.unpack_from("<I", data, 12)
+    return json.loads(data[20:20 + length])
+
+
+def triangles(mesh, first=0, count=None):
+    faces = mesh.faces.reshape(-1)[first:None if count is None else first + count]
+    return np.sort(np.round(mesh.vertices[faces.reshape(-1, 3)], 4).reshape(-1, 9), axis=0)
+
+
+def test_architecture_is_one_node_per_room_and_material():
+    standard, _scene = export("standard")
+    batched, scene = export("batched")
+    assert "architecture" not in standard
+    architecture = [name for name in scene.geometry if name.startswith("architecture_")]
+    # Floor, plaster and accent in each of the two rooms.
+    assert sorted(name[:len("architecture_room_00")] for name in architecture) == [
+        "architecture_room_00"] * 3 + ["architecture_room_01"] * 3
+    assert batched["drawCalls"] == standard["drawCalls"] - 10 + 6
+    assert any(name.startswith("furniture_000_") for name in scene.geometry)
+    assert {batch["roomIndex"] for batch in batched["architecture"]} == {0, 1}
+
+
+def test_every_mesh_has_one_range_and_the_ranges_tile_the_batch():
+    batched, scene = export("batched")
+    parts = [part for batch in batched["architecture"] for part in batch["parts"]]
+    assert sorted(part["mesh"] for part in parts) == list(range(10))
+    for batch in batched["architecture"]:
+        mesh = scene.geometry[batch["node"]]
+        first = 0
+        for part in batch["parts"]:
+            assert part["firstIndex"] == first
+            first += part["indexCount"]
+        assert first == mesh.faces.size
+
+
+def test_each_range_draws_exactly_the_mesh_it_names():
+    _standard, per_mesh = export("standard")
+    batched, scene = export("batched")
+    for batch in batched["architecture"]:
+        mesh = scene.geometry[batch["node"]]
+        for part in batch["parts"]:
+            prefix = f"architecture_{part['mesh']:04d}_"
+            (name,) = [name for name in per_mesh.geometry if name.startswith(prefix)]
+            expected = triangles(per_mesh.geometry[name])
+            assert np.array_equal(
+                triangles(mesh, part["firstIndex"], part["indexCount"]), expected
+            ), name
+            corners = mesh.vertices[mesh.faces.reshape(-1)[
+                part["firstIndex"]:part["firstIndex"] + part["indexCount"]
+            ]]
+            assert np.allclose(corners.min(axis=0), part["min"], atol=1e-4)
+            assert np.allclose(corners.max(axis=0), part["max"], atol=1e-4)
+
+
+def test_mobile_batches_and_quantizes():
+    batched, _scene = export("batched")
+    mobile, scene = export("mobile")
+    assert mobile["drawCalls"] == batched["drawCalls"]
+    assert mobile["architecture"] == batched["architecture"]
+    assert "KHR_mesh_quantization" in gltf_json(scene.metadata["path"])["extensionsUsed"]
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
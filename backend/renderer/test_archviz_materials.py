@@ -0,0 +1,177 @@
+"""Does the batched planar projection give exactly the UVs the loop gave?
+
+Run with `python test_archviz_materials.py` (or pytest) from this directory. No
+texture is read: the projection is pure geometry, and every floor, wall skin,
+threshold and curtain in an export goes through it, so a drifted UV would move
+a seam on every surface in the home.
+
+The reference below is the per-triangle loop the exporter used before, kept
+verbatim so the comparison is against behaviour that shipped rather than
+against a second copy of the new code. Running the file directly also prints
+the timing on a 100,000-triangle wall, which is the claim the change was made
+for.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+from archviz_materials import _projected_triangle_uvs  # noqa: E402
+
+
+def reference_uvs(mesh, repeat_m):
+    """The loop `_projected_triangle_uvs` replaced."""
+    triangles = np.asarray(mesh.triangles)
+    vertices = np.asarray(mesh.vertices)
+    if len(triangles) == 0:
+        return np.empty((0, 2), dtype=float)
+    tri_vertices = vertices[triangles]
+    normals = np.cross(
+        tri_vertices[:, 1] - tri_vertices[:, 0],
+        tri_vertices[:, 2] - tri_vertices[:, 0],
+    )
+    axis = np.argmax(np.abs(normals), axis=1)
+    uvs = np.empty((len(triangles), 3, 2), dtype=float)
+    minimum = vertices.min(axis=0)
+    repeat_m = max(float(repeat_m), 0.05)
+    for index in range(len(triangles)):
+        points = tri_vertices[index]
+        if axis[index] == 2:
+            uv = (points[:, [0, 1]] - minimum[[0, 1]]) / repeat_m
+        elif axis[index] == 0:
+            uv = (points[:, [1, 2]] - minimum[[1, 2]]) / repeat_m
+        else:
+            uv = (points[:, [0, 2]] - minimum[[0, 2]]) / repeat_m
+        uvs[index] = uv
+    return uvs.reshape((-1, 2))
+
+
+def wall_mesh(triangles=100_000, seed=0):
+    """A plaster wall run as the exporter sees one: a long, finely cut skin.
+
+    Half the grid faces Y, the rest is split between X returns and a floor
+    strip, with a little noise so the dominant axis is not the same everywhere.
+    """
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(triangles / 2)))
+    rows = int(np.ceil(triangles / (2 * columns)))
+    u, v = np.meshgrid(
+        np.linspace(0.0, 9.0, columns + 1),
+        np.linspace(0.0, 2.8, rows + 1),
+    )
+    u = u.ravel()
+    v = v.ravel()
+    wall = np.column_stack((u, np.zeros_like(u), v))
+    quarter = len(wall) // 4
+    wall[:quarter] = np.column_stack((
+        np.zeros(quarter), u[:quarter], v[:quarter]
+    ))
+    wall[quarter:2 * quarter] = np.column_stack((
+        u[quarter:2 * quarter], v[quarter:2 * quarter], np.zeros(quarter)
+    ))
+    wall += rng.normal(scale=0.002, size=wall.shape)
+
+    faces = []
+    for row in range(rows):
+        for column in range(columns):
+            a = row * (columns + 1) + column
+            b = a + 1
+            c = a + columns + 1
+            d = c + 1
+            faces.append((a, b, d))
+            faces.append((a, d, c))
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector(wall)
+    mesh.triangles = o3d.utility.Vector3iVector(
+        np.asarray(faces[:triangles], dtype=np.int32)
+    )
+    return mesh
+
+
+def test_uvs_are_bit_identical_on_a_mixed_mesh():
+    mesh = wall_mesh(20_000, seed=3)
+    for repeat_m in (0.01, 0.72, 1.3, 5.0):
+        expected = reference_uvs(mesh, repeat_m)
+        actual = _projected_triangle_uvs(mesh, repeat_m)
+        assert actual.dtype == expected.dtype
+        assert actual.shape == expected.shape
+        assert np.array_equal(actual, expected), f"UVs drifted at repeat {repeat_m}"
+
+
+def test_every_projection_plane_is_covered():
+    box = o3d.geometry.TriangleMesh.create_box(2.0, 3.0, 2.8)
+    assert np.array_equal(
+        _projected_triangle_uvs(box, 1.0),
+        reference_uvs(box, 1.0),
+    )
+
+
+def test_degenerate_triangles_match_too():
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector(
+        np.array([[0, 0, 0], [1, 1, 1], [2, 2, 2], [0, 0, 1]], dtype=float)
+    )
+    mesh.triangles = o3d.utility.Vector3iVector(
+        np.array([[0, 1, 2], [0, 0, 3]], dtype=np.int32)
+    )
+    assert np.array_equal(
+        _projected_triangle_uvs(mesh, 1.0),
+        reference_uvs(mesh, 1.0),
+    )
+
+
+def test_empty_mesh():
+    assert _projected_triangle_uvs(o3d.geometry.TriangleMesh(), 1.0).shape == (0, 2)
+
+
+def benchmark(triangles=100_000, repeats=3):
+    """Best-of timings for the loop and the batched projection."""
+    mesh = wall_mesh(triangles)
+    timings = {}
+    for name, function in (
+        ("loop", reference_uvs),
+        ("batched", _projected_triangle_uvs),
+    ):
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            function(mesh, 1.3)
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best
+    return timings
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+
+    timings = benchmark()
+    print(
+        f"\n100,000-triangle wall: loop {timings['loop'] * 1000:.1f} ms, "
+        f"batched {timings['batched'] * 1000:.1f} ms "
+        f"({timings['loop'] / max(timings['batched'], 1e-9):.0f}x)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
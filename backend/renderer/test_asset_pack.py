@@ -0,0 +1,276 @@
+"""Does a compiled asset pack serve exactly what the source files would?
+
+Run with `python test_asset_pack.py` (or pytest) from this directory.
+
+The assets are synthetic and written to a temporary directory: JPG maps for
+one archviz material and a GLB sofa with 1024-pixel maps for the catalog. The
+pack is compiled from them, then every map and model it serves is compared with
+what decoding and parsing the files gives, and the JPG decoder is watched to
+make sure the pack really stood in for it. Running the file directly also
+prints the cold load time both ways.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+import trimesh
+from PIL import Image
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import archviz_materials  # noqa: E402
+import asset_pack  # noqa: E402
+import furniture_catalog  # noqa: E402
+import webgl_walkthrough  # noqa: E402
+
+ASSETS = Path(tempfile.mkdtemp(prefix="asset-pack-test-"))
+MATERIAL_ROOT = ASSETS / "ambientcg"
+CATALOG_ROOT = ASSETS / "catalog"
+WEB_SIZE = webgl_walkthrough.WEB_TEXTURE_MAX_SIZE
+# Written where the catalog looks for a modern sofa, so nothing has to be told
+# which file to load.
+SOFA = furniture_catalog.MODERN_MODELS["sofa"]
+
+
+def noise(seed, shape):
+    return np.random.default_rng(seed).integers(0, 255, shape, dtype=np.uint8)
+
+
+def write_assets(seed=0):
+    folder = MATERIAL_ROOT / "Plaster001"
+    folder.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(noise(seed, (512, 512, 3))).save(folder / "Plaster001_1K-JPG_Color.jpg")
+    Image.fromarray(noise(seed + 1, (512, 512, 3))).save(folder / "Plaster001_1K-JPG_NormalDX.jpg")
+    Image.fromarray(noise(seed + 2, (512, 512))).save(folder / "Plaster001_1K-JPG_Roughness.jpg")
+
+    (CATALOG_ROOT / SOFA).parent.mkdir(parents=True, exist_ok=True)
+    seat = trimesh.creation.box((0.8, 0.5, 0.4))
+    seat.unmerge_vertices()
+    seat.visual = trimesh.visual.TextureVisuals(
+        uv=np.random.default_rng(seed).random((len(seat.vertices), 2)),
+        material=trimesh.visual.material.PBRMaterial(
+            baseColorTexture=Image.fromarray(noise(seed + 3, (1024, 1024, 3))),
+            normalTexture=Image.fromarray(noise(seed + 4, (1024, 1024, 3))),
+            metallicRoughnessTexture=Image.fromarray(noise(seed + 5, (1024, 1024, 3))),
+            roughnessFactor=0.4,
+        ),
+    )
+    legs = trimesh.creation.cylinder(radius=0.03, height=0.3)
+    legs.visual = trimesh.visual.TextureVisuals(
+        material=trimesh.visual.material.PBRMaterial(baseColorFactor=[90, 60, 40, 255])
+    )
+    trimesh.Scene([seat, legs]).export(CATALOG_ROOT / SOFA)
+
+
+def point_loaders_at_assets():
+    archviz_materials.MATERIAL_ROOT = MATERIAL_ROOT
+    furniture_catalog.CATALOG_ROOT = CATALOG_ROOT
+
+
+def using_pack(path):
+    """Point the loaders at `path` (or at no pack) with nothing remembered."""
+    if path is None:
+        os.environ.pop(asset_pack.ASSET_PACK_ENV, None)
+    else:
+        os.environ[asset_pack.ASSET_PACK_ENV] = str(path)
+    asset_pack.forget_pack()
+    archviz_materials._texture_pixels.cache_clear()
+    furniture_catalog.clear_catalog_cache()
+
+
+def compiled(name="assets.pack", seed=0, texture_max_size=WEB_SIZE):
+    point_loaders_at_assets()
+    write_assets(seed)
+    using_pack(None)
+    path = ASSETS / name
+    saved = furniture_catalog.TEXTURE_MAX_SIZE
+    furniture_catalog.TEXTURE_MAX_SIZE = texture_max_size
+    try:
+        asset_pack.compile_pack(path)
+    finally:
+        furniture_catalog.TEXTURE_MAX_SIZE = saved
+    return path
+
+
+def mapped(array):
+    """Whether `array` is a view into the pack's mapping, not a copy."""
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array is not None
+
+
+def counted_decodes():
+    real = o3d.io.read_image
+    calls = []
+
+    def read_image(path):
+        calls.append(path)
+        return real(path)
+
+    o3d.io.read_image = read_image
+    return real, calls
+
+
+def test_archviz_maps_come_from_the_pack_unchanged():
+    path = compiled()
+    using_pack(None)
+    decoded = {name: archviz_materials._map_pixels("plaster", name) for name in archviz_materials.MAP_NAMES}
+    tinted = archviz_materials._texture_pixels("plaster", (0.8, 0.7, 0.6), 0.3)
+    using_pack(path)
+    real, calls = counted_decodes()
+    try:
+        for name, pixels in decoded.items():
+            packed = archviz_materials._map_pixels("plaster", name)
+            if pixels is None:
+                assert packed is None, name
+                continue
+            assert packed.dtype == pixels.dtype and np.array_equal(packed, pixels), name
+            assert mapped(packed), name
+        assert np.array_equal(
+            archviz_materials._texture_pixels("plaster", (0.8, 0.7, 0.6), 0.3), tinted
+        )
+        record = archviz_materials.pbr_material("plaster", tint=(0.8, 0.7, 0.6), tint_strength=0.3)
+        assert np.array_equal(np.asarray(record.roughness_img), decoded["Roughness"])
+    finally:
+        o3d.io.read_image = real
+        using_pack(None)
+    assert calls == []
+
+
+def test_catalog_models_come_from_the_pack_unchanged():
+    path = compiled()
+    parse = furniture_catalog._load_trimesh_scene
+    try:
+        using_pack(None)
+        parsed = furniture_catalog._catalog_model(CATALOG_ROOT / SOFA)
+        placed = furniture_catalog.load_catalog_asset("sofa", "modern", 1.7, 0.8, 0.8, None)
+        using_pack(path)
+        furniture_catalog._load_trimesh_scene = None  # a parse now would fail
+        packed = furniture_catalog._catalog_model(CATALOG_ROOT / SOFA)
+        packed_placed = furniture_catalog.load_catalog_asset("sofa", "modern", 1.7, 0.8, 0.8, None)
+    finally:
+        furniture_catalog._load_trimesh_scene = parse
+        using_pack(None)
+    assert np.array_equal(packed["extents"], parsed["extents"])
+    assert len(packed["components"]) == len(parsed["components"]) == 2
+    for mine, theirs in zip(packed["components"], parsed["components"]):
+        for name in ("vertices", "faces", "colors"):
+            assert (mine[name] is None) == (theirs[name] is None), name
+            if theirs[name] is not None:
+                assert np.array_equal(mine[name], theirs[name]), name
+                assert mapped(mine[name]), name
+        assert (mine["maps"] is None) == (theirs["maps"] is None)
+        if theirs["maps"] is not None:
+            for name in ("uv", "albedo", "normal", "arm"):
+                assert np.array_equal(mine["maps"][name], theirs["maps"][name]), name
+            assert mine["maps"]["albedo"].shape[:2] == (WEB_SIZE, WEB_SIZE)
+    for mine, theirs in zip(packed_placed, placed):
+        assert np.array_equal(np.asarray(mine.vertices), np.asarray(theirs.vertices))
+        mine_spec = furniture_catalog._catalog_spec(mine)
+        theirs_spec = furniture_catalog._catalog_spec(theirs)
+        assert (mine_spec is None) == (theirs_spec is None)
+        if theirs_spec is not None:
+            assert np.array_equal(mine_spec["albedo"], theirs_spec["albedo"])
+
+
+def test_a_pack_from_other_code_or_another_size_is_not_used():
+    path = compiled(texture_max_size=None)
+    fingerprint = asset_pack.compiler_fingerprint
+    asset_pack.compiler_fingerprint = lambda: "not-this-code"
+    try:
+        using_pack(path)
+        assert asset_pack.open_pack() is None
+    finally:
+        asset_pack.compiler_fingerprint = fingerprint
+    using_pack(path)
+    pack = asset_pack.open_pack()
+    # Compiled with the desktop's authored maps: no models for the web size,
+    # while the archviz maps, which do not depend on it, are still served.
+    assert pack.texture_max_size is None
+    assert pack.model(SOFA, WEB_SIZE) is None
+    assert pack.model(SOFA, None) is not None
+    assert pack.texture("Plaster001", "Color") is not None
+    using_pack(ASSETS / "missing.pack")
+    assert asset_pack.open_pack() is None
+    using_pack(None)
+
+
+def test_the_hash_follows_the_content_and_stands_in_for_the_catalog():
+    first = compiled("first.pack")
+    again = compiled("again.pack")
+    changed = compiled("changed.pack", seed=7)
+    hashes = []
+    for path in (first, again, changed):
+        using_pack(path)
+        hashes.append(asset_pack.open_pack().hash)
+    assert hashes[0] == hashes[1] != hashes[2]
+    versions = []
+    for path in (first, again, changed):
+        using_pack(path)
+        versions.append(webgl_walkthrough.compute_source_version())
+    using_pack(None)
+    assert versions[0] == versions[1] != versions[2]
+
+
+def test_catalog_files_outside_the_pack_still_change_the_version():
+    path = compiled()
+    art = CATALOG_ROOT / "pro" / "custom_wall_art" / "canvas.png"
+    art.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(noise(0, (32, 32, 3))).save(art)
+    using_pack(path)
+    try:
+        before = webgl_walkthrough.compute_source_version()
+        # The engine reads wall art straight from disk; the pack never holds it.
+        Image.fromarray(noise(1, (48, 48, 3))).save(art)
+        after = webgl_walkthrough.compute_source_version()
+        # A packed model is still stood in for by the pack's hash alone.
+        os.utime(CATALOG_ROOT / SOFA, ns=(1, 1))
+        touched = webgl_walkthrough.compute_source_version()
+    finally:
+        art.unlink()
+        using_pack(None)
+    assert before != after
+    assert touched == after
+
+
+def _timing():
+    path = compiled("timing.pack")
+    for label, pack in (("source files", None), ("asset pack", path)):
+        using_pack(pack)
+        started = time.perf_counter()
+        for name in archviz_materials.MAP_NAMES:
+            archviz_materials._map_pixels("plaster", name)
+        furniture_catalog._catalog_model(CATALOG_ROOT / SOFA)
+        print(f"  cold load from {label}: {(time.perf_counter() - started) * 1000:.1f} ms")
+    using_pack(None)
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    _timing()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
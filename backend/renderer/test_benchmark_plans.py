@@ -0,0 +1,110 @@
+"""Are the benchmark's synthetic plans plans the app could have drawn?
+
+Run with `python test_benchmark_plans.py` (or pytest) from this directory.
+
+`benchmark_render.synthetic_plan` generates the 1-to-30-room plans the
+benchmark times. A plan with overlapping rooms, a door into nowhere or a room
+nobody can reach would time something the app never sends, so each size is
+checked with shapely: rooms tile without overlap, every door sits on a wall two
+rooms share, every window and balcony on an outside wall, and the doors join
+every room to the first.
+"""
+
+import sys
+from pathlib import Path
+
+from shapely.geometry import LineString, Polygon
+from shapely.ops import unary_union
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmark_render import DEFAULT_ROOM_COUNTS, compare, synthetic_plan  # noqa: E402
+
+
+def shapes(plan):
+    return [Polygon(room) for room in plan["rooms"]]
+
+
+def rooms_touching(rooms, segment):
+    line = LineString(segment[:2])
+    return [
+        index for index, room in enumerate(rooms)
+        if room.boundary.buffer(0.5).contains(line)
+    ]
+
+
+def test_rooms_tile_without_overlapping():
+    for count in DEFAULT_ROOM_COUNTS:
+        rooms = shapes(synthetic_plan(count))
+        assert len(rooms) == count
+        assert all(room.is_valid and room.area > 6 * 100 * 100 for room in rooms)
+        union = unary_union(rooms)
+        assert abs(union.area - sum(room.area for room in rooms)) < 1.0
+
+
+def test_doors_join_every_room_and_windows_face_outside():
+    for count in DEFAULT_ROOM_COUNTS:
+        plan = synthetic_plan(count)
+        rooms = shapes(plan)
+        linked = {0}
+        pairs = []
+        for door in plan["doors"]:
+            touching = rooms_touching(rooms, door)
+            assert len(touching) == 2, (count, door, touching)
+            assert LineString(door).length > 89.9
+            pairs.append(touching)
+        while True:
+            grown = linked | {b for a, b in pairs if a in linked} | {a for a, b in pairs if b in linked}
+            if grown == linked:
+                break
+            linked = grown
+        assert linked == set(range(count)), count
+        for opening in plan["windows"] + plan["balconies"]:
+            assert len(rooms_touching(rooms, opening)) == 1, (count, opening)
+        assert len(plan["roomConfigs"]) == count
+        assert plan["roomConfigs"][0]["roomType"] == "Living Room"
+
+
+def test_the_same_count_and_seed_give_the_same_plan():
+    assert synthetic_plan(16) == synthetic_plan(16)
+    assert synthetic_plan(16, seed=1) != synthetic_plan(16)
+    large = {config["roomType"] for config in synthetic_plan(30)["roomConfigs"]}
+    assert {"Kitchen", "Bedroom", "Bathroom", "Laundry"} <= large
+    assert synthetic_plan(30)["balconies"]
+
+
+def test_comparisons_line_up_plan_sizes():
+    before = {"plans": [{"rooms": 4, "wallSeconds": 2.0, "peakRssMb": 200.0,
+                         "triangles": 1000, "glbBytes": 2_000_000}]}
+    after = {"plans": [{"rooms": 4, "wallSeconds": 3.0, "peakRssMb": 200.0,
+                        "triangles": 1500, "glbBytes": 1_000_000},
+                       {"rooms": 8, "wallSeconds": 5.0}]}
+    lines = compare(before, after).splitlines()
+    assert len(lines) == 2
+    assert "3.00 s (+50%)" in lines[1]
+    assert "1,500 (+50%)" in lines[1]
+    assert "1.00 MB (-50%)" in lines[1]
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,178 @@
+"""Does a profiled build say where its time went, room by room?
+
+Run with `python test_build_profile.py` (or pytest) from this directory.
+
+Rooms are furnished by a synthetic `build_room` — a box and a sphere per room,
+with a short sleep so each room has time to measure — so the test needs no
+texture assets. The same plan is built in this process and in forked workers,
+whose spans have to come back and land on this process's timeline. A span's
+memory is its own change in the resident set, not the process's peak so far.
+"""
+
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import plan_walkthrough  # noqa: E402
+from build_profile import (  # noqa: E402
+    BuildProfile,
+    active_profile,
+    profiling,
+    stage,
+    tally,
+)
+
+
+def synthetic_room(room, edges, config=None, furnished=True, plan_facts=None,
+                   kitchen_center=None):
+    time.sleep(0.05)
+    floor = o3d.geometry.TriangleMesh.create_box(3.0, 4.0, 0.01)
+    with stage("furnish", roomType=config["room_type"]) as span:
+        chair = o3d.geometry.TriangleMesh.create_sphere(0.3)
+        if span is not None:
+            span["triangles"] = len(chair.triangles)
+    return dict(
+        meshes=[floor, chair, chair],
+        footprints=[],
+        objects=[],
+        poly=plan_walkthrough.Polygon(room),
+        lights=[],
+        floor_color=[0.6, 0.5, 0.4],
+    )
+
+
+def jobs(count=3):
+    return [
+        ([(x, 0), (x + 3, 0), (x + 3, 4), (x, 4)], [],
+         {"room_type": ("Bedroom", "Kitchen", "Office")[x // 3 % 3]},
+         True, {}, None)
+        for x in range(0, 3 * count, 3)
+    ]
+
+
+def profiled_rooms(workers):
+    build_room = plan_walkthrough.build_room
+    plan_walkthrough.build_room = synthetic_room
+    try:
+        plan_walkthrough.clear_room_build_cache()
+        with profiling(BuildProfile()) as profile:
+            with stage("build_scene"):
+                plan_walkthrough.build_rooms(jobs(), workers=workers)
+        plan_walkthrough.clear_room_build_cache()
+    finally:
+        plan_walkthrough.build_room = build_room
+    return profile
+
+
+def test_each_room_is_a_span_with_its_triangles():
+    summary = profiled_rooms(workers=0).summary()
+    rooms = summary["rooms"]
+    assert [room["room"] for room in rooms] == [0, 1, 2]
+    assert [room["roomType"] for room in rooms] == ["Bedroom", "Kitchen", "Office"]
+    sphere = len(o3d.geometry.TriangleMesh.create_sphere(0.3).triangles)
+    # The chair appears twice in the room's meshes and is counted once.
+    assert all(room["triangles"] == 12 + sphere for room in rooms)
+    assert all(room["wallSeconds"] >= 0.05 for room in rooms)
+    assert all("rssDeltaMb" in room and "peakRssMb" not in room for room in rooms)
+    assert summary["stages"]["furnish"]["count"] == 3
+    assert summary["stages"]["furnish"]["triangles"] == 3 * sphere
+    assert summary["stages"]["build_scene"]["wallSeconds"] >= 0.15
+    json.dumps(summary)
+
+
+def test_rooms_built_in_workers_report_back():
+    profile = profiled_rooms(workers=2)
+    rooms = profile.summary()["rooms"]
+    assert [room["room"] for room in rooms] == [0, 1, 2]
+    room_spans = [span for span in profile.spans if span["name"] == "room"]
+    assert {span["pid"] for span in room_spans} - {os.getpid()}
+    assert profile.summary()["peakRssMb"] is not None
+    scene = next(span for span in profile.spans if span["name"] == "build_scene")
+    for span in room_spans:
+        assert scene["start"] <= span["start"]
+        assert span["start"] + span["wall"] <= scene["start"] + scene["wall"]
+
+
+def test_the_chrome_trace_holds_every_span():
+    profile = profiled_rooms(workers=0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "build.trace.json"
+        profile.write_chrome_trace(path)
+        events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    assert len(events) == len(profile.spans)
+    assert {event["ph"] for event in events} == {"X"}
+    assert all(event["ts"] >= 0 and event["dur"] >= 0 for event in events)
+    assert sorted(event["name"] for event in events).count("room") == 3
+
+
+def test_a_span_reports_its_own_memory_not_the_process_peak():
+    profile = BuildProfile()
+    with profiling(profile):
+        with stage("allocate"):
+            # Fresh pages from the kernel, not memory the allocator kept
+            # from earlier tests: 96 MB, every page touched.
+            held = mmap.mmap(-1, 96 * 1024 * 1024)
+            pages = np.frombuffer(held, dtype=np.uint8)
+            pages[::mmap.PAGESIZE] = 1
+        with stage("idle"):
+            pass
+    allocate, idle = profile.spans
+    if allocate["rssMb"] is None:
+        return  # no /proc to read: nothing is claimed either
+    assert allocate["rssDeltaMb"] >= 80, allocate
+    # Still holding it, the next span added nothing of its own.
+    assert abs(idle["rssDeltaMb"]) < 10, idle
+    assert "peakRssMb" not in allocate
+    summary = profile.summary()
+    assert summary["stages"]["allocate"]["rssDeltaMb"] == allocate["rssDeltaMb"]
+    # The two are read from different counters; allow for their rounding.
+    assert summary["peakRssMb"] >= allocate["rssMb"] - 1
+    del pages
+    held.close()
+
+
+def test_nothing_is_recorded_without_an_active_profile():
+    assert active_profile() is None
+    with stage("room") as span, tally("material_spec"):
+        assert span is None
+    profile = BuildProfile()
+    with profiling(profile):
+        for _ in range(3):
+            with tally("material_spec"):
+                pass
+    assert active_profile() is None
+    assert profile.spans == []
+    assert profile.summary()["tallies"]["material_spec"]["count"] == 3
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
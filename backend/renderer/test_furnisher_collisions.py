@@ -0,0 +1,151 @@
+"""Does the prepared collision check place furniture exactly where `within` did?
+
+Run with `python test_furnisher_collisions.py` (or pytest) from this directory.
+
+`RoomFurnisher._ok` tests every candidate pose for lying inside the room's
+inset before anything else, and now does it against a prepared copy of the
+inset, kept until the inset itself is replaced. The reference below is the
+check it replaced. The furnisher's lists and its inset are changed the ways the
+exporter changes them between checks, because a stale prepared shape is the
+one way the answers could drift. Running the file directly also prints the
+timing for a crowded salon.
+"""
+
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+from plan_walkthrough import Polygon, RoomFurnisher, footprint_poly  # noqa: E402
+
+
+def reference_ok(furnisher, fp, block=True, avoid_doors=True):
+    """The check `_ok` replaced."""
+    if not fp.within(furnisher.inset):
+        return False
+    if avoid_doors and any(fp.intersects(z) for z in furnisher.door_zones):
+        return False
+    if block and any(fp.intersects(p) for p in furnisher.placed):
+        return False
+    return True
+
+
+def crowded_room(pieces=40, seed=0):
+    """A 9 x 7 m salon with `pieces` footprints and a few door zones.
+
+    The footprints do not overlap one another, as placed furniture does not,
+    which leaves free floor between them for candidates to land on.
+    """
+    rng = np.random.default_rng(seed)
+    furnisher = RoomFurnisher.__new__(RoomFurnisher)
+    furnisher.poly = Polygon([(0, 0), (9, 0), (9, 7), (0, 7)])
+    furnisher.inset = furnisher.poly.buffer(-0.05)
+    furnisher.placed = []
+    while len(furnisher.placed) < pieces:
+        fp = footprint_poly(
+            rng.uniform((0.5, 0.5), (8.5, 6.5)),
+            rng.uniform(0, math.pi),
+            *rng.uniform(0.2, 0.9, 2),
+        ).buffer(0.04)
+        if not any(fp.intersects(placed) for placed in furnisher.placed):
+            furnisher.placed.append(fp)
+    furnisher.door_zones = [
+        footprint_poly((x, 0.4), 0.0, 1.0, 0.8) for x in (1.0, 4.5, 8.0)
+    ] + [footprint_poly((8.6, y), 0.0, 0.8, 1.0) for y in (2.0, 5.0)] * 2
+    return furnisher, rng
+
+
+def candidates(rng, count):
+    return [
+        footprint_poly(
+            rng.uniform((-0.2, -0.2), (9.2, 7.2)),
+            rng.uniform(0, math.pi),
+            *rng.uniform(0.2, 1.2, 2),
+        )
+        for _ in range(count)
+    ]
+
+
+def assert_same_answers(furnisher, footprints):
+    for fp in footprints:
+        for block in (True, False):
+            for avoid_doors in (True, False):
+                assert furnisher._ok(fp, block, avoid_doors) == reference_ok(
+                    furnisher, fp, block, avoid_doors
+                )
+
+
+def test_ok_matches_within():
+    furnisher, rng = crowded_room()
+    assert_same_answers(furnisher, candidates(rng, 600))
+
+
+def test_prepared_inset_follows_every_kind_of_mutation():
+    furnisher, rng = crowded_room(pieces=12, seed=4)
+    probe = candidates(rng, 150)
+    assert_same_answers(furnisher, probe)
+    furnisher.placed.append(furnisher.poly.centroid.buffer(1.5))
+    assert_same_answers(furnisher, probe)
+    furnisher.placed.pop(0)
+    furnisher.placed.pop()
+    assert_same_answers(furnisher, probe)
+    furnisher.placed[3] = furnisher.poly.centroid.buffer(2.5)
+    assert_same_answers(furnisher, probe)
+    furnisher.placed = furnisher.placed[:5]
+    assert_same_answers(furnisher, probe)
+    furnisher.door_zones = []
+    furnisher.inset = furnisher.poly.buffer(-0.5)
+    assert_same_answers(furnisher, probe)
+    furnisher.inset = furnisher.poly.buffer(-0.05)
+    assert_same_answers(furnisher, probe)
+
+
+def benchmark(pieces=60, checks=4000):
+    furnisher, rng = crowded_room(pieces)
+    footprints = candidates(rng, checks)
+    timings = {}
+    for name, function in (
+        ("within", lambda fp: reference_ok(furnisher, fp)),
+        ("prepared", furnisher._ok),
+    ):
+        started = time.perf_counter()
+        for fp in footprints:
+            function(fp)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+
+    timings = benchmark()
+    print(
+        f"\n4,000 candidates against 60 pieces: within "
+        f"{timings['within'] * 1000:.1f} ms, prepared "
+        f"{timings['prepared'] * 1000:.1f} ms "
+        f"({timings['within'] / max(timings['prepared'], 1e-9):.1f}x)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
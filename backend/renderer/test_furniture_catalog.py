@@ -0,0 +1,153 @@
+"""Does the catalog parse each model once and stay inside its byte budget?
+
+Run with `python test_furniture_catalog.py` (or pytest) from this directory.
+
+The catalog used to cache finished meshes per exact footprint and palette, and
+deep-copy them out. Every new width or color parsed the GLB again, and nothing
+was ever evicted. It now keeps each model once, relative to its own minimum
+corner, and fits it to a placement with one multiply. The model below is a
+small synthetic GLB written to a temporary directory — one textured part, one
+flat-colored part — so the test runs without the catalog assets.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import furniture_catalog  # noqa: E402
+
+MODEL_DIR = Path(tempfile.mkdtemp(prefix="catalog-test-"))
+PALETTE = {"sofa": [0.30, 0.40, 0.50]}
+
+
+def write_model(name="sofa.glb"):
+    """A textured seat and a flat-colored leg, as a catalog GLB carries them."""
+    seat = trimesh.creation.box((0.8, 0.5, 0.4))
+    seat.unmerge_vertices()
+    rng = np.random.default_rng(1)
+    seat.visual = trimesh.visual.TextureVisuals(
+        uv=rng.random((len(seat.vertices), 2)),
+        material=trimesh.visual.material.PBRMaterial(
+            baseColorTexture=Image.fromarray(
+                (rng.random((16, 16, 3)) * 255).astype(np.uint8)
+            ),
+            roughnessFactor=0.4,
+        ),
+    )
+    leg = trimesh.creation.cylinder(0.1, 0.9)
+    leg.apply_translation((0.3, 0.5, 0.1))
+    leg.visual = trimesh.visual.TextureVisuals(
+        material=trimesh.visual.material.PBRMaterial(
+            baseColorFactor=[90, 40, 20, 255]
+        )
+    )
+    trimesh.Scene([seat, leg]).export(MODEL_DIR / name)
+    return name
+
+
+def use_model(name):
+    furniture_catalog.CATALOG_ROOT = MODEL_DIR
+    furniture_catalog._model_name = lambda asset_key, style: name
+    furniture_catalog.clear_catalog_cache()
+
+
+def counting_loads():
+    calls = []
+    load = furniture_catalog._load_trimesh_scene
+
+    def counted(path):
+        calls.append(path)
+        return load(path)
+
+    furniture_catalog._load_trimesh_scene = counted
+    return calls, load
+
+
+def test_one_parse_serves_every_footprint_and_palette():
+    use_model(write_model())
+    calls, load = counting_loads()
+    try:
+        for width, depth, palette in (
+            (2.0, 0.9, None),
+            (1.7, 0.8, PALETTE),
+            (2.2, 1.0, {"sofa": [0.7, 0.2, 0.1]}),
+            (1.7, 0.8, PALETTE),
+        ):
+            meshes = furniture_catalog.load_catalog_asset(
+                "sofa", "modern", width, depth, 0.8, palette
+            )
+            bounds = np.vstack([np.asarray(mesh.vertices) for mesh in meshes])
+            assert np.allclose(bounds.min(axis=0), [-width / 2, -depth / 2, 0])
+            assert np.allclose(bounds.max(axis=0), [width / 2, depth / 2, 0.8])
+    finally:
+        furniture_catalog._load_trimesh_scene = load
+    assert len(calls) == 1, f"parsed {len(calls)} times"
+
+
+def test_placements_share_the_palette_texture_but_not_geometry():
+    use_model(write_model())
+    first = furniture_catalog.load_catalog_asset(
+        "sofa", "modern", 1.7, 0.8, 0.8, PALETTE
+    )
+    second = furniture_catalog.load_catalog_asset(
+        "sofa", "modern", 1.7, 0.8, 0.8, PALETTE
+    )
+    specs = [furniture_catalog._catalog_spec(mesh) for mesh in first]
+    assert sum(spec is None for spec in specs) == 1
+    for mesh, other in zip(first, second):
+        assert furniture_catalog._catalog_spec(mesh) is (
+            furniture_catalog._catalog_spec(other)
+        )
+        np.asarray(mesh.vertices)[:] = 0.0
+        assert np.asarray(other.vertices).any()
+
+
+def test_cache_evicts_oldest_past_its_budget():
+    cache = furniture_catalog._LRUCache(budget=3000)
+    for index in range(5):
+        cache.put(index, np.zeros(1000, dtype=np.uint8))
+    assert len(cache) == 3
+    assert cache.bytes == 3000
+    assert cache.get(0) is None and cache.get(4) is not None
+    cache.get(2)
+    cache.put(5, np.zeros(1000, dtype=np.uint8))
+    assert cache.get(3) is None and cache.get(2) is not None
+    oversized = cache.put("large", np.zeros(10_000, dtype=np.uint8))
+    assert cache.get("large") is oversized and len(cache) == 1
+
+
+def test_a_zero_budget_disables_caching():
+    cache = furniture_catalog._LRUCache(budget=0)
+    value = np.zeros(8)
+    assert cache.put("key", value) is value
+    assert len(cache) == 0 and cache.get("key") is None
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
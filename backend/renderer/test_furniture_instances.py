@@ -0,0 +1,206 @@
+"""Do furniture items built alike share one glTF mesh, and still land in place?
+
+Run with `python test_furniture_instances.py` (or pytest) from this directory.
+
+`build_scene` is replaced by a synthetic one: one 6 x 4 m room, its floor, and
+four chairs built from the same box — three turned different ways — plus a
+table of another size. The exporter's grouping and writing run for real. The
+chairs must come out as four `furniture_NNN_` nodes over one mesh, the table
+with its own, and every node's triangles, taken through its node transform,
+must be where the placed meshes were in the plan.
+"""
+
+import json
+import math
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+import trimesh
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import webgl_walkthrough  # noqa: E402
+from webgl_walkthrough import original  # noqa: E402
+
+# One plan pixel to one metre once the exporter's spatial boosts are applied.
+PIXELS_PER_METER = webgl_walkthrough.WEB_SPATIAL_BOOST * original.SCALE_BOOST
+ROOMS = [[(0, 0), (6, 0), (6, -4), (0, -4)]]
+WOOD = (0.3, 0.2, 0.1)
+CHAIRS = [((1.0, 1.0), 0.0), ((2.5, 1.0), math.pi / 2), ((4.0, 1.2), 0.7), ((1.5, 3.0), math.pi)]
+TABLE = ((3.5, 2.5), 0.3)
+
+
+def placed(size, position, yaw):
+    """A box built around its own origin, then placed as `place_meshes` does."""
+    mesh = o3d.geometry.TriangleMesh.create_box(*size)
+    mesh.translate((-size[0] / 2, -size[1] / 2, 0.0))
+    mesh.paint_uniform_color(WOOD)
+    mesh.compute_vertex_normals()
+    original.place_meshes([mesh], position, yaw)
+    return mesh
+
+
+def synthetic_scene(*args, **kwargs):
+    floor = o3d.geometry.TriangleMesh.create_box(6.0, 4.0, 0.05)
+    floor.translate((0.0, 0.0, -0.05))
+    floor.paint_uniform_color((0.6, 0.5, 0.4))
+    floor.compute_vertex_normals()
+    furniture = []
+    for position, yaw in CHAIRS:
+        chair = placed((0.45, 0.5, 0.9), position, yaw)
+        furniture.append({"asset_key": "dining_chair", "meshes": [chair],
+                          "position": position, "yaw": yaw})
+    table = placed((1.4, 0.8, 0.75), *TABLE)
+    furniture.append({"asset_key": "dining_table", "meshes": [table],
+                      "position": TABLE[0], "yaw": TABLE[1]})
+    return {
+        "meshes": [floor] + [mesh for item in furniture for mesh in item["meshes"]],
+        "furniture_objects": furniture,
+        "spawn": (3.0, 2.0),
+        "allowed": original.Polygon([(0.3, 0.3), (5.7, 0.3), (5.7, 3.7), (0.3, 3.7)]),
+    }
+
+
+def stool_scene(*args, **kwargs):
+    """Round stools at turns whose sines and cosines are nowhere near exact."""
+    scene = synthetic_scene()
+    furniture = []
+    for index in range(6):
+        position, yaw = (0.8 + index * 0.8, 2.0), 0.37 + index * 1.13
+        stool = o3d.geometry.TriangleMesh.create_cylinder(0.2, 0.45, resolution=24)
+        stool.translate((0.0, 0.0, 0.225))
+        stool.paint_uniform_color(WOOD)
+        stool.compute_vertex_normals()
+        original.place_meshes([stool], position, yaw)
+        furniture.append({"asset_key": "bar_stool", "meshes": [stool],
+                          "position": position, "yaw": yaw})
+    scene["meshes"] = scene["meshes"][:1] + [item["meshes"][0] for item in furniture]
+    scene["furniture_objects"] = furniture
+    return scene
+
+
+def export(profile="standard", scene=synthetic_scene):
+    build_scene = original.build_scene
+    original.build_scene = scene
+    path = Path(tempfile.mkdtemp(prefix="instance-test-")) / f"{profile}.glb"
+    try:
+        metadata = webgl_walkthrough.build_realtime_scene(
+            path, ROOMS, [], [], [], [{"room_type": "Dining"}], PIXELS_PER_METER,
+            export_profile=profile,
+        )
+    finally:
+        original.build_scene = build_scene
+    return metadata, path
+
+
+def gltf_json(path):
+    data = Path(path).read_bytes()
+    (length,) = struct.unpack_from("<I", data, 12)
+    return json.loads(data[20:20 + length])
+
+
+def world_triangles(path, prefix):
+    """Every node starting with `prefix`, its triangles in world space."""
+    scene = trimesh.load(path, force="scene", process=False)
+    result = {}
+    for node in scene.graph.nodes_geometry:
+        if not node.startswith(prefix):
+            continue
+        transform, name = scene.graph[node]
+        mesh = scene.geometry[name]
+        corners = trimesh.transform_points(mesh.vertices, transform)[mesh.faces.reshape(-1)]
+        result[node] = np.sort(corners.reshape(-1, 9), axis=0)
+    return result
+
+
+def expected_triangles(mesh):
+    """A placed plan mesh's triangles in glTF axes, in metres."""
+    vertices = np.asarray(mesh.vertices)[:, [0, 2, 1]] * (1, 1, -1)
+    corners = vertices[np.asarray(mesh.triangles).reshape(-1)]
+    return np.sort(corners.reshape(-1, 9), axis=0)
+
+
+def furniture_nodes(gltf):
+    return {node["name"]: node for node in gltf["nodes"] if node.get("name", "").startswith("furniture_")}
+
+
+def test_chairs_built_alike_share_one_mesh():
+    metadata, path = export()
+    nodes = furniture_nodes(gltf_json(path))
+    chairs = [node for name, node in nodes.items() if not name.startswith("furniture_004_")]
+    (table,) = [node for name, node in nodes.items() if name.startswith("furniture_004_")]
+    assert len(chairs) == 4
+    assert {node["mesh"] for node in chairs} == {chairs[0]["mesh"]}
+    assert table["mesh"] != chairs[0]["mesh"]
+    # Shared or not, each item is still one node and one draw.
+    assert metadata["drawCalls"] == 1 + 5
+
+
+def test_every_item_lands_where_it_was_placed():
+    _metadata, path = export()
+    scene = synthetic_scene()
+    for index, item in enumerate(scene["furniture_objects"]):
+        (triangles,) = world_triangles(path, f"furniture_{index:03d}_").values()
+        assert np.allclose(triangles, expected_triangles(item["meshes"][0]), atol=1e-5), index
+
+
+def test_node_transforms_carry_each_items_position_and_turn():
+    _metadata, path = export()
+    nodes = furniture_nodes(gltf_json(path))
+    for index, ((x, y), yaw) in enumerate(CHAIRS + [TABLE]):
+        (node,) = [node for name, node in nodes.items() if name.startswith(f"furniture_{index:03d}_")]
+        assert np.allclose(node["translation"], (x, 0.0, -y), atol=1e-6)
+        assert np.allclose(node["rotation"], (0.0, math.sin(yaw / 2), 0.0, math.cos(yaw / 2)), atol=1e-6)
+
+
+def test_items_turned_any_way_still_share():
+    _metadata, path = export(scene=stool_scene)
+    nodes = furniture_nodes(gltf_json(path))
+    assert len(nodes) == 6
+    assert len({node["mesh"] for node in nodes.values()}) == 1
+    scene = stool_scene()
+    for index, item in enumerate(scene["furniture_objects"]):
+        (triangles,) = world_triangles(path, f"furniture_{index:03d}_").values()
+        assert np.allclose(triangles, expected_triangles(item["meshes"][0]), atol=1e-5), index
+
+
+def test_quantized_instances_land_in_place_too():
+    _metadata, path = export("mobile")
+    gltf = gltf_json(path)
+    assert "KHR_mesh_quantization" in gltf["extensionsUsed"]
+    nodes = furniture_nodes(gltf)
+    assert len({node["mesh"] for node in nodes.values()}) == 2
+    scene = synthetic_scene()
+    for index, item in enumerate(scene["furniture_objects"]):
+        (triangles,) = world_triangles(path, f"furniture_{index:03d}_").values()
+        # 16-bit positions over a chair-sized box: well under a millimetre.
+        assert np.allclose(triangles, expected_triangles(item["meshes"][0]), atol=1e-3), index
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
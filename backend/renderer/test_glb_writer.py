@@ -0,0 +1,271 @@
+"""Does the streaming writer produce the same glTF that trimesh's export did?
+
+Run with `python test_glb_writer.py` (or pytest) from this directory.
+
+`StreamingGlbWriter` encodes with trimesh's own functions and only changes
+where the bytes wait, so the comparison is made on what a loader sees: every
+node by name, with its accessors decoded, its material, and the exact bytes of
+each texture it samples. The byte layout is allowed to differ — the writer
+stores a mesh when it is finished, not when it was first seen — but nothing a
+browser reads is.
+
+The quantized profile cannot match byte for byte, so it is decoded the way the
+KHR_mesh_quantization spec says a loader must — integers through the node's
+transform, normalized values divided out — and held to the tolerance its grid
+promises.
+"""
+
+import json
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+from glb_writer import StreamingGlbWriter  # noqa: E402
+
+OUTPUT = Path(tempfile.mkdtemp(prefix="glb-writer-test-"))
+COMPONENTS = {
+    5126: np.float32,
+    5125: np.uint32,
+    5123: np.uint16,
+    5121: np.uint8,
+    5120: np.int8,
+}
+NORMALIZED = {5123: 65535.0, 5121: 255.0, 5120: 127.0}
+WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+
+
+def meshes(count=6, seed=0):
+    """Boxes and spheres; half textured, two sharing one texture."""
+    rng = np.random.default_rng(seed)
+    texture = Image.fromarray((rng.random((32, 32, 3)) * 255).astype(np.uint8))
+    result = []
+    for index in range(count):
+        mesh = (
+            trimesh.creation.box(rng.uniform(0.2, 2.0, 3))
+            if index % 2
+            else trimesh.creation.icosphere(subdivisions=2, radius=0.4)
+        )
+        mesh.apply_translation(rng.uniform(-4, 4, 3))
+        material = trimesh.visual.material.PBRMaterial(
+            name=f"livinai_{index:03d}",
+            baseColorFactor=(rng.random(4) * 255).astype(np.uint8),
+            roughnessFactor=0.6,
+            metallicFactor=0.0,
+            doubleSided=True,
+            baseColorTexture=texture if index in (1, 3) else None,
+        )
+        uv = rng.random((len(mesh.vertices), 2)) if index in (1, 3) else None
+        name = f"architecture_{index:04d}_material_{index:03d}"
+        result.append((name, trimesh.Trimesh(
+            vertices=mesh.vertices,
+            faces=mesh.faces,
+            vertex_normals=mesh.vertex_normals,
+            visual=trimesh.visual.TextureVisuals(uv=uv, material=material),
+            process=False,
+            validate=False,
+            metadata={"name": name},
+        )))
+    return result
+
+
+def decoded(path):
+    """Node name -> (mesh name, extras, decoded accessors, resolved material)."""
+    data = Path(path).read_bytes()
+    magic, version, length = struct.unpack("<III", data[:12])
+    assert (magic, version, length) == (0x46546C67, 2, len(data))
+    json_length, = struct.unpack("<I", data[12:16])
+    tree = json.loads(data[20:20 + json_length])
+    binary_length, = struct.unpack("<I", data[20 + json_length:24 + json_length])
+    binary = data[28 + json_length:28 + json_length + binary_length]
+
+    def view(index):
+        item = tree["bufferViews"][index]
+        start = item.get("byteOffset", 0)
+        return binary[start:start + item["byteLength"]]
+
+    def accessor(index):
+        item = tree["accessors"][index]
+        values = np.frombuffer(
+            view(item["bufferView"]),
+            COMPONENTS[item["componentType"]],
+            offset=item.get("byteOffset", 0),
+            count=item["count"] * WIDTHS[item["type"]],
+        )
+        return item["componentType"], item.get("min"), item.get("max"), values.tobytes()
+
+    def resolved(value, key=""):
+        if key.endswith("Texture"):
+            image = tree["images"][tree["textures"][value["index"]]["source"]]
+            return view(image["bufferView"])
+        if isinstance(value, dict):
+            return {name: resolved(item, name) for name, item in value.items()}
+        return value
+
+    root = tree["nodes"][0]
+    assert root["name"] == "world"
+    nodes = {}
+    for child in root["children"]:
+        node = tree["nodes"][child]
+        mesh = tree["meshes"][node["mesh"]]
+        primitive = mesh["primitives"][0]
+        attributes = {
+            name: accessor(index) for name, index in primitive["attributes"].items()
+        }
+        attributes["indices"] = accessor(primitive["indices"])
+        nodes[node["name"]] = (
+            mesh["name"],
+            mesh.get("extras"),
+            attributes,
+            resolved(tree["materials"][primitive["material"]]),
+        )
+    return [tree["nodes"][child]["name"] for child in root["children"]], nodes
+
+
+def test_streamed_file_matches_trimesh_export():
+    parts = meshes()
+    scene = trimesh.Scene()
+    for name, mesh in parts:
+        scene.add_geometry(mesh, node_name=name, geom_name=name)
+    exported = OUTPUT / "exported.glb"
+    exported.write_bytes(scene.export(file_type="glb"))
+
+    streamed = OUTPUT / "streamed.glb"
+    with StreamingGlbWriter(streamed) as writer:
+        # Written out of order, the way groups finish; listed in order.
+        for order in (2, 0, 5, 1, 4, 3):
+            name, mesh = parts[order]
+            writer.add(mesh, name, order=order)
+
+    assert decoded(streamed) == decoded(exported)
+    assert not streamed.with_suffix(".building.glb").exists()
+    loaded = trimesh.load(str(streamed), force="scene")
+    assert len(loaded.geometry) == len(parts)
+
+
+def dequantized(path):
+    """Node name -> (world-space positions, normals, UVs, indices, texture?)."""
+    data = Path(path).read_bytes()
+    json_length, = struct.unpack("<I", data[12:16])
+    tree = json.loads(data[20:20 + json_length])
+    binary = data[28 + json_length:]
+
+    def accessor(index):
+        item = tree["accessors"][index]
+        view = tree["bufferViews"][item["bufferView"]]
+        dtype = np.dtype(COMPONENTS[item["componentType"]])
+        width = WIDTHS[item["type"]]
+        stride = view.get("byteStride", dtype.itemsize * width)
+        rows = np.ndarray(
+            (item["count"], width),
+            dtype,
+            binary,
+            offset=view.get("byteOffset", 0) + item.get("byteOffset", 0),
+            strides=(stride, dtype.itemsize),
+        )
+        if item.get("normalized"):
+            scale = NORMALIZED[item["componentType"]]
+            return np.maximum(rows / scale, -1.0), item
+        return rows.astype(np.float64), item
+
+    nodes = {}
+    for child in tree["nodes"][0]["children"]:
+        node = tree["nodes"][child]
+        primitive = tree["meshes"][node["mesh"]]["primitives"][0]
+        attributes = primitive["attributes"]
+        positions, position = accessor(attributes["POSITION"])
+        assert position["min"] == positions.min(axis=0).tolist()
+        assert position["max"] == positions.max(axis=0).tolist()
+        positions = positions * node.get("scale", [1, 1, 1]) + node.get(
+            "translation", [0, 0, 0]
+        )
+        uv = accessor(attributes["TEXCOORD_0"])[0] if "TEXCOORD_0" in attributes else None
+        indices, index = accessor(primitive["indices"])
+        material = tree["materials"][primitive["material"]]
+        nodes[node["name"]] = (
+            positions,
+            accessor(attributes["NORMAL"])[0],
+            uv,
+            (index["componentType"], indices.reshape(-1, 3).astype(np.int64)),
+            "baseColorTexture" in material.get("pbrMetallicRoughness", {}),
+        )
+    return tree, nodes
+
+
+def test_quantized_profile_round_trips_within_tolerance():
+    parts = meshes()
+    # A tiled finish repeats past the unit square; it has to stay float.
+    parts[3][1].visual.uv = parts[3][1].visual.uv * 4.0
+    path = OUTPUT / "quantized.glb"
+    with StreamingGlbWriter(path, quantize=True) as writer:
+        for order, (name, mesh) in enumerate(parts):
+            writer.add(mesh, name, order=order)
+    standard = OUTPUT / "standard.glb"
+    with StreamingGlbWriter(standard) as writer:
+        for order, (name, mesh) in enumerate(parts):
+            writer.add(mesh, name, order=order)
+    assert path.stat().st_size < standard.stat().st_size
+
+    tree, nodes = dequantized(path)
+    assert tree["extensionsRequired"] == ["KHR_mesh_quantization"]
+    assert [name for name, _mesh in parts] == list(nodes)
+    for name, mesh in parts:
+        positions, normals, uv, (index_type, faces), textured = nodes[name]
+        vertices = np.asarray(mesh.vertices)
+        step = np.ptp(vertices, axis=0).max() / 65535
+        assert np.abs(positions - vertices).max() <= step * 0.5 + 1e-9
+        expected = mesh.vertex_normals / np.linalg.norm(
+            mesh.vertex_normals, axis=1, keepdims=True
+        )
+        assert np.abs(normals - expected).max() <= 0.5 / 127 + 1e-9
+        assert index_type == 5123
+        assert np.array_equal(faces, mesh.faces)
+        assert textured == (mesh.visual.uv is not None)
+        if mesh.visual.uv is not None:
+            flipped = np.column_stack((mesh.visual.uv[:, 0], 1 - mesh.visual.uv[:, 1]))
+            assert np.abs(uv - flipped).max() <= 0.5 / 65535 + 1e-6
+    loaded = trimesh.load(str(path), force="scene")
+    assert len(loaded.geometry) == len(parts)
+
+
+def test_a_failed_build_leaves_nothing_behind():
+    target = OUTPUT / "failed.glb"
+    try:
+        with StreamingGlbWriter(target) as writer:
+            name, mesh = meshes(1)[0]
+            writer.add(mesh, name)
+            raise RuntimeError("furnishing failed")
+    except RuntimeError:
+        pass
+    assert not target.exists()
+    assert not target.with_suffix(".building.glb").exists()
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
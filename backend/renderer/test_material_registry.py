@@ -0,0 +1,135 @@
+"""Do warm workers forget the meshes of homes they have finished exporting?
+
+Run with `python test_material_registry.py` (or pytest) from this directory.
+
+Both material registries used to be plain dicts keyed by `id(mesh)` holding the
+mesh itself, so every mesh ever textured stayed alive for the life of the
+process. A warm Modal container exporting one home after another grew until it
+hit its memory limit. The soak below exports a few hundred synthetic "homes" —
+meshes registered with an archviz finish or a catalog PBR spec, the way a real
+build registers them, then dropped — and checks that each of those meshes is
+freed, its entries gone with it, and that resident memory stays flat. Other
+tests in the same session may hold meshes of their own, so the registries are
+compared with their size beforehand, never expected to be empty. No texture is
+decoded, so it runs without the material assets.
+"""
+
+import gc
+import sys
+import weakref
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import archviz_materials  # noqa: E402
+import furniture_catalog  # noqa: E402
+
+MESHES_PER_HOME = 60
+SPEC = {
+    "albedo": np.zeros((64, 64, 3), dtype=np.uint8),
+    "normal": None,
+    "arm": None,
+    "roughness": 0.5,
+    "metallic": 0.0,
+}
+
+
+def resident_bytes():
+    """Current (not peak) resident set size, where the platform reports it."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    import resource
+
+    return pages * resource.getpagesize()
+
+
+def registry_sizes():
+    return len(archviz_materials._MESH_MATERIALS), len(furniture_catalog._PBR_MESH_MATERIALS)
+
+
+def export_one_home():
+    """Texture a home's worth of meshes, look their materials up, let them go.
+
+    Returns a weak reference to every mesh it registered.
+    """
+    meshes = []
+    for index in range(MESHES_PER_HOME):
+        mesh = o3d.geometry.TriangleMesh.create_sphere(radius=0.4, resolution=24)
+        if index % 2:
+            archviz_materials.register_mesh_material(
+                mesh, "plaster", (0.9, 0.88, 0.84), 0.2, True
+            )
+            assert archviz_materials.mesh_material(mesh)[0] == "plaster"
+        else:
+            furniture_catalog._PBR_MESH_MATERIALS[mesh] = SPEC
+            assert furniture_catalog._catalog_spec(mesh) is SPEC
+        meshes.append(mesh)
+    copy = o3d.geometry.TriangleMesh(meshes[1])
+    archviz_materials.copy_mesh_material(meshes[1], copy)
+    assert archviz_materials.mesh_material(copy) == archviz_materials.mesh_material(meshes[1])
+    return [weakref.ref(mesh) for mesh in meshes + [copy]]
+
+
+def test_registries_drop_meshes_once_they_are_gone():
+    before = registry_sizes()
+    references = export_one_home()
+    gc.collect()
+    assert all(reference() is None for reference in references)
+    assert registry_sizes() == before
+
+
+def test_live_meshes_keep_their_material():
+    mesh = o3d.geometry.TriangleMesh.create_box()
+    archviz_materials.register_mesh_material(mesh, "curtain_fabric")
+    gc.collect()
+    assert archviz_materials.mesh_material(mesh) == ("curtain_fabric", (), 0.0, True)
+    assert archviz_materials.mesh_material(object()) is None
+    assert furniture_catalog._catalog_spec([]) is None
+
+
+def test_memory_stays_flat_across_hundreds_of_exports():
+    for _ in range(20):
+        export_one_home()
+    gc.collect()
+    before = registry_sizes()
+    warm = resident_bytes()
+    references = []
+    for _ in range(300):
+        references.extend(export_one_home())
+    gc.collect()
+    assert all(reference() is None for reference in references)
+    assert registry_sizes() == before
+    if warm is None:
+        return
+    growth = resident_bytes() - warm
+    # 300 homes of 60 spheres is close to 1 GB of geometry if it is retained.
+    assert growth < 24 * 1024 * 1024, f"grew {growth / 1e6:.1f} MB over 300 exports"
+
+
+def _run():
+    tests = [
+        (name, value)
+        for name, value in globals().items()
+        if name.startswith("test_") and callable(value)
+    ]
+    failures = []
+    for name, test in tests:
+        try:
+            test()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
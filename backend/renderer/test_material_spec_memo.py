@@ -0,0 +1,155 @@
+"""Do meshes sharing a material get its spec once, and the same spec?
+
+Run with `python test_material_spec_memo.py` (or pytest) from this directory.
+
+`_material_spec` builds a mesh's web material — its maps resized and every
+pixel hashed — and, given an export's memo, builds it once per material source.
+Catalog meshes here carry a synthetic 2048-pixel spec, so the resize really
+happens; archviz meshes are registered by name, and the record builder is
+wrapped to count its calls and to stand in for the archviz texture files,
+which this checkout may not have.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import archviz_materials  # noqa: E402
+import furniture_catalog  # noqa: E402
+import webgl_walkthrough  # noqa: E402
+
+
+def catalog_spec(seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "albedo": rng.integers(0, 255, (2048, 2048, 3), dtype=np.uint8),
+        "normal": None,
+        "arm": rng.integers(0, 255, (1024, 1024, 3), dtype=np.uint8),
+        "roughness": 0.5,
+        "metallic": 0.0,
+    }
+
+
+def box(normals=True):
+    mesh = o3d.geometry.TriangleMesh.create_box(1.0, 1.0, 1.0)
+    if normals:
+        mesh.compute_vertex_normals()
+    return mesh
+
+
+def counted_records():
+    """Wrap the record builder; archviz records get synthetic maps."""
+    from open3d.visualization import rendering
+
+    real = webgl_walkthrough.material_record_for_mesh
+    calls = []
+
+    def record_for(mesh):
+        calls.append(mesh)
+        registered = archviz_materials.mesh_material(mesh)
+        if registered is None:
+            return real(mesh)
+        if not mesh.has_vertex_normals():
+            mesh.compute_vertex_normals()
+        name, tint, _strength, _detail = registered
+        record = rendering.MaterialRecord()
+        record.base_color = [1.0, 1.0, 1.0, 1.0]
+        record.base_roughness = 0.6
+        record.base_metallic = 0.0
+        shade = int(255 * (tint[0] if tint else 0.5))
+        record.albedo_img = o3d.geometry.Image(
+            np.full((1500, 1500, 3), shade, dtype=np.uint8)
+        )
+        return record
+
+    return real, record_for, calls
+
+
+def specs_for(meshes, memo):
+    real, record_for, calls = counted_records()
+    webgl_walkthrough.material_record_for_mesh = record_for
+    try:
+        return [webgl_walkthrough._material_spec(mesh, memo) for mesh in meshes], calls
+    finally:
+        webgl_walkthrough.material_record_for_mesh = real
+
+
+def test_shared_sources_are_built_once_and_shared():
+    oak = catalog_spec(1)
+    chairs = [box() for _ in range(4)]
+    for chair in chairs:
+        furniture_catalog._PBR_MESH_MATERIALS[chair] = oak
+    floors = [box() for _ in range(3)]
+    for floor in floors:
+        archviz_materials.register_mesh_material(floor, "warm_oak", (0.6, 0.5, 0.4), 0.16)
+    results, calls = specs_for(chairs + floors, {})
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results[:4])
+    assert all(result is results[4] for result in results[4:])
+    assert results[0][1]["albedo"].shape[:2] == (webgl_walkthrough.WEB_TEXTURE_MAX_SIZE,) * 2
+
+
+def test_memoised_specs_match_specs_built_per_mesh():
+    meshes = [box(), box(), box()]
+    furniture_catalog._PBR_MESH_MATERIALS[meshes[0]] = catalog_spec(2)
+    furniture_catalog._PBR_MESH_MATERIALS[meshes[1]] = catalog_spec(3)
+    archviz_materials.register_mesh_material(meshes[2], "plaster", (0.9, 0.9, 0.9), 0.1)
+    memoised, _calls = specs_for(meshes * 2, {})
+    fresh, _calls = specs_for(meshes, None)
+    for (key, spec), (fresh_key, fresh_spec) in zip(memoised, fresh * 2):
+        assert key == fresh_key
+        for name in ("albedo", "normal", "arm"):
+            assert (spec[name] is None) == (fresh_spec[name] is None)
+            if spec[name] is not None:
+                assert np.array_equal(spec[name], fresh_spec[name])
+
+
+def test_different_tints_and_plain_meshes_are_not_shared():
+    warm, cool = box(), box()
+    archviz_materials.register_mesh_material(warm, "plaster", (0.9, 0.8, 0.7), 0.1)
+    archviz_materials.register_mesh_material(cool, "plaster", (0.5, 0.6, 0.7), 0.1)
+    red, blue = box(), box()
+    red.paint_uniform_color((0.8, 0.1, 0.1))
+    blue.paint_uniform_color((0.1, 0.1, 0.8))
+    results, calls = specs_for([warm, cool, red, blue, red], {})
+    assert len(calls) == 5
+    assert results[0][0] != results[1][0]
+    assert results[2][0] != results[3][0]
+
+
+def test_a_remembered_spec_still_fills_in_missing_normals():
+    spec = catalog_spec(4)
+    first, second = box(), box(normals=False)
+    for mesh in (first, second):
+        furniture_catalog._PBR_MESH_MATERIALS[mesh] = spec
+    specs_for([first, second], {})
+    assert second.has_vertex_normals()
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
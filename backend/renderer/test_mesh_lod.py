@@ -0,0 +1,213 @@
+"""Does the mobile export give furniture simplified levels, and are they right?
+
+Run with `python test_mesh_lod.py` (or pytest) from this directory.
+
+`mesh_lod.lod_chain` is checked on a UV sphere: each level must be smaller than
+the last, stay on the sphere and carry UVs. The export runs on a synthetic
+scene — one room, two identical globe lamps and a box side table, in place of
+`build_scene` — and the GLB is read back: the lamps' nodes list their stand-ins
+under MSFT_lod, both lamps share them, the table is too small for any, and
+every stand-in sits where its full-detail node does.
+"""
+
+import json
+import math
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+import trimesh
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import mesh_lod  # noqa: E402
+import webgl_walkthrough  # noqa: E402
+from glb_writer import _rotation_matrix  # noqa: E402
+from webgl_walkthrough import original  # noqa: E402
+
+# One plan pixel to one metre once the exporter's spatial boosts are applied.
+PIXELS_PER_METER = webgl_walkthrough.WEB_SPATIAL_BOOST * original.SCALE_BOOST
+ROOMS = [[(0, 0), (6, 0), (6, -4), (0, -4)]]
+LAMPS = [((1.0, 1.0), 0.0), ((4.5, 3.0), 1.1)]
+TABLE = ((3.0, 2.0), 0.4)
+
+
+def sphere_arrays():
+    sphere = trimesh.creation.uv_sphere(0.5, (40, 40))
+    vertices = np.asarray(sphere.vertices, dtype=np.float32)
+    uvs = np.column_stack((
+        np.arctan2(vertices[:, 1], vertices[:, 0]) / (2 * math.pi) + 0.5,
+        vertices[:, 2] + 0.5,
+    )).astype(np.float32)
+    return vertices, np.asarray(sphere.faces), np.asarray(sphere.vertex_normals, dtype=np.float32), uvs
+
+
+def placed(mesh, position, yaw):
+    mesh.paint_uniform_color((0.8, 0.75, 0.6))
+    mesh.compute_vertex_normals()
+    original.place_meshes([mesh], position, yaw)
+    return mesh
+
+
+def synthetic_scene(*args, **kwargs):
+    floor = o3d.geometry.TriangleMesh.create_box(6.0, 4.0, 0.05)
+    floor.translate((0.0, 0.0, -0.05))
+    floor.paint_uniform_color((0.6, 0.5, 0.4))
+    floor.compute_vertex_normals()
+    furniture = []
+    for position, yaw in LAMPS:
+        globe = o3d.geometry.TriangleMesh.create_sphere(0.25, resolution=24)
+        globe.translate((0.0, 0.0, 0.9))
+        furniture.append({"asset_key": "floor_lamp", "meshes": [placed(globe, position, yaw)],
+                          "position": position, "yaw": yaw})
+    table = o3d.geometry.TriangleMesh.create_box(0.5, 0.5, 0.55)
+    table.translate((-0.25, -0.25, 0.0))
+    furniture.append({"asset_key": "side_table", "meshes": [placed(table, *TABLE)],
+                      "position": TABLE[0], "yaw": TABLE[1]})
+    return {
+        "meshes": [floor] + [mesh for item in furniture for mesh in item["meshes"]],
+        "furniture_objects": furniture,
+        "spawn": (3.0, 2.0),
+        "allowed": original.Polygon([(0.3, 0.3), (5.7, 0.3), (5.7, 3.7), (0.3, 3.7)]),
+    }
+
+
+def export(profile):
+    build_scene = original.build_scene
+    original.build_scene = synthetic_scene
+    path = Path(tempfile.mkdtemp(prefix="lod-test-")) / f"{profile}.glb"
+    try:
+        metadata = webgl_walkthrough.build_realtime_scene(
+            path, ROOMS, [], [], [], [{"room_type": "Living"}], PIXELS_PER_METER,
+            export_profile=profile,
+        )
+    finally:
+        original.build_scene = build_scene
+    return metadata, path
+
+
+def read_glb(path):
+    data = Path(path).read_bytes()
+    (length,) = struct.unpack_from("<I", data, 12)
+    return json.loads(data[20:20 + length]), data[28 + length:]
+
+
+def mesh_corners(gltf, binary, node):
+    """A node's triangle corners in world space, read straight from the buffers."""
+    def accessor(index, width):
+        item = gltf["accessors"][index]
+        view = gltf["bufferViews"][item["bufferView"]]
+        dtype = {5120: "i1", 5121: "u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}[item["componentType"]]
+        stride = view.get("byteStride", np.dtype(dtype).itemsize * width) // np.dtype(dtype).itemsize
+        values = np.frombuffer(
+            binary, dtype=dtype, count=item["count"] * stride,
+            offset=view.get("byteOffset", 0) + item.get("byteOffset", 0),
+        )
+        return values.reshape(item["count"], stride)[:, :width].astype(float)
+
+    (primitive,) = gltf["meshes"][node["mesh"]]["primitives"]
+    positions = accessor(primitive["attributes"]["POSITION"], 3)
+    indices = accessor(primitive["indices"], 1).astype(int).reshape(-1)
+    positions = positions * node.get("scale", (1.0, 1.0, 1.0))
+    if "rotation" in node:
+        positions = positions @ _rotation_matrix(node["rotation"]).T
+    return positions[indices] + node.get("translation", (0.0, 0.0, 0.0))
+
+
+def test_each_level_is_smaller_and_stays_on_the_surface():
+    vertices, faces, normals, uvs = sphere_arrays()
+    mesh_lod.clear_lod_cache()
+    chain = mesh_lod.lod_chain(vertices, faces, normals, uvs)
+    assert [level for level, _arrays in chain] == [1, 2, 3]
+    counts = [len(faces)] + [len(arrays[1]) for _level, arrays in chain]
+    assert counts == sorted(counts, reverse=True) and counts[-1] < 0.1 * counts[0], counts
+    for _level, (level_vertices, level_faces, level_normals, level_uvs) in chain:
+        assert level_faces.max() < len(level_vertices)
+        radius = np.linalg.norm(level_vertices, axis=1)
+        assert np.abs(radius - 0.5).max() < 0.01
+        # Normals worked out afresh still point out of the sphere.
+        assert (np.sum(level_normals * level_vertices / radius[:, None], axis=1) > 0.99).all()
+        assert level_uvs.shape == (len(level_vertices), 2)
+        assert level_uvs.min() >= 0.0 and level_uvs.max() <= 1.0
+    # The same arrays again come from the cache, not another decimation.
+    assert mesh_lod.lod_chain(vertices.copy(), faces, normals, uvs) is chain
+    small = trimesh.creation.box()
+    assert mesh_lod.lod_chain(small.vertices, small.faces, small.vertex_normals, None) == []
+
+
+def test_only_the_mobile_profile_carries_levels():
+    standard, path = export("standard")
+    gltf, _binary = read_glb(path)
+    assert "lodDistances" not in standard
+    assert not any("extensions" in node for node in gltf["nodes"])
+    mobile, path = export("mobile")
+    gltf, _binary = read_glb(path)
+    assert mobile["lodDistances"] == mesh_lod.lod_distances()
+    assert mobile["drawCalls"] == standard["drawCalls"]
+    assert "MSFT_lod" in gltf["extensionsUsed"]
+    assert "MSFT_lod" not in gltf["extensionsRequired"]
+
+
+def test_lamps_share_their_stand_ins_and_the_table_has_none():
+    _metadata, path = export("mobile")
+    gltf, _binary = read_glb(path)
+    nodes = gltf["nodes"]
+    scene_nodes = set(nodes[0]["children"])
+    lamps = [node for node in nodes if node["name"].startswith(("furniture_000_", "furniture_001_"))
+             and "_lod" not in node["name"]]
+    (table,) = [node for node in nodes if node["name"].startswith("furniture_002_")]
+    assert "extensions" not in table
+    stand_in_meshes = []
+    for lamp in lamps:
+        ids = lamp["extensions"]["MSFT_lod"]["ids"]
+        assert len(ids) == len(lamp["extras"]["lodLevels"]) >= 2
+        # Outside the scene, so a loader without the extension never draws them.
+        assert not scene_nodes.intersection(ids)
+        assert all(nodes[index]["name"].startswith(lamp["name"] + "_lod") for index in ids)
+        stand_in_meshes.append([nodes[index]["mesh"] for index in ids])
+    assert stand_in_meshes[0] == stand_in_meshes[1]
+    assert lamps[0]["mesh"] == lamps[1]["mesh"]
+
+
+def test_stand_ins_sit_where_their_lamp_does():
+    _metadata, path = export("mobile")
+    gltf, binary = read_glb(path)
+    nodes = gltf["nodes"]
+    for node in nodes:
+        if "extensions" not in node:
+            continue
+        full = mesh_corners(gltf, binary, node)
+        for index in node["extensions"]["MSFT_lod"]["ids"]:
+            coarse = mesh_corners(gltf, binary, nodes[index])
+            assert len(coarse) < len(full)
+            assert np.allclose(coarse.mean(axis=0), full.mean(axis=0), atol=0.02), nodes[index]["name"]
+            assert np.allclose(coarse.min(axis=0), full.min(axis=0), atol=0.02)
+            assert np.allclose(coarse.max(axis=0), full.max(axis=0), atol=0.02)
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
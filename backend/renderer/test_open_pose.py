@@ -0,0 +1,239 @@
+"""Does the batched open-floor search choose the pose the exhaustive loop chose?
+
+Run with `python test_open_pose.py` (or pytest) from this directory.
+
+`RoomFurnisher.find_open_pose` now builds, vetoes and measures its candidates
+in arrays instead of one shapely call at a time. The reference below is the
+loop it replaced, without its comments. The rooms are synthetic — furniture
+already placed, door keep-clear zones and door sightlines — and each one is
+searched the ways the exporter searches: by score, beside the seating, clear
+of the walkways and with extra forbidden zones. The pose, the yaw and the
+footprint's corners all have to match exactly. Running the file directly also
+prints the timing for a large open-plan room.
+"""
+
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely.prepared import prep
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+from plan_walkthrough import (  # noqa: E402
+    Polygon,
+    RoomFurnisher,
+    footprint_poly,
+    footprint_polys,
+)
+
+
+def reference_find_open_pose(self, width, depth, preferred=None, yaws=None,
+                             beside=None, clear_of=(), forbid=()):
+    """The one-candidate-at-a-time search `find_open_pose` replaced."""
+    safe_room = self.poly.buffer(-0.12)
+    if safe_room.is_empty:
+        return None
+    unique_yaws = []
+    for yaw in yaws:
+        axis_yaw = float(yaw) % math.pi
+        if not any(abs(math.sin(axis_yaw - known)) < 0.08 for known in unique_yaws):
+            unique_yaws.append(axis_yaw)
+    minx, miny, maxx, maxy = safe_room.bounds
+    spacing = 0.24
+    margin = min(0.38, min(width, depth) * 0.18)
+    xs = np.arange(minx + margin, maxx - margin + 0.01, spacing)
+    ys = np.arange(miny + margin, maxy - margin + 0.01, spacing)
+    points = [(float(x), float(y)) for x in xs for y in ys]
+    rep = safe_room.representative_point()
+    points.append((rep.x, rep.y))
+    if preferred is not None:
+        points.append((float(preferred[0]), float(preferred[1])))
+    safe_room_prepared = prep(safe_room)
+    best = None
+    for x, y in points:
+        position = np.array([x, y], dtype=float)
+        for yaw in unique_yaws:
+            fp = footprint_poly(position, yaw, width, depth)
+            if not safe_room_prepared.contains(fp):
+                continue
+            if any(fp.intersects(zone) for zone in self.door_zones):
+                continue
+            if any(fp.intersects(zone) for zone in forbid):
+                continue
+            if any(fp.intersects(placed) for placed in self.placed):
+                continue
+            if beside is not None:
+                gap = float(fp.distance(beside))
+                score = -gap * 2.40
+            else:
+                boundary_clearance = fp.distance(self.poly.boundary)
+                placed_clearance = min(
+                    (fp.distance(placed) for placed in self.placed), default=0.0
+                )
+                score = boundary_clearance * 1.2 + min(placed_clearance, 0.90) * 2.0
+            if clear_of:
+                room_to_move = min(
+                    (float(fp.distance(zone)) for zone in clear_of), default=1.5
+                )
+                score += min(room_to_move, 1.5) * 1.80
+            if beside is None and self.placed:
+                nearest = min(
+                    np.linalg.norm(
+                        position - np.array([placed.centroid.x, placed.centroid.y])
+                    )
+                    for placed in self.placed
+                )
+                score -= max(0.0, float(nearest) - 3.20) * 0.90
+            if preferred is not None:
+                score -= np.linalg.norm(
+                    position - np.asarray(preferred, dtype=float)
+                ) * 0.16
+            else:
+                score -= np.linalg.norm(position - self.centroid) * 0.05
+            score -= self._door_sightline_penalty(position, width, depth)
+            if best is None or score > best[0]:
+                best = (score, position, yaw, fp)
+    if best is None:
+        return None
+    return dict(pos=best[1], yaw=best[2], footprint=best[3])
+
+
+def open_plan_room(pieces=8, seed=0, size=(11.0, 8.0)):
+    """An L-shaped living room with furniture, a front door and a side door."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    furnisher = RoomFurnisher.__new__(RoomFurnisher)
+    furnisher.poly = Polygon([(0, 0), (w, 0), (w, h), (w * 0.6, h), (w * 0.6, h * 0.7),
+                              (0, h * 0.7)])
+    furnisher.inset = furnisher.poly.buffer(-0.05)
+    furnisher.centroid = np.array([furnisher.poly.centroid.x, furnisher.poly.centroid.y])
+    furnisher.placed = []
+    attempts = 0
+    while len(furnisher.placed) < pieces and attempts < 500:
+        attempts += 1
+        fp = footprint_poly(
+            rng.uniform((0.8, 0.8), (w - 0.8, h * 0.7 - 0.8)),
+            rng.choice([0.0, math.pi / 2, rng.uniform(0, math.pi)]),
+            *rng.uniform(0.4, 2.2, 2),
+        ).buffer(0.04)
+        if fp.within(furnisher.inset) and not any(
+            fp.intersects(placed) for placed in furnisher.placed
+        ):
+            furnisher.placed.append(fp)
+    furnisher.door_zones = [footprint_poly((1.6, 0.5), 0.0, 1.0, 1.0)]
+    furnisher.door_axes = [
+        {"c": np.array([1.6, 0.0]), "normal": np.array([0.0, 1.0]),
+         "tangent": np.array([1.0, 0.0]), "half": 0.45},
+        {"c": np.array([w, 3.0]), "normal": np.array([-1.0, 0.0]),
+         "tangent": np.array([0.0, 1.0]), "half": 0.40},
+    ]
+    return furnisher, rng
+
+
+def searches(furnisher, rng):
+    """The argument sets the exporter actually passes, drawn for this room."""
+    seating = furnisher.placed[0] if furnisher.placed else None
+    walkway = shapely.box(0.0, 1.0, 1.2, 4.0)
+    yaws = [0.0, math.pi / 2, math.pi, 0.03, rng.uniform(0, math.pi)]
+    for width, depth in ((3.05, 2.46), (2.60, 2.10), (1.2, 0.8), (0.72, 0.70)):
+        yield dict(width=width, depth=depth, yaws=yaws)
+        yield dict(width=width, depth=depth, yaws=yaws[:2],
+                   preferred=rng.uniform((1, 1), (6, 5)))
+        if seating is not None:
+            yield dict(width=width, depth=depth, yaws=yaws[:2], beside=seating,
+                       clear_of=[walkway], forbid=[shapely.box(5, 1, 6, 2)],
+                       preferred=rng.uniform((1, 1), (6, 5)))
+        yield dict(width=width, depth=depth, yaws=yaws, clear_of=[walkway],
+                   forbid=[shapely.box(2, 2, 3, 3)])
+
+
+def assert_same_pose(expected, actual):
+    if expected is None:
+        assert actual is None
+        return
+    assert actual is not None
+    assert np.array_equal(expected["pos"], actual["pos"])
+    assert expected["yaw"] == actual["yaw"]
+    assert np.array_equal(
+        shapely.get_coordinates(expected["footprint"]),
+        shapely.get_coordinates(actual["footprint"]),
+    )
+
+
+def test_footprints_have_the_corners_footprint_poly_gives_them():
+    rng = np.random.default_rng(3)
+    positions = rng.uniform(-20, 20, (200, 2))
+    for yaw in (0.0, math.pi / 2, math.pi, 1e-17, rng.uniform(0, math.pi)):
+        batch = footprint_polys(positions, yaw, 1.78, 0.96)
+        for position, polygon in zip(positions, batch):
+            assert np.array_equal(
+                shapely.get_coordinates(polygon),
+                shapely.get_coordinates(footprint_poly(position, yaw, 1.78, 0.96)),
+            )
+
+
+def test_batched_search_matches_the_exhaustive_loop():
+    for seed in range(3):
+        furnisher, rng = open_plan_room(pieces=2 + seed * 2, seed=seed)
+        for arguments in searches(furnisher, rng):
+            width, depth = arguments.pop("width"), arguments.pop("depth")
+            assert_same_pose(
+                reference_find_open_pose(furnisher, width, depth, **arguments),
+                furnisher.find_open_pose(width, depth, **arguments),
+            )
+
+
+def test_a_room_with_no_legal_pose_finds_nothing():
+    furnisher, _rng = open_plan_room(pieces=0, size=(2.0, 2.0))
+    assert furnisher.find_open_pose(3.05, 2.46, yaws=[0.0]) is None
+
+
+def benchmark(repeats=3):
+    furnisher, rng = open_plan_room(pieces=10, seed=2, size=(16.0, 12.0))
+    arguments = dict(yaws=[0.0, math.pi / 2], clear_of=[shapely.box(0, 1, 1.2, 4)])
+    timings = {}
+    for name, function in (
+        ("loop", lambda: reference_find_open_pose(furnisher, 3.05, 2.46, **arguments)),
+        ("batched", lambda: furnisher.find_open_pose(3.05, 2.46, **arguments)),
+    ):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            function()
+        timings[name] = (time.perf_counter() - started) / repeats
+    return timings
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+
+    timings = benchmark()
+    print(
+        f"\nA 16 x 12 m open-plan room, one dining search: loop "
+        f"{timings['loop'] * 1000:.0f} ms, batched "
+        f"{timings['batched'] * 1000:.0f} ms "
+        f"({timings['loop'] / max(timings['batched'], 1e-9):.1f}x)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,208 @@
+"""Does the output directory stay inside its budget, dropping the oldest first?
+
+Run with `python test_output_cache.py` (or pytest) from this directory.
+
+Scenes are stand-in files of known size in a fresh directory, and times are
+passed in rather than slept for; a scene's files are dated to its build, since
+a hit is recorded on them rather than in the index. Forked processes log hits
+while collections fold the log, and every hit has to be counted. The last
+test goes through `render_worker.build` with a stand-in exporter, to check
+that hits and builds reach the index and that a build collects.
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from output_cache import INDEX_NAME, OutputCache  # noqa: E402
+
+
+def scene(directory, cache_id, size, when=None):
+    for suffix, share in ((".glb", size - 10), (".json", 10)):
+        path = directory / f"{cache_id}{suffix}"
+        path.write_bytes(b"x" * share)
+        if when is not None:
+            os.utime(path, (when, when))
+
+
+def directory():
+    return Path(tempfile.mkdtemp(prefix="output-cache-test-"))
+
+
+def test_least_recently_served_scenes_go_first():
+    root = directory()
+    cache = OutputCache(root, budget=250)
+    for index, cache_id in enumerate("abcd"):
+        scene(root, cache_id, 100, when=1000 + index)
+        cache.record(cache_id, "build", now=1000 + index)
+    # "a" is the oldest build, but it was just served again.
+    index_before = (root / INDEX_NAME).read_bytes()
+    cache.record("a", "hit", now=2000)
+    # A hit leaves the index alone; it dates the scene's metadata.
+    assert (root / INDEX_NAME).read_bytes() == index_before
+    assert (root / "a.json").stat().st_mtime == 2000
+    removed = cache.collect(now=2001)
+    assert removed == {"evicted": ["b", "c"], "swept": 0}
+    assert sorted(path.stem for path in root.glob("*.glb")) == ["a", "d"]
+    assert not (root / "b.json").exists()
+
+
+def test_the_newest_scene_survives_alone_over_budget():
+    root = directory()
+    cache = OutputCache(root, budget=50)
+    scene(root, "old", 100, when=1)
+    cache.record("old", "build", now=1)
+    scene(root, "big", 100, when=2)
+    cache.record("big", "build", now=2)
+    assert cache.collect(now=3)["evicted"] == ["old"]
+    assert (root / "big.glb").exists()
+
+
+def test_stale_temporaries_are_swept_and_fresh_ones_kept():
+    root = directory()
+    cache = OutputCache(root, budget=0, stale_after=3600)
+    now = time.time()
+    stale = [".abc.0f0f.glb", ".abc.0f0f.json", ".abc.lease", "half.glb"]
+    fresh = [".def.1e1e.glb", ".def.lease"]
+    for name in stale:
+        (root / name).write_bytes(b"x")
+        os.utime(root / name, (now - 7200, now - 7200))
+    for name in fresh:
+        (root / name).write_bytes(b"x")
+    scene(root, "kept", 100, when=now - 7200)
+    assert cache.collect(now=now) == {"evicted": [], "swept": len(stale)}
+    left = sorted(path.name for path in root.iterdir())
+    assert left == sorted(fresh + ["kept.glb", "kept.json", INDEX_NAME, ".cache-index.lock"])
+
+
+def test_unindexed_scenes_are_adopted_and_vanished_ones_dropped():
+    root = directory()
+    cache = OutputCache(root, budget=150)
+    scene(root, "older", 100, when=1000)
+    scene(root, "newer", 100, when=2000)
+    cache.record("gone", "download", now=3000)
+    assert cache.collect(now=3001)["evicted"] == ["older"]
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["bytes"] == 100
+    assert "gone" not in json.loads((root / INDEX_NAME).read_text())["entries"]
+
+
+def test_downloading_a_chunk_is_a_use_of_its_scene():
+    root = directory()
+    cache = OutputCache(root, budget=150)
+    manifest = {"chunks": [{"model": "room.glb"}]}
+    (root / "chunked.json").write_text(json.dumps(manifest), encoding="utf-8")
+    (root / "room.glb").write_bytes(b"x" * 90)
+    for name in ("chunked.json", "room.glb"):
+        os.utime(root / name, (1000, 1000))
+    cache.record("chunked", "build", now=1000)
+    scene(root, "plain", 100, when=1500)
+    cache.record("plain", "build", now=1500)
+    cache.record("room", "download", now=2000)
+    assert cache.collect(now=2001)["evicted"] == ["plain"]
+    entries = json.loads((root / INDEX_NAME).read_text())["entries"]
+    assert entries["chunked"]["served"] == 2000
+
+
+def test_stats_count_hits_against_builds():
+    root = directory()
+    cache = OutputCache(root, budget=0)
+    assert cache.stats()["hitRate"] is None
+    scene(root, "a", 100)
+    cache.record("a", "build")
+    cache.record("a", "hit")
+    cache.record("a", "hit")
+    cache.record("a", "download")
+    stats = cache.stats()
+    assert stats["hitRate"] == 2 / 3
+    assert (stats["build"], stats["hit"], stats["download"]) == (1, 2, 1)
+    assert stats["bytes"] == 100
+    # A collection folds the logged uses into the index, counting each once.
+    cache.collect()
+    assert "hit" in json.loads((root / INDEX_NAME).read_text())["counts"]
+    assert cache.stats()["hit"] == 2
+    cache.record("a", "hit")
+    assert cache.stats()["hitRate"] == 3 / 4
+
+
+def log_hits(root, count):
+    cache = OutputCache(root, budget=0)
+    for _ in range(count):
+        cache.record("a", "hit")
+
+
+def test_no_hit_is_lost_to_a_collection_running_beside_it():
+    root = directory()
+    scene(root, "a", 100)
+    cache = OutputCache(root, budget=0)
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=log_hits, args=(root, 300)) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    while any(writer.is_alive() for writer in writers):
+        cache.collect()
+    for writer in writers:
+        writer.join()
+    cache.collect()
+    assert cache.stats()["hit"] == 4 * 300
+
+
+def test_builds_record_hits_and_collect():
+    import render_worker
+
+    root = directory()
+    payload = {
+        "rooms": [{"points": [[0, 0], [400, 0], [400, 300], [0, 300]]}],
+        "roomConfigs": [{"name": "Living", "roomType": "Living Room"}],
+        "pixelsPerMeter": 100,
+    }
+
+    def stand_in(path, *args, **kwargs):
+        Path(path).write_bytes(b"glTF")
+        return {"drawCalls": 1}
+
+    (root / ".abandoned.0a0a.glb").write_bytes(b"x")
+    os.utime(root / ".abandoned.0a0a.glb", (1, 1))
+    saved = render_worker.OUTPUT_DIR, render_worker.build_realtime_scene
+    render_worker.OUTPUT_DIR, render_worker.build_realtime_scene = root, stand_in
+    try:
+        built = render_worker.build(dict(payload))
+        served = render_worker.build(dict(payload))
+        (root / built["modelName"]).with_suffix(".json").unlink()
+        rebuilt = render_worker.build(dict(payload))
+    finally:
+        render_worker.OUTPUT_DIR, render_worker.build_realtime_scene = saved
+    assert not built["cached"] and served["cached"] and not rebuilt["cached"]
+    assert not (root / ".abandoned.0a0a.glb").exists()
+    stats = OutputCache(root).stats()
+    assert (stats["build"], stats["hit"], stats["entries"]) == (2, 1, 1)
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,146 @@
+"""Do rooms furnished in worker processes come back exactly as built?
+
+Run with `python test_parallel_rooms.py` (or pytest) from this directory.
+
+`build_rooms` can furnish a plan's rooms in forked workers. Open3D meshes do not
+pickle, so each one crosses the process boundary as arrays and is rebuilt and
+re-registered with its materials on this side. A room here is synthetic (see
+`synthetic_rooms.py`), so the test needs no texture assets, and `build_room`
+is swapped for it before the workers fork.
+A room whose furniture lists a mesh its own list does not carry must come
+back from a worker too, and stay out of the cache either way.
+
+The last test is the guarantee itself, on the real furnisher: the demo plan
+exported in order and with three workers, each in a fresh process so
+LIVINAI_ROOM_BUILD_WORKERS is read as a deployment sets it, must give the same
+GLB byte for byte. It reads the catalog and archviz assets, so they must be
+checked out (`git lfs pull`), not left as pointers.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import plan_walkthrough  # noqa: E402
+from synthetic_rooms import assert_same_room, jobs, synthetic_room  # noqa: E402
+
+
+def test_parallel_rooms_match_serial_rooms():
+    build_room = plan_walkthrough.build_room
+    plan_walkthrough.build_room = synthetic_room
+    try:
+        plan_walkthrough.clear_room_build_cache()
+        serial = plan_walkthrough.build_rooms(jobs(), workers=0)
+        parallel = plan_walkthrough._parallel_room_builds(jobs(), workers=2)
+    finally:
+        plan_walkthrough.build_room = build_room
+        # The serial builds went through the room cache; leave it as found,
+        # so their meshes do not outlive the test.
+        plan_walkthrough.clear_room_build_cache()
+    assert parallel is not None, "the workers did not run"
+    assert len(serial) == len(parallel)
+    for expected, actual in zip(serial, parallel):
+        assert_same_room(expected, actual)
+
+
+def room_with_a_stray_mesh(*args, **kwargs):
+    """A room whose furniture lists a mesh the build's own list does not."""
+    built = synthetic_room(*args, **kwargs)
+    lamp = o3d.geometry.TriangleMesh.create_cone(0.2, 0.5)
+    lamp.compute_vertex_normals()
+    built["objects"].append({"asset_key": "lamp", "meshes": [lamp]})
+    return built
+
+
+def test_a_stray_furniture_mesh_survives_both_paths():
+    build_room = plan_walkthrough.build_room
+    plan_walkthrough.build_room = room_with_a_stray_mesh
+    try:
+        plan_walkthrough.clear_room_build_cache()
+        serial = plan_walkthrough.build_rooms(jobs(), workers=0)
+        # Such a room cannot be copied faithfully, so neither path caches it,
+        # and the parallel build below furnishes every room again.
+        assert not plan_walkthrough._ROOM_BUILD_CACHE
+        parallel = plan_walkthrough.build_rooms(jobs(), workers=2)
+        assert not plan_walkthrough._ROOM_BUILD_CACHE
+    finally:
+        plan_walkthrough.build_room = build_room
+        plan_walkthrough.clear_room_build_cache()
+    for expected, actual in zip(serial, parallel):
+        assert len(actual["meshes"]) == len(expected["meshes"]) == 2
+        (lamp,) = actual["objects"][1]["meshes"]
+        assert all(lamp is not mesh for mesh in actual["meshes"])
+        assert np.array_equal(
+            np.asarray(lamp.vertices),
+            np.asarray(expected["objects"][1]["meshes"][0].vertices),
+        )
+        assert actual["objects"][0]["meshes"][0] is actual["meshes"][1]
+
+
+# Exports the demo plan to argv[1] with whatever the environment configures.
+EXPORT_DEMO = f"""
+import sys
+from pathlib import Path
+sys.path[:0] = [{str(ENGINE_ROOT.parent)!r}, {str(ENGINE_ROOT)!r}]
+import webgl_walkthrough
+living, bedroom, kitchen, doors, windows, configs = webgl_walkthrough.original._demo_plan()
+webgl_walkthrough.build_realtime_scene(
+    Path(sys.argv[1]), [living, bedroom, kitchen], doors, windows, [], configs, 100,
+)
+"""
+
+
+def exported_demo(workers):
+    path = Path(tempfile.mkdtemp(prefix="parallel-rooms-test-")) / "demo.glb"
+    environment = dict(
+        os.environ,
+        LIVINAI_ROOM_BUILD_WORKERS=str(workers),
+        # Any set iteration in the furnisher is then the same in both runs.
+        PYTHONHASHSEED="0",
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", EXPORT_DEMO, str(path)],
+        env=environment, capture_output=True, text=True, timeout=900,
+    )
+    assert process.returncode == 0, process.stderr[-2000:]
+    return path.read_bytes()
+
+
+def test_the_demo_plan_exports_the_same_bytes_with_workers():
+    texture = next((ENGINE_ROOT / "assets" / "archviz_materials").rglob("*.jpg"))
+    assert not texture.read_bytes().startswith(b"version https://git-lfs"), (
+        "the assets are git-lfs pointers; run `git lfs pull` first"
+    )
+    serial = exported_demo(0)
+    assert exported_demo(3) == serial
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
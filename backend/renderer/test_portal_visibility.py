@@ -0,0 +1,189 @@
+"""Are the potentially visible sets right, and does the export carry them?
+
+Run with `python test_portal_visibility.py` (or pytest) from this directory.
+
+`portal_visibility.potentially_visible_sets` is checked on openings laid out
+by hand in the metadata's plane: a row of four rooms joined by doors that
+zigzag, so the far end of the row is out of sight, two rooms on one corridor
+wall, and two rooms that only face each other through windows, or do not. A
+room whose search runs past MAX_PORTALS must be given everything. The export
+runs on a synthetic two-room scene in place of `build_scene`, with and without
+a door between the rooms.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import open3d as o3d
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import portal_visibility  # noqa: E402
+import webgl_walkthrough  # noqa: E402
+from portal_visibility import potentially_visible_sets  # noqa: E402
+from webgl_walkthrough import original  # noqa: E402
+
+# One plan pixel to one metre once the exporter's spatial boosts are applied.
+PIXELS_PER_METER = webgl_walkthrough.WEB_SPATIAL_BOOST * original.SCALE_BOOST
+
+
+def door(a, b, rooms, kind="door"):
+    return {"type": kind, "points": [list(a), list(b)], "roomIndices": rooms}
+
+
+def item(index, room, x, z, size=0.4):
+    return {"index": index, "nodePrefix": f"furniture_{index:03d}_", "roomIndex": room,
+            "pivot": [x, 0.0, z], "yaw": 0.3, "width": size, "depth": size}
+
+
+# Four 4 x 4 m rooms in a row along x. The doors alternate between the top
+# and the bottom of the shared walls, so every line through the first two
+# falls well below the third.
+ROW = [
+    door((4, 3.0), (4, 3.8), [0, 1]),
+    door((8, 0.2), (8, 1.0), [1, 2]),
+    door((12, 3.0), (12, 3.8), [2, 3]),
+]
+
+
+def test_a_zigzag_of_doors_hides_the_far_end_of_a_row():
+    sets = potentially_visible_sets(4, ROW, [])
+    assert [entry["rooms"] for entry in sets] == [[0, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3], [1, 2, 3]]
+
+
+def test_furniture_is_seen_only_where_a_line_through_the_doors_reaches():
+    furniture = [
+        item(0, 0, 1.0, 1.0),
+        item(1, 2, 8.5, 0.4),   # just past the second door, low: in line
+        item(2, 2, 11.0, 3.5),  # the far top corner of the third room
+        item(3, 1, 6.0, 2.0),   # anywhere in the next room is in view
+        item(4, 3, 14.0, 2.0),
+    ]
+    sets = potentially_visible_sets(4, ROW, furniture)
+    assert sets[0]["furniture"] == ["furniture_000_", "furniture_001_", "furniture_003_"]
+    # Listed in the metadata's own order, whatever order they were found in;
+    # the last room's item is too far round its door to be seen.
+    assert sets[1]["furniture"] == [entry["nodePrefix"] for entry in furniture[:4]]
+    assert "furniture_000_" not in sets[3]["furniture"]
+
+
+def test_doors_in_one_wall_do_not_see_each_other_along_it():
+    # Rooms 0 and 1 below a corridor (2), their doors in its one straight wall.
+    corridor = [door((1, 0), (2, 0), [0, 2]), door((5, 0), (6, 0), [1, 2])]
+    sets = potentially_visible_sets(3, corridor, [])
+    assert [entry["rooms"] for entry in sets] == [[0, 2], [1, 2], [0, 1, 2]]
+    # A room across the corridor, its door opposite, sees into both.
+    corridor.append(door((3, 2), (4, 2), [3, 2]))
+    sets = potentially_visible_sets(4, corridor, [])
+    assert sets[3]["rooms"] == [0, 1, 2, 3]
+
+
+def test_rooms_facing_across_the_outside_see_each_other():
+    windows = [door((4, 1), (4, 3), [0], "window"), door((6, 1), (6, 3), [1], "window")]
+    sets = potentially_visible_sets(2, windows, [item(0, 1, 8.0, 2.0)])
+    assert [entry["rooms"] for entry in sets] == [[0, 1], [0, 1]]
+    assert sets[0]["furniture"] == ["furniture_000_"]
+    # A window on the outside alone opens onto nothing of the home.
+    assert [entry["rooms"] for entry in potentially_visible_sets(2, windows[:1], [])] == [[0], [1]]
+    # With the rooms' shapes known, a sight line has to stay outside them: the
+    # second room's far window faces away, behind the room itself.
+    polygons = [[[0, 0], [4, 0], [4, 4], [0, 4]], [[6, 0], [10, 0], [10, 4], [6, 4]]]
+    facing = potentially_visible_sets(2, windows, [], polygons)
+    assert [entry["rooms"] for entry in facing] == [[0, 1], [0, 1]]
+    away = [windows[0], door((10, 1), (10, 3), [1], "window")]
+    assert [entry["rooms"] for entry in potentially_visible_sets(2, away, [], polygons)] == [[0], [1]]
+
+
+def test_a_room_whose_search_is_cut_off_sees_everything():
+    # Doors in a straight line down a row: every room is in view of every other.
+    straight = [door((4 * k, 1.5), (4 * k, 2.5), [k - 1, k]) for k in (1, 2, 3)]
+    furniture = [item(index, index, 4 * index + 2.0, 3.6) for index in range(4)]
+    saved = portal_visibility.MAX_PORTALS
+    portal_visibility.MAX_PORTALS = 2
+    try:
+        sets = potentially_visible_sets(4, straight, furniture)
+    finally:
+        portal_visibility.MAX_PORTALS = saved
+    everything = [entry["nodePrefix"] for entry in furniture]
+    # The first room reaches the last through three doors, past the limit.
+    assert sets[0] == {"rooms": [0, 1, 2, 3], "furniture": everything}
+    assert sets[3] == {"rooms": [0, 1, 2, 3], "furniture": everything}
+    # The second reaches both ends within two doors, so its set is searched:
+    # the far room's item, high in its corner, is out of line of both doors.
+    assert sets[1]["rooms"] == [0, 1, 2, 3]
+    assert "furniture_003_" not in sets[1]["furniture"]
+
+
+def synthetic_scene(*args, **kwargs):
+    floor = o3d.geometry.TriangleMesh.create_box(8.0, 4.0, 0.05)
+    floor.translate((0.0, 0.0, -0.05))
+    floor.compute_vertex_normals()
+    furniture = []
+    for position in ((1.5, 2.0), (6.0, 2.0)):
+        chair = o3d.geometry.TriangleMesh.create_box(0.45, 0.5, 0.9)
+        chair.translate((-0.225, -0.25, 0.0))
+        chair.compute_vertex_normals()
+        original.place_meshes([chair], position, 0.0)
+        furniture.append({"asset_key": "dining_chair", "meshes": [chair],
+                          "position": position, "yaw": 0.0, "width": 0.45, "depth": 0.5})
+    return {
+        "meshes": [floor] + [entry["meshes"][0] for entry in furniture],
+        "furniture_objects": furniture,
+        "spawn": (6.0, 2.0),
+        "allowed": original.Polygon([(0.3, 0.3), (7.7, 0.3), (7.7, 3.7), (0.3, 3.7)]),
+    }
+
+
+def export(doors):
+    build_scene = original.build_scene
+    original.build_scene = synthetic_scene
+    path = Path(tempfile.mkdtemp(prefix="visibility-test-")) / "scene.glb"
+    try:
+        return webgl_walkthrough.build_realtime_scene(
+            path,
+            [[(0, 0), (4, 0), (4, -4), (0, -4)], [(4, 0), (8, 0), (8, -4), (4, -4)]],
+            doors, [], [], [{"room_type": "Dining"}, {"room_type": "Living"}],
+            PIXELS_PER_METER,
+        )
+    finally:
+        original.build_scene = build_scene
+
+
+def test_the_export_lists_what_each_room_can_see():
+    metadata = export([[(4, -1.5), (4, -2.5)]])
+    sets = metadata["potentiallyVisible"]
+    assert len(sets) == len(metadata["roomPolygons"]) == 2
+    assert [entry["rooms"] for entry in sets] == [[0, 1], [0, 1]]
+    prefixes = [entry["nodePrefix"] for entry in metadata["furniture"]]
+    assert all(entry["furniture"] == prefixes for entry in sets)
+    walled = export([])["potentiallyVisible"]
+    assert [entry["rooms"] for entry in walled] == [[0], [1]]
+    rooms = {entry["nodePrefix"]: entry["roomIndex"] for entry in metadata["furniture"]}
+    for index, entry in enumerate(walled):
+        assert entry["furniture"] == [prefix for prefix in prefixes if rooms[prefix] == index]
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
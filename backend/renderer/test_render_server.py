@@ -0,0 +1,138 @@
+"""Does the long-lived worker answer every request, and only on its protocol?
+
+Run with `python test_render_server.py` (or pytest) from this directory.
+
+`render_worker.py --serve` forks its builders from one warm process and
+answers JSON lines. `build` is swapped for a stand-in before the pool forks —
+one that sleeps, fails or kills its process on request — so the test needs no
+plan or assets. The last test starts the real server as the API does and
+checks that the exporter's own printing stays off the protocol stream.
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import render_worker  # noqa: E402
+
+
+def stand_in(payload):
+    print("[WALK] building", payload)  # the real builder talks on stdout too
+    time.sleep(payload.get("sleep", 0.0))
+    if payload.get("crash"):
+        os._exit(9)
+    if payload.get("fail"):
+        raise ValueError("At least one measured room is required.")
+    return {"success": True, "cached": False, "modelName": payload["name"]}
+
+
+def served(lines, workers=2, queue=4):
+    build = render_worker.build
+    render_worker.build = stand_in
+    sink = io.StringIO()
+    try:
+        render_worker.serve(source=lines, sink=sink, workers=workers, queue=queue)
+    finally:
+        render_worker.build = build
+    return {
+        message["id"]: message["response"]
+        for message in map(json.loads, sink.getvalue().splitlines())
+    }
+
+
+def request(request_id, **payload):
+    return json.dumps({"id": request_id, "payload": payload}) + "\n"
+
+
+def test_every_request_is_answered_under_its_id():
+    answers = served([
+        request(1, name="a.glb", sleep=0.2),
+        request(2, name="b.glb"),
+        request(3, fail=True),
+        "\n",
+        "not json\n",
+    ])
+    assert answers[1] == {"success": True, "cached": False, "modelName": "a.glb"}
+    assert answers[2]["modelName"] == "b.glb"
+    assert answers[3] == {
+        "success": False,
+        "error": "At least one measured room is required.",
+    }
+    assert answers[None]["error"].startswith("Malformed request")
+
+
+def test_a_full_queue_turns_requests_away_at_once():
+    answers = served(
+        [request(index, name=f"{index}.glb", sleep=0.3) for index in range(4)],
+        workers=1,
+        queue=1,
+    )
+    assert answers[0]["success"] and answers[1]["success"]
+    assert answers[2] == answers[3] == {
+        "success": False,
+        "error": render_worker.BUSY_ERROR,
+    }
+
+
+def test_a_crashed_builder_is_replaced():
+    def lines():
+        yield request(1, crash=True)
+        time.sleep(1.0)
+        yield request(2, name="after.glb")
+
+    answers = served(lines(), workers=1)
+    assert answers[1]["success"] is False
+    assert answers[2]["modelName"] == "after.glb"
+
+
+def test_the_server_keeps_stdout_for_responses():
+    server = subprocess.run(
+        [sys.executable, str(ROOT / "render_worker.py"), "--serve"],
+        input=request("empty") + request("bad", rooms=[{"points": []}]),
+        capture_output=True,
+        text=True,
+        timeout=300,
+        cwd=ROOT,
+    )
+    assert server.returncode == 0, server.stderr[-2000:]
+    lines = server.stdout.splitlines()
+    assert len(lines) == 2, server.stdout[:2000]
+    answers = {message["id"]: message["response"] for message in map(json.loads, lines)}
+    assert answers["empty"] == {
+        "success": False,
+        "error": "At least one measured room is required.",
+    }
+    assert answers["bad"] == {
+        "success": False,
+        "error": "Every room must have one room configuration.",
+    }
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
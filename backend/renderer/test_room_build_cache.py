@@ -0,0 +1,125 @@
+"""Does the per-room build cache reuse exactly the rooms that did not change?
+
+Run with `python test_room_build_cache.py` (or pytest) from this directory.
+
+`build_room` is swapped for the synthetic one in `synthetic_rooms.py`, which
+logs the rooms it furnishes. Four rooms stand in a row, each sharing a wall
+with the next. A repeated build must furnish none of them again; changing one
+room's configuration must rebuild that room alone, and a door cut into the
+wall between the first two must rebuild those two and no other. A reused room
+must come back as a copy of what was built, materials registered on the copy.
+"""
+
+import sys
+from pathlib import Path
+
+from shapely.geometry import LineString
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import plan_walkthrough  # noqa: E402
+from synthetic_rooms import BUILT, assert_same_room, jobs, synthetic_room  # noqa: E402
+
+
+def build(configs=None):
+    """One serial `build_rooms` pass; returns the rooms it furnished afresh."""
+    BUILT.clear()
+    rooms = plan_walkthrough.build_rooms(jobs(configs=configs), workers=0)
+    return rooms, list(BUILT)
+
+
+def with_synthetic_rooms(test):
+    def run():
+        build_room = plan_walkthrough.build_room
+        size = plan_walkthrough.ROOM_BUILD_CACHE_SIZE
+        plan_walkthrough.build_room = synthetic_room
+        # On whatever LIVINAI_ROOM_BUILD_CACHE says, and starting empty.
+        plan_walkthrough.ROOM_BUILD_CACHE_SIZE = 32
+        plan_walkthrough.clear_room_build_cache()
+        try:
+            test()
+        finally:
+            plan_walkthrough.build_room = build_room
+            plan_walkthrough.ROOM_BUILD_CACHE_SIZE = size
+            plan_walkthrough.clear_room_build_cache()
+    run.__name__ = test.__name__
+    return run
+
+
+@with_synthetic_rooms
+def test_a_repeated_build_reuses_every_room():
+    _rooms, built = build()
+    assert built == ["r0", "r3", "r6", "r9"]
+    _rooms, built = build()
+    assert built == []
+
+
+@with_synthetic_rooms
+def test_changing_one_room_rebuilds_that_room_alone():
+    build()
+    _rooms, built = build({"r6": {"name": "r6", "floor": "walnut"}})
+    assert built == ["r6"]
+    # The original configuration is still cached alongside the new one.
+    _rooms, built = build()
+    assert built == []
+
+
+@with_synthetic_rooms
+def test_a_door_in_a_shared_wall_rebuilds_both_rooms_it_joins():
+    build()
+    # The wall at x = 3 is shared by the first two rooms; the third starts at
+    # x = 6, well beyond the reach of anything cut into it.
+    door = LineString([(3, 1.5), (3, 2.5)])
+    for active in (
+        plan_walkthrough._ACTIVE_WALL_OPENINGS,
+        plan_walkthrough._ACTIVE_CIRCULATION_DOORS,
+    ):
+        token = active.set((door,))
+        try:
+            _rooms, built = build()
+        finally:
+            active.reset(token)
+        assert built == ["r0", "r3"], active.name
+
+
+@with_synthetic_rooms
+def test_a_cached_room_is_a_copy_of_a_fresh_build():
+    fresh, _built = build()
+    cached, built = build()
+    assert built == []
+    for expected, actual in zip(fresh, cached):
+        assert_same_room(expected, actual)
+        assert actual["floor_color"] == expected["floor_color"]
+        # A copy: the exporter carves and re-materials meshes in place.
+        assert not {id(mesh) for mesh in actual["meshes"]} & {
+            id(mesh) for mesh in expected["meshes"]
+        }
+    # Each reuse is a copy of its own; the next one shares no meshes with it.
+    again, _built = build()
+    assert not {id(mesh) for room in cached for mesh in room["meshes"]} & {
+        id(mesh) for room in again for mesh in room["meshes"]
+    }
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,224 @@
+"""Does a chunked export split the home by room, and can it be served that way?
+
+Run with `python test_scene_chunks.py` (or pytest) from this directory.
+
+`build_scene` is replaced by a synthetic one: two 4 x 4 m rooms side by side,
+each with its floor and ceiling, a chair in the first and two in the second,
+and the spawn point in the second. The export runs for real into a directory.
+Each room must come out as a shell file and a furniture file named by their
+content, the spawn room's first; every node of the one-file export must be in
+exactly one chunk, in the same place; and the output cache must count a
+chunked scene's files as the scene's and remove them with it, not before.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import open3d as o3d
+import trimesh
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import webgl_walkthrough  # noqa: E402
+from output_cache import OutputCache  # noqa: E402
+from webgl_walkthrough import original  # noqa: E402
+
+# One plan pixel to one metre once the exporter's spatial boosts are applied.
+PIXELS_PER_METER = webgl_walkthrough.WEB_SPATIAL_BOOST * original.SCALE_BOOST
+ROOMS = [
+    [(0, 0), (4, 0), (4, -4), (0, -4)],
+    [(4, 0), (8, 0), (8, -4), (4, -4)],
+]
+CHAIRS = [((1.5, 2.0), 0.0), ((5.5, 1.5), 0.4), ((6.5, 2.5), 2.0)]
+SPAWN = (6.0, 2.0)
+
+
+def slab(x, z, color):
+    mesh = o3d.geometry.TriangleMesh.create_box(4.0, 4.0, 0.05)
+    mesh.translate((x, 0.0, z))
+    mesh.paint_uniform_color(color)
+    mesh.compute_vertex_normals()
+    return mesh
+
+
+def synthetic_scene(*args, **kwargs):
+    shell = []
+    for x in (0.0, 4.0):
+        shell.append(slab(x, -0.05, (0.6, 0.5, 0.4)))
+        shell.append(slab(x, float(original.WALL_H) - 0.05, (0.95, 0.95, 0.95)))
+    furniture = []
+    for position, yaw in CHAIRS:
+        chair = o3d.geometry.TriangleMesh.create_box(0.45, 0.5, 0.9)
+        chair.translate((-0.225, -0.25, 0.0))
+        chair.paint_uniform_color((0.3, 0.2, 0.1))
+        chair.compute_vertex_normals()
+        original.place_meshes([chair], position, yaw)
+        furniture.append({"asset_key": "dining_chair", "meshes": [chair],
+                          "position": position, "yaw": yaw})
+    return {
+        "meshes": shell + [item["meshes"][0] for item in furniture],
+        "furniture_objects": furniture,
+        "spawn": SPAWN,
+        "allowed": original.Polygon([(0.3, 0.3), (7.7, 0.3), (7.7, 3.7), (0.3, 3.7)]),
+    }
+
+
+def export(chunked):
+    build_scene = original.build_scene
+    original.build_scene = synthetic_scene
+    root = Path(tempfile.mkdtemp(prefix="chunk-test-"))
+    path = root if chunked else root / "scene.glb"
+    try:
+        metadata = webgl_walkthrough.build_realtime_scene(
+            path, ROOMS, [], [], [], [{"room_type": "Dining"}, {"room_type": "Living"}],
+            PIXELS_PER_METER, chunked=chunked,
+        )
+    finally:
+        original.build_scene = build_scene
+    return metadata, path
+
+
+def gltf_json(path):
+    data = Path(path).read_bytes()
+    (length,) = struct.unpack_from("<I", data, 12)
+    return json.loads(data[20:20 + length])
+
+
+def node_triangles(path):
+    """Every node's triangles in world space, by node name."""
+    scene = trimesh.load(path, force="scene", process=False)
+    result = {}
+    for node in scene.graph.nodes_geometry:
+        transform, name = scene.graph[node]
+        mesh = scene.geometry[name]
+        corners = trimesh.transform_points(mesh.vertices, transform)[mesh.faces.reshape(-1)]
+        result[node] = np.sort(corners.reshape(-1, 9), axis=0)
+    return result
+
+
+def test_each_room_is_a_shell_and_a_furniture_chunk_spawn_room_first():
+    metadata, root = export(chunked=True)
+    chunks = metadata["chunks"]
+    assert [(chunk["kind"], chunk["roomIndex"]) for chunk in chunks] == [
+        ("shell", 1), ("furniture", 1), ("shell", 0), ("furniture", 0),
+    ]
+    assert sum(chunk["drawCalls"] for chunk in chunks) == metadata["drawCalls"]
+    for chunk in chunks:
+        data = (root / chunk["model"]).read_bytes()
+        # Named by content, like a scene, so the model endpoint admits it.
+        assert chunk["model"] == hashlib.sha256(data).hexdigest()[:24] + ".glb"
+        assert chunk["bytes"] == len(data)
+    # Nothing but the chunks is left in the directory.
+    assert sorted(os.listdir(root)) == sorted(chunk["model"] for chunk in chunks)
+
+
+def test_chunks_hold_every_node_of_the_single_file_in_place():
+    whole_metadata, whole = export(chunked=False)
+    metadata, root = export(chunked=True)
+    assert "chunks" not in whole_metadata
+    expected = node_triangles(whole)
+    found = {}
+    for chunk in metadata["chunks"]:
+        nodes = node_triangles(root / chunk["model"])
+        assert not set(found).intersection(nodes)
+        found.update(nodes)
+        names = [name for name in nodes if name.startswith("furniture_")]
+        rooms = {item["roomIndex"] for item in metadata["furniture"]
+                 if any(name.startswith(item["nodePrefix"]) for name in names)}
+        assert rooms <= {chunk["roomIndex"]}
+        assert bool(names) == (chunk["kind"] == "furniture")
+    # Ceilings are split by room, still under the prefix the browser hides.
+    assert sorted(name.split("_material_")[0] for name in found if name.startswith("ceiling_")) == [
+        "ceiling_room_00", "ceiling_room_01",
+    ]
+    rename = {name: name.split("_material_")[0] for name in expected}
+    furniture = {name: triangles for name, triangles in found.items() if name.startswith("furniture_")}
+    assert len(furniture) == len(CHAIRS)
+    for name, triangles in furniture.items():
+        (match,) = [other for other in expected if rename[other] == name.split("_material_")[0]]
+        assert np.allclose(triangles, expected[match], atol=1e-5), name
+    everything = np.sort(np.concatenate(list(found.values())), axis=0)
+    assert np.allclose(everything, np.sort(np.concatenate(list(expected.values())), axis=0), atol=1e-5)
+
+
+def test_chunk_bounds_hold_their_nodes():
+    metadata, root = export(chunked=True)
+    for chunk in metadata["chunks"]:
+        low = np.asarray(chunk["bounds"]["min"])
+        high = np.asarray(chunk["bounds"]["max"])
+        for triangles in node_triangles(root / chunk["model"]).values():
+            corners = triangles.reshape(-1, 3)
+            assert (corners >= low - 1e-4).all() and (corners <= high + 1e-4).all()
+        # Each room's chunk lies over its own half of the plan.
+        room_x = 4.0 * chunk["roomIndex"]
+        assert room_x - 1e-3 <= low[0] and high[0] <= room_x + 4.0 + 1e-3
+
+
+def test_output_cache_keeps_shared_chunks_and_sweeps_orphans():
+    metadata, root = export(chunked=True)
+    names = [chunk["model"] for chunk in metadata["chunks"]]
+    first, second = "a" * 24, "b" * 24
+    # Two scenes whose manifests list the same chunks, and a chunk nobody lists.
+    for cache_id in (first, second):
+        (root / f"{cache_id}.json").write_text(json.dumps(metadata), encoding="utf-8")
+    orphan = root / ("c" * 24 + ".glb")
+    orphan.write_bytes(b"glTF")
+    long_ago = time.time() - 7200
+    for path in root.iterdir():
+        os.utime(path, (long_ago, long_ago))
+    os.utime(root / f"{second}.json")
+    cache = OutputCache(root, budget=1, stale_after=3600)
+    cache.record(first, "build", now=long_ago)
+    # Fetching a chunk counts as using the scenes that list it.
+    cache.record(Path(names[0]).stem, "download", now=long_ago + 10)
+    entries = json.loads(cache.index_path.read_text())["entries"]
+    assert entries[first]["bytes"] > sum(chunk["bytes"] for chunk in metadata["chunks"])
+
+    removed = cache.collect()
+    assert removed == {"evicted": [first], "swept": 1}
+    assert not orphan.exists()
+    entries = json.loads(cache.index_path.read_text())["entries"]
+    assert entries[second]["served"] > long_ago + 10
+    # The second scene still lists every chunk, so none of them went with the first.
+    assert all((root / name).exists() for name in names)
+    entries = json.loads(cache.index_path.read_text())["entries"]
+    assert sorted(entries) == [second]
+    assert entries[second]["chunks"] == [Path(name).stem for name in names]
+
+    # Once no scene lists them, they go with the last one that did.
+    cache.budget = 1
+    (root / f"{second}.json").unlink()
+    assert cache.collect() == {"evicted": [], "swept": len(names)}
+    assert sorted(os.listdir(root)) == sorted([".cache-index.json", ".cache-index.lock"])
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,201 @@
+"""Is a scene requested by several processes at once built exactly once?
+
+Run with `python test_single_flight.py` (or pytest) from this directory.
+
+`render_worker.build` takes a lease on the scene's cache id before building it,
+and every other request for that id waits for the files instead. The exporter
+is swapped for a slow stand-in that records each real build in a shared log,
+and the requests come from separate forked processes, the way the render
+server's builders and concurrent one-shot workers reach the same directory.
+One test stages a race in a single process instead: the scene is finished
+elsewhere just before the lease check and evicted just after it, and the
+request that finds it gone must still build under the lease.
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import render_worker  # noqa: E402
+
+PAYLOAD = {
+    "rooms": [{"points": [[0, 0], [400, 0], [400, 300], [0, 300]]}],
+    "roomConfigs": [{"name": "Living", "roomType": "Living Room"}],
+    "pixelsPerMeter": 100,
+}
+
+
+@contextmanager
+def use_directory(seconds=0.6, fail=False, lease=120.0):
+    """Point the worker at a fresh directory, with a stand-in exporter."""
+    directory = Path(tempfile.mkdtemp(prefix="single-flight-test-"))
+    log = directory / "builds.log"
+
+    def stand_in(path, *args, **kwargs):
+        with open(log, "a", encoding="utf-8") as handle:
+            handle.write(f"{os.getpid()}\n")
+        time.sleep(seconds)
+        if fail:
+            raise RuntimeError("The build failed.")
+        Path(path).write_bytes(b"glTF")
+        return {"drawCalls": 1}
+
+    saved = (
+        render_worker.OUTPUT_DIR,
+        render_worker.build_realtime_scene,
+        render_worker.BUILD_WAIT_POLL_SECONDS,
+        render_worker.BUILD_LEASE_SECONDS,
+    )
+    render_worker.OUTPUT_DIR = directory
+    render_worker.build_realtime_scene = stand_in
+    render_worker.BUILD_WAIT_POLL_SECONDS = 0.05
+    render_worker.BUILD_LEASE_SECONDS = lease
+    try:
+        yield directory, log
+    finally:
+        (
+            render_worker.OUTPUT_DIR,
+            render_worker.build_realtime_scene,
+            render_worker.BUILD_WAIT_POLL_SECONDS,
+            render_worker.BUILD_LEASE_SECONDS,
+        ) = saved
+
+
+def request(results):
+    try:
+        results.put(render_worker.build(dict(PAYLOAD)))
+    except Exception as error:
+        results.put({"success": False, "error": str(error)})
+
+
+def concurrently(count):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=request, args=(results,)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    answers = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+    return answers
+
+
+def builds(log):
+    return log.read_text(encoding="utf-8").split() if log.exists() else []
+
+
+def leftovers(directory):
+    """Hidden files other than the output cache's own index and use log."""
+    return [path for path in directory.glob(".*")
+            if not path.name.startswith((".cache-index", ".cache-uses"))]
+
+
+def test_concurrent_requests_build_once():
+    with use_directory() as (directory, log):
+        answers = concurrently(6)
+    assert len(builds(log)) == 1, builds(log)
+    assert all(answer["success"] for answer in answers), answers
+    assert len({answer["modelName"] for answer in answers}) == 1
+    assert sum(not answer["cached"] for answer in answers) == 1
+    assert not leftovers(directory), "a lease or temporary file was left behind"
+
+
+def test_a_build_outliving_its_lease_keeps_it_by_renewing():
+    with use_directory(seconds=1.5, lease=0.3) as (_directory, log):
+        answers = concurrently(3)
+    assert len(builds(log)) == 1, builds(log)
+    assert all(answer["success"] for answer in answers)
+
+
+def test_an_expired_lease_is_taken_over():
+    with use_directory(seconds=0.0) as (directory, log):
+        answer = render_worker.build(dict(PAYLOAD))
+        model = directory / answer["modelName"]
+        model.unlink()
+        lease = directory / f".{model.stem}.lease"
+        lease.write_text(json.dumps({"owner": "gone", "expires": time.time() - 1}))
+        started = time.monotonic()
+        answer = render_worker.build(dict(PAYLOAD))
+    assert answer["success"] and not answer["cached"]
+    assert time.monotonic() - started < 5
+    assert len(builds(log)) == 2
+    assert not lease.exists()
+
+
+def test_waiters_build_themselves_when_the_holder_fails():
+    with use_directory(seconds=0.4, fail=True) as (directory, log):
+        answers = concurrently(3)
+    # Each request built in turn, one at a time, and reported its own failure.
+    assert len(builds(log)) == 3
+    assert all(answer == {"success": False, "error": "The build failed."} for answer in answers)
+    assert not leftovers(directory)
+
+
+def test_a_scene_evicted_after_the_lease_check_is_built_under_the_lease():
+    with use_directory(seconds=0.0) as (directory, log):
+        leased = []
+        stand_in = render_worker.build_realtime_scene
+
+        def watched(path, *args, **kwargs):
+            leased.append(any(directory.glob(".*.lease")))
+            return stand_in(path, *args, **kwargs)
+
+        single_flight = render_worker.single_flight
+        raced = []
+
+        @contextmanager
+        def racing(cache_id, ready):
+            if raced:
+                with single_flight(cache_id, ready) as built_elsewhere:
+                    yield built_elsewhere
+                return
+            raced.append(cache_id)
+            # Another request finishes the scene after this one's first look...
+            render_worker.build(dict(PAYLOAD))
+            with single_flight(cache_id, ready) as built_elsewhere:
+                # ...and a collection evicts it right after the lease check.
+                for suffix in (".json", ".glb"):
+                    (directory / f"{cache_id}{suffix}").unlink()
+                yield built_elsewhere
+
+        render_worker.build_realtime_scene = watched
+        render_worker.single_flight = racing
+        try:
+            answer = render_worker.build(dict(PAYLOAD))
+        finally:
+            render_worker.single_flight = single_flight
+    assert answer["success"] and not answer["cached"]
+    assert len(builds(log)) == 2
+    assert leased == [True, True], "a build ran without the lease"
+    assert not leftovers(directory)
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,153 @@
+"""Is the source fingerprint read from the manifest, and hashed only without one?
+
+Run with `python test_source_version.py` (or pytest) from this directory.
+
+`interior_plan_source_version` is cached for the life of the process and
+prefers the manifest WALKTHROUGH_SOURCE_MANIFEST names over hashing the
+engine and catalog. `compute_source_version` is counted in place, so each
+test sees whether the hash ran; the manifests are written to a temporary
+directory, by hand or by `render_worker.py --write-source-manifest` as an
+image build step runs it.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+ENGINE_ROOT = ROOT / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import webgl_walkthrough  # noqa: E402
+from webgl_walkthrough import (  # noqa: E402
+    SOURCE_MANIFEST_ENV,
+    interior_plan_source_version,
+    invalidate_source_version,
+)
+
+
+HASH_SOURCES = f"""
+import sys
+sys.path[:0] = [{str(ENGINE_ROOT)!r}, {str(ENGINE_ROOT / "interior_plan")!r}]
+import webgl_walkthrough
+print(webgl_walkthrough.compute_source_version())
+"""
+
+
+def manifest(version):
+    path = Path(tempfile.mkdtemp(prefix="source-version-test-")) / "manifest.json"
+    path.write_text(json.dumps({"interiorPlanSource": version}), encoding="utf-8")
+    return path
+
+
+@contextmanager
+def counted_hashing(manifest_path=None):
+    """Point the worker at `manifest_path` and count how often it hashes."""
+    compute = webgl_walkthrough.compute_source_version
+    calls = []
+
+    def counted():
+        calls.append(1)
+        return "hashed-version"
+
+    saved = os.environ.get(SOURCE_MANIFEST_ENV)
+    if manifest_path is None:
+        os.environ.pop(SOURCE_MANIFEST_ENV, None)
+    else:
+        os.environ[SOURCE_MANIFEST_ENV] = str(manifest_path)
+    webgl_walkthrough.compute_source_version = counted
+    interior_plan_source_version.cache_clear()
+    try:
+        yield calls
+    finally:
+        webgl_walkthrough.compute_source_version = compute
+        if saved is None:
+            os.environ.pop(SOURCE_MANIFEST_ENV, None)
+        else:
+            os.environ[SOURCE_MANIFEST_ENV] = saved
+        interior_plan_source_version.cache_clear()
+
+
+def test_a_manifest_is_used_when_present():
+    with counted_hashing(manifest("0123456789abcdef")) as calls:
+        assert interior_plan_source_version() == "0123456789abcdef"
+        assert interior_plan_source_version() == "0123456789abcdef"
+    assert calls == []
+
+
+def test_without_a_usable_manifest_the_sources_are_hashed_once():
+    folder = Path(tempfile.mkdtemp(prefix="source-version-test-"))
+    broken = folder / "broken.json"
+    broken.write_text("{not json", encoding="utf-8")
+    empty = manifest("")
+    for path in (None, folder / "missing.json", broken, empty):
+        with counted_hashing(path) as calls:
+            assert interior_plan_source_version() == "hashed-version", path
+            interior_plan_source_version()
+        assert calls == [1], path
+
+
+def test_invalidating_reads_the_manifest_again():
+    path = manifest("first-version")
+    with counted_hashing(path) as calls:
+        assert interior_plan_source_version() == "first-version"
+        path.write_text(json.dumps({"interiorPlanSource": "second-version"}), encoding="utf-8")
+        # Cached for the process: a changed manifest is not noticed on its own.
+        assert interior_plan_source_version() == "first-version"
+        invalidate_source_version()
+        assert interior_plan_source_version() == "second-version"
+        path.unlink()
+        invalidate_source_version()
+        assert interior_plan_source_version() == "hashed-version"
+    assert calls == [1]
+
+
+def test_the_build_step_writes_the_hash_a_worker_would_compute():
+    path = Path(tempfile.mkdtemp(prefix="source-version-test-")) / "image" / "manifest.json"
+    environment = {key: value for key, value in os.environ.items() if key != SOURCE_MANIFEST_ENV}
+    written = subprocess.run(
+        [sys.executable, str(ROOT / "render_worker.py"), "--write-source-manifest", str(path)],
+        capture_output=True, text=True, timeout=300, cwd=ROOT, env=environment,
+    )
+    assert written.returncode == 0, written.stderr[-2000:]
+    version = json.loads(path.read_text(encoding="utf-8"))["interiorPlanSource"]
+    assert written.stdout.split()[-1] == version
+    # Hashed afresh in a process of its own: other tests in this one may
+    # have pointed the catalog elsewhere.
+    hashed = subprocess.run(
+        [sys.executable, "-c", HASH_SOURCES],
+        capture_output=True, text=True, timeout=300, cwd=ROOT, env=environment,
+    )
+    assert hashed.returncode == 0, hashed.stderr[-2000:]
+    assert version == hashed.stdout.split()[-1]
+    with counted_hashing(path) as calls:
+        assert interior_plan_source_version() == version
+    assert calls == []
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
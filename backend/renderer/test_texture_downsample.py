@@ -0,0 +1,170 @@
+"""Are catalog textures brought down before recoloring, and still the same?
+
+Run with `python test_texture_downsample.py` (or pytest) from this directory.
+
+The web exporter keeps 256-pixel textures. The catalog used to recolor every
+model's authored 1K albedo in float math and leave the resize to the exporter;
+with `TEXTURE_MAX_SIZE` set it resizes first. The model is a synthetic GLB
+with 1024-pixel albedo, normal and metallic-roughness maps, written to a
+temporary directory, and the comparison is against the old order — recolor at
+full size, then the exporter's resize. Running the file directly also prints
+the recolor time both ways.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine" / "interior_plan"
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+import furniture_catalog  # noqa: E402
+
+MODEL_DIR = Path(tempfile.mkdtemp(prefix="texture-test-"))
+PALETTE = {"sofa": [0.30, 0.40, 0.50]}
+WEB_SIZE = 256
+
+
+def fabric(seed, size=1024):
+    """A woven-looking texture: a smooth base, a fine weave and some grain."""
+    rng = np.random.default_rng(seed)
+    base = np.asarray(
+        Image.fromarray((rng.random((16, 16, 3)) * 255).astype(np.uint8)).resize(
+            (size, size), Image.Resampling.BICUBIC
+        ),
+        dtype=float,
+    )
+    y, x = np.mgrid[0:size, 0:size]
+    weave = 18 * np.sin(x * 0.9)[..., None] * np.sin(y * 0.9)[..., None]
+    grain = rng.normal(0, 6, (size, size, 3))
+    return np.clip(base + weave + grain, 0, 255).astype(np.uint8)
+
+
+def write_model():
+    seat = trimesh.creation.box((0.8, 0.5, 0.4))
+    seat.unmerge_vertices()
+    rng = np.random.default_rng(1)
+    seat.visual = trimesh.visual.TextureVisuals(
+        uv=rng.random((len(seat.vertices), 2)),
+        material=trimesh.visual.material.PBRMaterial(
+            baseColorTexture=Image.fromarray(fabric(1)),
+            normalTexture=Image.fromarray(fabric(2)),
+            metallicRoughnessTexture=Image.fromarray(fabric(3)),
+            roughnessFactor=0.4,
+        ),
+    )
+    trimesh.Scene([seat]).export(MODEL_DIR / "sofa.glb")
+
+
+def spec_at(max_size):
+    """The placed sofa's PBR spec with the catalog set to `max_size`."""
+    saved = furniture_catalog.TEXTURE_MAX_SIZE
+    furniture_catalog.CATALOG_ROOT = MODEL_DIR
+    furniture_catalog._model_name = lambda asset_key, style: "sofa.glb"
+    furniture_catalog.clear_catalog_cache()
+    furniture_catalog.TEXTURE_MAX_SIZE = max_size
+    try:
+        meshes = furniture_catalog.load_catalog_asset(
+            "sofa", "modern", 1.7, 0.8, 0.8, PALETTE
+        )
+    finally:
+        furniture_catalog.TEXTURE_MAX_SIZE = saved
+        furniture_catalog.clear_catalog_cache()
+    return furniture_catalog._catalog_spec(meshes[0])
+
+
+def test_maps_arrive_at_the_export_size():
+    write_model()
+    spec = spec_at(WEB_SIZE)
+    for name in ("albedo", "normal", "arm"):
+        assert spec[name].shape == (WEB_SIZE, WEB_SIZE, 3), name
+
+
+def test_recolored_first_or_last_looks_the_same():
+    write_model()
+    authored = spec_at(None)
+    early = spec_at(WEB_SIZE)
+    late = {
+        name: furniture_catalog.downsample_texture(authored[name], WEB_SIZE)
+        for name in ("albedo", "normal", "arm")
+    }
+    # Normal and ARM maps are not recolored: the same resize, the same pixels.
+    assert np.array_equal(early["normal"], late["normal"])
+    assert np.array_equal(early["arm"], late["arm"])
+    # The recolor is linear in the pixel except where it eases off for near
+    # white, so the two orders agree except in the odd highlight texel.
+    difference = np.abs(early["albedo"].astype(int) - late["albedo"].astype(int))
+    assert difference.mean() < 1.0, difference.mean()
+    assert np.percentile(difference, 99) <= 6, np.percentile(difference, 99)
+    shift = early["albedo"].mean(axis=(0, 1)) - late["albedo"].mean(axis=(0, 1))
+    assert np.abs(shift).max() < 0.5, shift
+
+
+def test_the_desktop_walkthrough_keeps_authored_textures():
+    write_model()
+    spec = spec_at(None)
+    assert spec["albedo"].shape == (1024, 1024, 3)
+
+
+def test_each_size_is_cached_on_its_own():
+    write_model()
+    small = spec_at(WEB_SIZE)
+    saved = furniture_catalog.TEXTURE_MAX_SIZE
+    furniture_catalog.TEXTURE_MAX_SIZE = WEB_SIZE
+    try:
+        furniture_catalog.load_catalog_asset("sofa", "modern", 1.7, 0.8, 0.8, PALETTE)
+        furniture_catalog.TEXTURE_MAX_SIZE = 128
+        meshes = furniture_catalog.load_catalog_asset(
+            "sofa", "modern", 1.7, 0.8, 0.8, PALETTE
+        )
+    finally:
+        furniture_catalog.TEXTURE_MAX_SIZE = saved
+        furniture_catalog.clear_catalog_cache()
+    assert small["albedo"].shape[0] == WEB_SIZE
+    assert furniture_catalog._catalog_spec(meshes[0])["albedo"].shape[0] == 128
+
+
+def _timing():
+    pixels = fabric(4)
+    target = np.asarray(PALETTE["sofa"])
+    started = time.perf_counter()
+    furniture_catalog.downsample_texture(
+        furniture_catalog._coordinated_texture(pixels, target, True, 0.92), WEB_SIZE
+    )
+    late = time.perf_counter() - started
+    started = time.perf_counter()
+    furniture_catalog._coordinated_texture(
+        furniture_catalog.downsample_texture(pixels, WEB_SIZE), target, True, 0.92
+    )
+    early = time.perf_counter() - started
+    print(f"  1K albedo: recolor then resize {late * 1000:.1f} ms, "
+          f"resize then recolor {early * 1000:.1f} ms")
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    _timing()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
@@ -0,0 +1,119 @@
+"""Are cached wall slots the runs a fresh derivation finds, after every cut?
+
+Run with `python test_wall_slots.py` (or pytest) from this directory.
+
+`RoomFurnisher.wall_slots` keeps its table per furnisher and only works it out
+again when an opening changes. The exporter cuts openings into the edges in
+place, so the test does the same between calls and checks the table follows,
+both for solid walls and for the glazed-walls-allowed variant the exporter
+installs.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ENGINE_ROOT = Path(__file__).resolve().parent / "engine"
+for path in (ENGINE_ROOT, ENGINE_ROOT / "interior_plan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import webgl_walkthrough  # noqa: E402,F401  (installs include_windows)
+from plan_walkthrough import Polygon, RoomFurnisher  # noqa: E402
+
+
+def furnisher():
+    corners = [(0.0, 0.0), (6.0, 0.0), (6.0, 4.5), (0.0, 4.5)]
+    room = RoomFurnisher.__new__(RoomFurnisher)
+    room.poly = Polygon(corners)
+    room.edges = [
+        {
+            "p1": corners[index],
+            "p2": corners[(index + 1) % 4],
+            "length": float(np.hypot(*np.subtract(corners[(index + 1) % 4],
+                                                  corners[index]))),
+            "openings": [],
+        }
+        for index in range(4)
+    ]
+    room.edges[0]["openings"].append(("door", 0.10, 0.25))
+    room.edges[2]["openings"].append(("window", 0.40, 0.60))
+    return room
+
+
+def fresh(room, include_windows):
+    if include_windows:
+        return webgl_walkthrough._wall_runs_past_windows(room)
+    return room._free_wall_runs()
+
+
+def same(left, right):
+    assert len(left) == len(right)
+    for a, b in zip(left, right):
+        assert a.keys() == b.keys()
+        for key in a:
+            if key == "edge":
+                assert a[key] is b[key]
+            else:
+                assert np.array_equal(a[key], b[key]), key
+
+
+def test_cached_table_is_the_fresh_table():
+    room = furnisher()
+    for include_windows in (False, True):
+        first = room.wall_slots(include_windows=include_windows)
+        same(first, fresh(room, include_windows))
+        second = room.wall_slots(include_windows=include_windows)
+        assert first is not second
+        assert all(a is b for a, b in zip(first, second))
+
+
+def test_a_new_opening_is_seen_on_the_next_call():
+    room = furnisher()
+    before = room.wall_slots()
+    glazed_before = room.wall_slots(include_windows=True)
+    room.edges[1]["openings"].append(("window", 0.30, 0.70))
+    after = room.wall_slots()
+    assert len(after) == len(before) + 1
+    same(after, fresh(room, False))
+    same(room.wall_slots(include_windows=True), glazed_before)
+    room.edges[3]["openings"].append(("door", 0.45, 0.55))
+    same(room.wall_slots(include_windows=True), fresh(room, True))
+
+
+def test_callers_sorting_their_list_do_not_reorder_the_table():
+    room = furnisher()
+    mine = room.wall_slots()
+    mine.sort(key=lambda slot: slot["len"])
+    same(room.wall_slots(), fresh(room, False))
+
+
+def test_invalidate_rebuilds_after_edges_are_reshaped():
+    room = furnisher()
+    room.wall_slots()
+    room.edges[1]["length"] = 2.0
+    room.invalidate_wall_slots()
+    same(room.wall_slots(), fresh(room, False))
+
+
+def _run():
+    tests = [
+        (name, function)
+        for name, function in globals().items()
+        if name.startswith("test_") and callable(function)
+    ]
+    failures = []
+    for name, function in tests:
+        try:
+            function()
+            print(f"  PASS  {name}")
+        except AssertionError as error:
+            failures.append(name)
+            print(f"  FAIL  {name}\n        {error}")
+    print(f"\n{len(tests) - len(failures)}/{len(tests)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_run())
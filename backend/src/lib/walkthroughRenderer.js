@@ -348,8 +348,103 @@ async function buildOnModal(payload) {
   throw new Error("The exact walkthrough renderer timed out.");
 }
 
+/**
+ * The exporter kept running between builds, when WALKTHROUGH_RENDER_SERVER=1.
+ *
+ * A one-shot worker spends seconds importing Open3D, trimesh and the exporter
+ * before it looks at the plan, and that is most of the time a cached or small
+ * home takes. `render_worker.py --serve` imports once, forks its builders from
+ * the warm process (LIVINAI_RENDER_WORKERS of them, LIVINAI_RENDER_QUEUE
+ * allowed to wait) and answers JSON lines: `{id, payload}` in on stdin,
+ * `{id, response}` out on stdout, the response being exactly what the file
+ * protocol writes.
+ *
+ * The server is started on first use and again after it exits. A request that
+ * times out is failed here but left to finish there: the model it writes is
+ * content-addressed, so the retry is served from cache.
+ */
+const renderServerEnabled = () => /^(1|true|yes)$/i.test((process.env.WALKTHROUGH_RENDER_SERVER || "").trim());
+let renderServer = null;
+
+function startRenderServer() {
+  const child = spawn(pythonExecutable(), [workerPath, "--serve"], {
+    cwd: rendererRoot,
+    windowsHide: true,
+    stdio: ["pipe", "pipe", "pipe"],
+  });
+  const server = { child, pending: new Map(), nextId: 0, buffer: "", stderr: "" };
+  const stop = (error) => {
+    if (renderServer === server) renderServer = null;
+    for (const waiter of server.pending.values()) waiter.reject(error);
+    server.pending.clear();
+  };
+
+  child.stdout.setEncoding("utf8");
+  child.stdout.on("data", (chunk) => {
+    server.buffer += chunk;
+    let newline;
+    while ((newline = server.buffer.indexOf("\n")) >= 0) {
+      const line = server.buffer.slice(0, newline);
+      server.buffer = server.buffer.slice(newline + 1);
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        continue;
+      }
+      const waiter = server.pending.get(message.id);
+      server.pending.delete(message.id);
+      waiter?.resolve(message.response || {});
+    }
+  });
+  child.stderr.on("data", (chunk) => {
+    server.stderr = `${server.stderr}${chunk}`.slice(-8_000);
+  });
+  // A write racing the server's exit; `close` below fails whatever was waiting.
+  child.stdin.on("error", () => {});
+  child.once("error", (error) => {
+    error.pythonMissing = error.code === "ENOENT";
+    stop(error);
+  });
+  child.once("close", () => {
+    if (server.stderr.trim()) console.error(`[walkthrough renderer]\n${server.stderr.trim()}`);
+    stop(new Error(describeRendererFailure(server.stderr)));
+  });
+  return server;
+}
+
+async function buildOnRenderServer(payload) {
+  renderServer ||= startRenderServer();
+  const server = renderServer;
+  const id = ++server.nextId;
+  try {
+    const response = await new Promise((resolve, reject) => {
+      const timeout = setTimeout(() => {
+        server.pending.delete(id);
+        reject(new Error("The exact walkthrough renderer timed out."));
+      }, RENDER_TIMEOUT_MS);
+      server.pending.set(id, {
+        resolve: (value) => { clearTimeout(timeout); resolve(value); },
+        reject: (error) => { clearTimeout(timeout); reject(error); },
+      });
+      server.child.stdin.write(`${JSON.stringify({ id, payload })}\n`);
+    });
+    if (!response.success) throw new Error(response.error || "The exact walkthrough could not be generated.");
+    return response;
+  } catch (error) {
+    if (error.pythonMissing) {
+      readinessPromise = Promise.resolve({ ready: false, reason: ENVIRONMENT_HINT });
+      readinessFailedAt = Date.now();
+      throw new Error(ENVIRONMENT_HINT);
+    }
+    throw error;
+  }
+}
+
 /** Run the exporter in an isolated process on this machine. */
 async function buildLocally(payload) {
+  if (renderServerEnabled()) return buildOnRenderServer(payload);
+
   const temporaryRoot = await fs.mkdtemp(path.join(os.tmpdir(), "livinai-walkthrough-"));
   const requestPath = path.join(temporaryRoot, "request.json");
   const responsePath = path.join(temporaryRoot, "response.json");
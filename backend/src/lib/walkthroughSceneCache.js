@@ -98,6 +98,17 @@ export function sceneCacheKey(payload = {}) {
     configs: roomConfigsForKey(payload.roomConfigs, payload.settings || {}),
     rendererRevision: payload.rendererRevision ?? null,
   };
+  // A quantized or batched GLB is a different file for the same scene. Left
+  // out of the key for the standard profile, as the worker leaves it out of its
+  // own, so every scene remembered before the option existed keeps its row.
+  if (payload.exportProfile && payload.exportProfile !== "standard") {
+    input.exportProfile = payload.exportProfile;
+  }
+  // A chunked scene is a manifest and one GLB per room's shell and furniture,
+  // not one file, so it cannot answer for the same plan asked for whole.
+  if (payload.chunked === true) {
+    input.chunked = true;
+  }
   return createHash("sha256").update(canonical(input)).digest("hex");
 }
 
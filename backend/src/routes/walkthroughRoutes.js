@@ -205,6 +205,21 @@ router.delete("/plans/:id", isAuthenticated, async (req, res) => {
   }
 });
 
+const modelUrl = (modelName) => `/api/walkthrough/realtime/model/${modelName}`;
+
+/**
+ * A chunked scene's manifest, each chunk given the URL it is served from.
+ *
+ * The chunks are content-addressed GLBs beside the scene's own, so they go
+ * through the same model route and the same on-disk cache; a client streams
+ * them in the order listed, spawn room first.
+ */
+const withChunkUrls = (data) => (
+  Array.isArray(data.chunks)
+    ? { ...data, chunks: data.chunks.map((chunk) => ({ ...chunk, url: modelUrl(chunk.model) })) }
+    : data
+);
+
 /**
  * Build Livinai_web's canonical realtime scene with the renderer snapshot and
  * assets bundled in this repository. There is no second project, service URL,
@@ -276,8 +291,8 @@ router.post("/realtime/session", isAuthenticated, async (req, res) => {
       && cached.rendererSource !== rendererSource;
     if (cached && !staleRenderer) {
       return res.json({
-        ...cached.data,
-        modelUrl: `/api/walkthrough/realtime/model/${cached.modelName}`,
+        ...withChunkUrls(cached.data),
+        modelUrl: modelUrl(cached.modelName),
         sceneKey: key,
         rendererSource: cached.rendererSource || undefined,
         cached: true,
@@ -326,8 +341,8 @@ router.post("/realtime/session", isAuthenticated, async (req, res) => {
     }
 
     return res.json({
-      ...data,
-      modelUrl: `/api/walkthrough/realtime/model/${modelName}`,
+      ...withChunkUrls(data),
+      modelUrl: modelUrl(modelName),
       sceneKey: key,
       rendererSource: builtBySource || undefined,
       cached: false,
@@ -364,8 +379,11 @@ router.get("/realtime/model/:filename", async (req, res) => {
       // The geometry is gone for good — evicted from the Modal volume, most
       // likely. Any remembered session pointing at it would hand the same dead
       // URL to the next person who opened that plan, so it goes too, and the
-      // retry the app already offers rebuilds the scene properly.
-      WalkthroughScene.deleteMany({ modelName: filename }).catch((cleanupError) => {
+      // retry the app already offers rebuilds the scene properly. A chunk that
+      // is gone takes every chunked scene listing it with it.
+      WalkthroughScene.deleteMany({
+        $or: [{ modelName: filename }, { "data.chunks.model": filename }],
+      }).catch((cleanupError) => {
         console.error("walkthrough scene cache purge failed:", cleanupError.message);
       });
       return res.status(404).json({ message: "This walkthrough model has expired." });
@@ -79,7 +79,7 @@ canvas{display:block;width:100%;height:100%;outline:none;touch-action:none}
     selected:null,selectionBox:null,
     joystick:{x:0,y:0},vel:new THREE.Vector3(),want:new THREE.Vector3(),
     glide:null,walkPose:null,
-    furniture:[],ceilings:[],overheads:[],userPose:null,clock:new THREE.Clock()};
+    furniture:[],ceilings:[],overheads:[],lods:[],culledBy:null,visibleSet:{},userPose:null,clock:new THREE.Clock()};
   camera.position.fromArray(data.spawn||[0,1.62,0]);
   threeScene.background=new THREE.Color(state.night?0x132333:0xc9d5d8);
   var pmrem=null,environment=null;
@@ -339,6 +339,7 @@ canvas{display:block;width:100%;height:100%;outline:none;touch-action:none}
         restore={x:camera.position.x,z:camera.position.z,yaw:engine.yaw,pitch:engine.pitch};
         applyPose(designerPose(state.roomIndex));
         camera.rotation.set(engine.pitch,engine.yaw,0);
+        cullUnseen();showLevels();
         renderer.render(threeScene,camera);
       }
       var info=composition();
@@ -561,12 +562,77 @@ canvas{display:block;width:100%;height:100%;outline:none;touch-action:none}
     for(var i=0;i<flatPrefixes.length;i++){if(name.indexOf(flatPrefixes[i])===0)return false;}
     return true;
   };
-  new THREE.GLTFLoader().load(data.modelUrl,function(gltf){
+  /**
+   * Furniture in the "mobile" export carries coarser stand-ins under MSFT_lod:
+   * nodes outside the scene, placed as the full-detail node is, with the
+   * distance each is drawn from in the metadata's lodDistances. They are put
+   * beside their node under the same name prefix, so they follow it into its
+   * editable group and move with every edit, and showLevels draws the one the
+   * camera's distance asks for. A scene without them loads as it always did.
+   */
+  var loadStandIns=function(gltf){
+    var distances=data.lodDistances||[],loads=[];
+    gltf.scene.traverse(function(node){
+      var lod=node.userData.gltfExtensions&&node.userData.gltfExtensions.MSFT_lod;
+      if(!lod||!Array.isArray(node.userData.lodLevels))return;
+      loads.push(Promise.all(lod.ids.map(function(id){return gltf.parser.getDependency('node',id);})).then(function(levels){
+        levels.forEach(function(level){level.visible=false;node.parent.add(level);});
+        engine.lods.push({nodes:[node].concat(levels),from:[0].concat(node.userData.lodLevels.map(function(level){var distance=Number(distances[level-1]);return Number.isFinite(distance)?distance:Infinity;})),shown:0});
+      }));
+    });
+    return Promise.all(loads);
+  };
+  var lodCenter=new THREE.Vector3();
+  var showLevels=function(){
+    engine.lods.forEach(function(set){
+      var full=set.nodes[0];
+      if(!full.geometry.boundingSphere)full.geometry.computeBoundingSphere();
+      var distance=lodCenter.copy(full.geometry.boundingSphere.center).applyMatrix4(full.matrixWorld).distanceTo(camera.position),shown=0;
+      for(var i=1;i<set.from.length;i++){if(distance>=set.from[i])shown=i;}
+      if(shown===set.shown)return;
+      set.nodes[set.shown].visible=false;set.nodes[shown].visible=true;set.shown=shown;
+    });
+  };
+  // The exporter's potentially visible sets: from inside a room, only what its
+  // set lists can be in view through its doors, windows and cased openings.
+  // The rest of the home's furniture is left undrawn while the walking camera
+  // is in that room. From above, or in a doorway, everything is drawn, and so
+  // is any piece the user has moved, since the sets know where it was built.
+  var cullUnseen=function(){
+    var sets=data.potentiallyVisible;
+    if(!Array.isArray(sets)||!sets.length)return;
+    var listed=null;
+    if(state.mode==='walk'){
+      var polygons=data.roomPolygons||[];
+      for(var i=0;i<polygons.length;i++){if(sets[i]&&polygons[i]&&polygons[i].length>2&&pointInPolygon(camera.position.x,camera.position.z,polygons[i])){listed=sets[i].furniture;break;}}
+    }
+    if(listed!==engine.culledBy){engine.culledBy=listed;engine.visibleSet={};(listed||[]).forEach(function(prefix){engine.visibleSet[prefix]=true;});}
+    engine.furniture.forEach(function(entry){var group=entry.group,home=group.userData.home;group.visible=!listed||engine.visibleSet[entry.item.nodePrefix]===true||Math.abs(group.position.x-home.x)>0.001||Math.abs(group.position.z-home.z)>0.001;});
+  };
+  var loadFailed=function(error){post({type:'error',message:'The exact Livinai_web scene could not be loaded: '+(error&&error.message?error.message:'model error')});};
+  // A chunked scene arrives as one GLB per room's shell and per room's furniture,
+  // the spawn room's first (see the chunks list in the exporter's metadata). They are
+  // fetched one after another, so the spawn room's files are not sharing the
+  // connection with the rest of the home, and each is added as it lands: the
+  // walkthrough is ready once the spawn room is in, however large the home. A
+  // one-file scene is a single chunk holding every room and every item.
+  var chunks=Array.isArray(data.chunks)&&data.chunks.length?data.chunks:[{url:data.modelUrl}];
+  var addModel=function(gltf,chunk){
     var model=gltf.scene;threeScene.add(model);
     model.traverse(function(child){if(child.name.indexOf('ceiling_')===0)engine.ceilings.push(child);if(child.name.indexOf('overhead_')===0)engine.overheads.push(child);if(!child.isMesh)return;child.receiveShadow=true;child.castShadow=castsShadow(child.name);var materials=Array.isArray(child.material)?child.material:[child.material];materials.forEach(function(material){material.envMapIntensity=state.night?0.42:0.68;if(material.map)material.map.anisotropy=Math.min(8,renderer.capabilities.getMaxAnisotropy());});});
-    engine.furniture=(data.furniture||[]).map(function(item){var group=new THREE.Group();group.name='editable_'+item.index;group.position.fromArray(item.pivot);threeScene.add(group);var nodes=[];model.traverse(function(node){if(node.name.indexOf(item.nodePrefix)===0)nodes.push(node);});nodes.forEach(function(node){group.attach(node);});var id='exact:'+item.index;group.userData.item=item;group.userData.editId=id;group.userData.home={x:group.position.x,y:group.position.y,z:group.position.z,rotation:0};var saved=edits[id];if(saved){group.position.set(Number(saved.x)||0,Number.isFinite(Number(saved.y))?Number(saved.y):group.position.y,Number(saved.z)||0);group.rotation.y=Number(saved.rotation)||0;}return{item:item,group:group};});
-    document.getElementById('loading').className='done';showcaseRoom(state.roomIndex);post({type:'ready',objects:engine.furniture.length,rooms:(data.roomCenters||[]).length,exact:true,source:'Livinai_web',threeVersion:${JSON.stringify(EXACT_THREE_REVISION)}});
-  },undefined,function(error){post({type:'error',message:'The exact Livinai_web scene could not be loaded: '+(error&&error.message?error.message:'model error')});});
+    (data.furniture||[]).filter(function(item){return !chunk.kind||(chunk.kind==='furniture'&&item.roomIndex===chunk.roomIndex);}).forEach(function(item){var group=new THREE.Group();group.name='editable_'+item.index;group.position.fromArray(item.pivot);threeScene.add(group);var nodes=[];model.traverse(function(node){if(node.name.indexOf(item.nodePrefix)===0)nodes.push(node);});nodes.forEach(function(node){group.attach(node);});var id='exact:'+item.index;group.userData.item=item;group.userData.editId=id;group.userData.home={x:group.position.x,y:group.position.y,z:group.position.z,rotation:0};var saved=edits[id];if(saved){group.position.set(Number(saved.x)||0,Number.isFinite(Number(saved.y))?Number(saved.y):group.position.y,Number(saved.z)||0);group.rotation.y=Number(saved.rotation)||0;}engine.furniture.push({item:item,group:group});});
+  };
+  var announced=false;
+  var announce=function(){
+    announced=true;
+    document.getElementById('loading').className='done';showcaseRoom(state.roomIndex);post({type:'ready',objects:(data.furniture||[]).length,rooms:(data.roomCenters||[]).length,exact:true,source:'Livinai_web',threeVersion:${JSON.stringify(EXACT_THREE_REVISION)}});
+  };
+  var loadChunk=function(index){
+    if(!announced&&(index>=chunks.length||chunks[index].roomIndex!==chunks[0].roomIndex))announce();
+    if(index>=chunks.length)return;
+    new THREE.GLTFLoader().load(chunks[index].url,function(gltf){loadStandIns(gltf).then(function(){addModel(gltf,chunks[index]);loadChunk(index+1);}).catch(loadFailed);},undefined,loadFailed);
+  };
+  loadChunk(0);
   // The roof and everything hanging from it are only ever wanted from inside a
   // room. Seen from any camera that is above the building — which is every
   // camera that is not the walking one — a ceiling is an opaque lid over the
@@ -633,6 +699,7 @@ canvas{display:block;width:100%;height:100%;outline:none;touch-action:none}
     }
 
     engine.selectionBox&&engine.selectionBox.update();
+    cullUnseen();showLevels();
     renderer.render(threeScene,camera);
   };
   render();
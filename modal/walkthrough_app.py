@@ -64,6 +64,8 @@ RENDERER_SOURCE = REPO_ROOT / "backend" / "renderer"
 REQUIREMENTS = RENDERER_SOURCE / "requirements.txt"
 
 RENDERER_ROOT = "/renderer"
+SOURCE_MANIFEST = f"{RENDERER_ROOT}/source_manifest.json"
+ASSET_PACK = f"{RENDERER_ROOT}/assets.pack"
 CACHE_ROOT = "/cache"
 OUTPUT_DIR = f"{CACHE_ROOT}/walkthrough"
 
@@ -75,7 +77,8 @@ cache_vol = modal.Volume.from_name("livinai-walkthrough-cache", create_if_missin
 api_key_secret = modal.Secret.from_name("livinai-api-key", required_keys=["API_KEY"])
 
 # Only renderer-generated names may ever be turned into a path. Mirrors
-# MODEL_NAME in backend/src/lib/walkthroughRenderer.js.
+# MODEL_NAME in backend/src/lib/walkthroughRenderer.js. A chunked scene's
+# per-room GLBs are named by their own content hash in the same form.
 MODEL_NAME = re.compile(r"^[a-f0-9]{24}\.glb$", re.IGNORECASE)
 
 # Copied verbatim from backend/Dockerfile. Open3D's wheel links Filament, OpenMP
@@ -124,6 +127,13 @@ renderer_image = (
             "OPEN3D_CPU_RENDERING": "true",
             "PYTHONUNBUFFERED": "1",
             "PYTHONDONTWRITEBYTECODE": "1",
+            # Written by the last build step below. Until it exists the
+            # exporter hashes its sources itself, which is what the import
+            # check does.
+            "WALKTHROUGH_SOURCE_MANIFEST": SOURCE_MANIFEST,
+            # Compiled below as well; until then assets are read from their
+            # files, with one stderr note that the pack is not there yet.
+            "LIVINAI_ASSET_PACK": ASSET_PACK,
         }
     )
     # WALKTHROUGH_OUTPUT_DIR is deliberately NOT set here. render_worker creates
@@ -144,9 +154,21 @@ renderer_image = (
             "**/*.pyc",
             ".venv/**",
             "generated/**",
+            "source_manifest.json",
+            "assets.pack",
         ],
     )
     .run_commands(f'python -c "{VERIFY}"')
+    # Every cold container decoded the archviz JPGs and parsed the catalog GLBs
+    # before its first room. Do it once into a pack the containers map instead;
+    # before the manifest, whose fingerprint then hashes the pack.
+    .run_commands(f"python {RENDERER_ROOT}/render_worker.py --compile-asset-pack {ASSET_PACK}")
+    # The source fingerprint is part of every cache key. Hashing ~300 KB of
+    # engine and walking the furniture catalog on each request made cache hits
+    # pay for it; the files are final here, so record the answer once.
+    .run_commands(
+        f"python {RENDERER_ROOT}/render_worker.py --write-source-manifest {SOURCE_MANIFEST}"
+    )
 )
 
 
@@ -158,13 +180,28 @@ def _worker():
     on the image's `.env` call.
     """
     os.environ["WALKTHROUGH_OUTPUT_DIR"] = OUTPUT_DIR
+    # Renewing a build lease commits the volume, so renew rarely: a lease of
+    # five minutes is renewed a handful of times in a 900-second build.
+    os.environ.setdefault("LIVINAI_BUILD_LEASE_SECONDS", "300")
     if RENDERER_ROOT not in sys.path:
         sys.path.insert(0, RENDERER_ROOT)
     import render_worker
 
+    # Containers share the volume, so a lease one of them takes has to be
+    # committed for the others to see it, and they reload to look.
+    render_worker.share_output_volume(cache_vol.commit, cache_vol.reload)
     return render_worker
 
 
+def _output_cache():
+    """The output directory's index, without importing the exporter."""
+    if RENDERER_ROOT not in sys.path:
+        sys.path.insert(0, RENDERER_ROOT)
+    from output_cache import OutputCache
+
+    return OutputCache(OUTPUT_DIR)
+
+
 def _require_token(authorization: str):
     expected = os.environ.get("API_KEY")
     if expected:
@@ -272,7 +309,11 @@ def result(callId: str = "", authorization: str = Header(default="") if Header e
 )
 @modal.fastapi_endpoint(method="GET")
 def model(name: str = "", authorization: str = Header(default="") if Header else ""):
-    """Stream one built GLB back to the API, which caches and serves it."""
+    """Stream one built GLB back to the API, which caches and serves it.
+
+    Either a whole scene or one chunk of a chunked one: each is a file of its
+    own, so the API can fetch the spawn room's without waiting on the rest.
+    """
     _require_token(authorization)
 
     path = _model_path(name)
@@ -283,6 +324,16 @@ def model(name: str = "", authorization: str = Header(default="") if Header else
     if not path.is_file():
         raise HTTPException(status_code=404, detail="This walkthrough model has expired.")
 
+    # A download keeps the scene at the young end of the eviction order. It
+    # touches the file and logs one line, no index rewrite; both ride on
+    # whichever commit comes next, this container's own at shutdown included,
+    # and losing them only makes the scene look a little older. A chunk's
+    # download is credited to the scenes that list it.
+    try:
+        _output_cache().record(path.stem, "download")
+    except OSError as error:
+        print(f"[WALK] Output cache record failed: {error}", file=sys.stderr)
+
     return Response(
         content=path.read_bytes(),
         media_type="model/gltf-binary",